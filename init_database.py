@@ -97,7 +97,10 @@ def create_students_table_if_not_exists(conn):
         probability_dropout REAL,
         probability_enrolled REAL,
         predicted_outcome TEXT,
-        confidence REAL
+        confidence REAL,
+        
+        -- Identificador generado por la API: los reintentos y el spool local no duplican filas
+        record_id UUID UNIQUE
     );
     """
     
@@ -161,6 +164,26 @@ def add_missing_ml_columns(conn):
         conn.rollback()
         return False
 
+def add_record_id_column(conn):
+    """
+    Agrega record_id (único) si no existe: la API guarda con upsert sobre esta columna para que
+    los lotes reintentados o reenviados desde el spool local no se inserten dos veces
+    """
+    print("🔧 Verificando/agregando columna record_id...")
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("ALTER TABLE students ADD COLUMN IF NOT EXISTS record_id UUID;")
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS students_record_id_key ON students (record_id);")
+            conn.commit()
+            print("   ✅ Columna record_id lista")
+            return True
+
+    except Exception as e:
+        print(f"❌ Error agregando record_id: {e}")
+        conn.rollback()
+        return False
+
 def verify_table_schema(conn):
     """
     Verifica el esquema final de la tabla
@@ -358,6 +381,10 @@ def initialize_complete_database():
         if not add_missing_ml_columns(conn):
             return False
         
+        # Paso 3b: Identificador único de cada predicción guardada por la API
+        if not add_record_id_column(conn):
+            return False
+        
         # Paso 4: Verificar esquema final
         if not verify_table_schema(conn):
             return False
@@ -0,0 +1,145 @@
+"""
+Autotune de la inferencia: busca la combinación de modo del pool, workers concurrentes y hilos de
+XGBoost por llamada (INFERENCE_POOL_MODE, INFERENCE_POOL_SIZE, INFERENCE_NTHREAD) con mejor p99
+en esta máquina a un throughput dado.
+
+La carga es de lazo abierto: los lotes llegan con tiempos entre llegadas exponenciales a --rate
+lotes/s (como peticiones independientes), así que la latencia incluye la cola que se forma cuando
+la configuración no da abasto. Sin --rate se mide antes la capacidad de la configuración por defecto
+y se usa el 70% de esa capacidad. Se recomienda la configuración con menor p99 entre las que
+sostienen al menos el 95% del ritmo pedido.
+
+Ejecutar con:
+    python -m server.benchmarks.bench_autotune --rate 400 --batch-size 8 --duration 10
+    python -m server.benchmarks.bench_autotune --modes thread --pool-sizes 1 2 4 --nthreads 1 2 4 --cpu-affinity 0-3
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+# Las líneas de log por predicción no forman parte de la medida
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import numpy as np
+
+from server.benchmarks.common import make_synthetic_records
+from server.models import predictor
+from server.models.inference_pool import InferencePool, available_cpus, set_cpu_affinity, threads_per_call
+
+
+def make_pool(mode, pool_size, nthread):
+    if mode == "process":
+        return InferencePool(max_workers=pool_size, mode=mode,
+                             initializer=predictor.configure_process_worker, initargs=(nthread,),
+                             preload=("server.models.forkserver_preload",))
+    # En modo thread los hilos del pool comparten el booster
+    predictor.set_inference_threads(predictor.get_active_model(), nthread)
+    return InferencePool(max_workers=pool_size, mode=mode)
+
+
+async def open_loop(pool, batches, rate, seed=0):
+    """
+    Envía los lotes con llegadas de Poisson a `rate` lotes/s. Devuelve (latencias en s, lotes/s logrados)
+    """
+    rng = random.Random(seed)
+    latencies = []
+
+    async def one(batch):
+        start = time.perf_counter()
+        await pool.run(predictor.predict_students_with_probabilities, batch)
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    start = next_at = time.perf_counter()
+    for batch in batches:
+        next_at += rng.expovariate(rate)
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(batch)))
+    await asyncio.gather(*tasks)
+    return np.array(latencies), len(batches) / (time.perf_counter() - start)
+
+
+async def closed_loop(pool, batches, concurrency):
+    """
+    Capacidad: lotes/s con `concurrency` lotes siempre en vuelo
+    """
+    queue = list(batches)
+
+    async def worker():
+        while queue:
+            await pool.run(predictor.predict_students_with_probabilities, queue.pop())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(batches) / (time.perf_counter() - start)
+
+
+def run_config(mode, pool_size, nthread, batches, rate):
+    pool = make_pool(mode, pool_size, nthread)
+    try:
+        # Calentamiento (primeras llamadas de cada worker)
+        asyncio.run(closed_loop(pool, batches[:pool_size * 4], pool_size))
+        return asyncio.run(open_loop(pool, batches, rate))
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=None, help='lotes/s objetivo (por defecto 70%% de la capacidad medida)')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='segundos de carga por configuración')
+    parser.add_argument('--modes', nargs='+', default=['thread', 'process'], choices=['thread', 'process'])
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=None)
+    parser.add_argument('--nthreads', type=int, nargs='+', default=None, help='0 = núcleos / workers')
+    parser.add_argument('--cpu-affinity', default=None, help='núcleos a usar, p. ej. "0-3" (Linux)')
+    args = parser.parse_args()
+
+    if args.cpu_affinity:
+        print(f"📌 Afinidad de CPU: {set_cpu_affinity(args.cpu_affinity)}")
+    cpus = available_cpus()
+    pool_sizes = args.pool_sizes or sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    nthreads = args.nthreads or [0, 1]
+
+    loaded = predictor.load_model()
+    records = make_synthetic_records(loaded.pipeline, 4096)
+    batch_of = lambda i: [records[(i * args.batch_size + j) % len(records)] for j in range(args.batch_size)]
+
+    rate = args.rate
+    if rate is None:
+        default_size = max(1, min(4, cpus))
+        pool = make_pool("thread", default_size, threads_per_call(default_size))
+        capacity = asyncio.run(closed_loop(pool, [batch_of(i) for i in range(500)], default_size * 2))
+        pool.shutdown()
+        rate = 0.7 * capacity
+        print(f"📏 Capacidad (thread, {default_size} workers): {capacity:.0f} lotes/s → ritmo objetivo {rate:.0f} lotes/s")
+
+    batches = [batch_of(i) for i in range(max(1, int(rate * args.duration)))]
+    print(f"🖥️ Núcleos disponibles: {cpus} | {len(batches)} lotes de {args.batch_size} filas a {rate:.0f} lotes/s\n")
+    print(f"{'modo':>8} {'workers':>8} {'nthread':>8} {'lotes/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+
+    results = []
+    for mode in args.modes:
+        for pool_size in pool_sizes:
+            for nthread in sorted({threads_per_call(pool_size, n) for n in nthreads}):
+                latencies, achieved = run_config(mode, pool_size, nthread, batches, rate)
+                p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+                results.append((mode, pool_size, nthread, achieved, p99))
+                print(f"{mode:>8} {pool_size:>8} {nthread:>8} {achieved:>9.0f} {p50:>8.2f} {p99:>8.2f} {latencies.max() * 1000:>8.2f}")
+
+    sustained = [r for r in results if r[3] >= 0.95 * rate] or results
+    mode, pool_size, nthread, achieved, p99 = min(sustained, key=lambda r: r[4])
+    print(f"\n🏆 Recomendado (p99 {p99:.2f} ms a {achieved:.0f} lotes/s):")
+    print(f"   INFERENCE_POOL_MODE={mode}")
+    print(f"   INFERENCE_POOL_SIZE={pool_size}")
+    print(f"   INFERENCE_NTHREAD={nthread}")
+    if args.cpu_affinity:
+        print(f"   INFERENCE_CPU_AFFINITY={args.cpu_affinity}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark de concurrencia: cuánto se bloquea el event loop mientras se atienden peticiones /predict.
+
+Un latido (heartbeat) duerme 1 ms en bucle y mide con cuánto retraso se despierta; ese retraso es
+el tiempo que el event loop ha estado ocupado sin poder atender otras peticiones o health checks.
+Se compara la inferencia en línea (INFERENCE_POOL_SIZE=0, comportamiento anterior) con el pool de hilos.
+
+Ejecutar con:
+    python -m server.benchmarks.bench_event_loop --requests 2000 --concurrency 64 --pool-sizes 0 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "benchmark-key")
+# Las líneas de log por predicción no forman parte de la medida
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+import numpy as np
+
+from server.benchmarks.common import make_synthetic_records, to_api_payload
+from server.models.predictor import preprocessing_pipeline
+from server.models.inference_pool import InferencePool
+import server.main as main_module
+
+
+class FakeSupabaseQuery:
+    """Simula la inserción en Supabase con una latencia de red fija (bloqueante, como el cliente real)"""
+    def __init__(self, latency_s):
+        self.latency_s = latency_s
+
+    def insert(self, rows):
+        return self
+
+    def execute(self):
+        time.sleep(self.latency_s)
+
+        class Response:
+            data = [{'id': 1}]
+        return Response()
+
+
+async def heartbeat(stop, lateness, interval=0.001):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lateness.append(loop.time() - start - interval)
+
+
+async def run_load(payloads, concurrency):
+    transport = httpx.ASGITransport(app=main_module.app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(payload):
+            async with semaphore:
+                response = await client.post("/predict", json=payload)
+                response.raise_for_status()
+
+        await asyncio.gather(*(one(payload) for payload in payloads))
+
+
+async def measure(payloads, concurrency):
+    stop = asyncio.Event()
+    lateness = []
+    beat = asyncio.create_task(heartbeat(stop, lateness))
+    start = time.perf_counter()
+    await run_load(payloads, concurrency)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return elapsed, np.array(lateness)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bloqueo del event loop: inferencia en línea vs pool de hilos")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[0, 4])
+    parser.add_argument('--db-latency-ms', type=float, default=20.0)
+    args = parser.parse_args()
+
+    records = make_synthetic_records(preprocessing_pipeline, args.requests)
+    payloads = [to_api_payload(record) for record in records]
+
+    fake_query = FakeSupabaseQuery(args.db_latency_ms / 1000)
+    main_module.supabase.table = lambda name: fake_query
+
+    print(f"📊 {args.requests} peticiones /predict, concurrencia {args.concurrency}, latencia BD {args.db_latency_ms} ms")
+    for pool_size in args.pool_sizes:
+        pool = InferencePool(max_workers=pool_size)
+        main_module.inference_pool = pool
+        main_module.prediction_batcher.executor = pool if pool_size > 0 else None
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed, lateness = asyncio.run(measure(payloads, args.concurrency))
+        pool.shutdown()
+
+        stalled = lateness[lateness > 0.005]
+        print(f"   pool={pool_size:<3} ({pool.stats()['mode']:<6}) "
+              f"throughput: {args.requests / elapsed:8.1f} req/s | "
+              f"retraso latido p50: {np.percentile(lateness, 50) * 1000:6.2f} ms, "
+              f"p99: {np.percentile(lateness, 99) * 1000:6.2f} ms, máx: {lateness.max() * 1000:6.2f} ms | "
+              f"tiempo bloqueado (>5 ms): {stalled.sum() * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
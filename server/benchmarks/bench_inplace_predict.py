@@ -0,0 +1,46 @@
+"""
+Microbenchmark: xgb.DMatrix + Booster.predict vs Booster.inplace_predict sobre float32 contiguo.
+
+Ejecutar con:
+    python -m server.benchmarks.bench_inplace_predict --batch-sizes 1 32 1000 100000
+"""
+import argparse
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from server.benchmarks.common import make_synthetic_records, timeit
+from server.models import predictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DMatrix vs inplace_predict")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 1000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    pipeline = predictor.preprocessing_pipeline
+    records = make_synthetic_records(pipeline, max(args.batch_sizes))
+    with contextlib.redirect_stdout(io.StringIO()):
+        X_all = np.ascontiguousarray(pipeline.transform(pd.DataFrame(records)).to_numpy(dtype=np.float32))
+
+    print(f"{'filas':>8} | {'DMatrix+predict':>16} | {'inplace_predict':>16} | {'speedup':>7} | máx. dif.")
+    for batch_size in args.batch_sizes:
+        X = X_all[:batch_size]
+        repeat = max(3, args.repeat if batch_size < 10000 else 3)
+
+        def with_dmatrix():
+            return predictor.model.predict(xgb.DMatrix(X, feature_names=pipeline.features))
+
+        dmatrix_time, dmatrix_probs = timeit(with_dmatrix, repeat)
+        inplace_time, inplace_probs = timeit(lambda: predictor.predict_probabilities(X), repeat)
+
+        print(f"{batch_size:>8} | {dmatrix_time * 1000:13.3f} ms | {inplace_time * 1000:13.3f} ms | "
+              f"{dmatrix_time / inplace_time:6.1f}x | {np.abs(dmatrix_probs - inplace_probs).max():.1e}")
+
+
+if __name__ == "__main__":
+    main()
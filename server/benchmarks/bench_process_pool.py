@@ -0,0 +1,90 @@
+"""
+Benchmark de escalado multi-núcleo: throughput del pool de inferencia en modo process con 1..N workers.
+
+Cada configuración puntúa los mismos lotes de estudiantes sintéticos repartidos entre los workers
+(como hace el micro-batcher) y mide filas/segundo. También mide la memoria de cada worker leyendo
+/proc/<pid>/smaps_rollup (Linux): los workers salen por fork del forkserver, que precarga el modelo una
+vez, así que con copy-on-write la memoria privada (USS) de cada worker debe quedarse pequeña y plana.
+
+Ejecutar con:
+    python -m server.benchmarks.bench_process_pool --workers 1 2 4 8 16 --batches 400 --batch-size 32
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from server.benchmarks.common import make_synthetic_records
+from server.models import predictor
+from server.models.inference_pool import InferencePool, threads_per_call
+
+
+def read_memory_kb(pid):
+    """
+    (RSS, PSS, USS) en kB de un proceso, o None si /proc/<pid>/smaps_rollup no está disponible
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith(' '))
+    except OSError:
+        return None
+    value = lambda name: int(fields.get(name, '0 kB').split()[0])
+    return value('Rss'), value('Pss'), value('Private_Clean') + value('Private_Dirty')
+
+
+async def run_batches(pool, batches):
+    return await asyncio.gather(*[pool.run(predictor.predict_students_with_probabilities, batch) for batch in batches])
+
+
+def bench(mode, n_workers, batches):
+    threads_per_worker = threads_per_call(n_workers)
+    pool = InferencePool(max_workers=n_workers, mode=mode,
+                         initializer=predictor.configure_process_worker if mode == "process" else None,
+                         initargs=(threads_per_worker,), preload=("server.models.forkserver_preload",))
+
+    # Calentamiento (primera predicción de cada worker)
+    asyncio.run(run_batches(pool, batches[:n_workers * 2]))
+
+    start = time.perf_counter()
+    asyncio.run(run_batches(pool, batches))
+    elapsed = time.perf_counter() - start
+
+    memory = [read_memory_kb(pid) for pid in pool.worker_pids()]
+    pool.shutdown()
+    return elapsed, [m for m in memory if m is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=None)
+    parser.add_argument('--batches', type=int, default=400)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, 4, 8, 16, cpu_count} & set(range(1, cpu_count + 1)))
+
+    records = make_synthetic_records(predictor.preprocessing_pipeline, args.batches * args.batch_size)
+    batches = [records[i:i + args.batch_size] for i in range(0, len(records), args.batch_size)]
+    total_rows = len(records)
+
+    parent_memory = read_memory_kb(os.getpid())
+    print(f"🖥️ Núcleos: {cpu_count} | lotes: {len(batches)} x {args.batch_size} filas")
+    if parent_memory:
+        print(f"🧠 Proceso padre (modelo cargado): RSS {parent_memory[0] / 1024:.1f} MB")
+
+    thread_time, _ = bench("thread", 1, batches)
+    print(f"\n{'modo':>8} {'workers':>8} {'filas/s':>10} {'speedup':>8} {'RSS/worker':>11} {'PSS/worker':>11} {'USS/worker':>11}")
+    print(f"{'thread':>8} {1:>8} {total_rows / thread_time:>10.0f} {1.0:>8.2f}")
+
+    for n_workers in worker_counts:
+        elapsed, memory = bench("process", n_workers, batches)
+        line = f"{'process':>8} {n_workers:>8} {total_rows / elapsed:>10.0f} {thread_time / elapsed:>8.2f}"
+        if memory:
+            rss, pss, uss = (sum(m[i] for m in memory) / len(memory) / 1024 for i in range(3))
+            line += f" {rss:>9.1f}MB {pss:>9.1f}MB {uss:>9.1f}MB"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
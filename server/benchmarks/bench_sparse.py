@@ -0,0 +1,49 @@
+"""
+Benchmark: salida densa (DataFrame float64) vs dispersa (CSR float32) del PreprocessingPipeline.
+
+Ejecutar con:
+    python -m server.benchmarks.bench_sparse --rows 100000
+"""
+import argparse
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from server.benchmarks.common import make_synthetic_records, timeit
+from server.models import predictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark denso vs CSR")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pipeline = predictor.preprocessing_pipeline
+    df = pd.DataFrame(make_synthetic_records(pipeline, args.rows))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        dense_time, dense = timeit(lambda: pipeline.transform(df), args.repeat)
+    sparse_time, sparse = timeit(lambda: pipeline.transform_sparse(df), args.repeat)
+
+    dense_bytes = dense.to_numpy().nbytes
+    sparse_bytes = sparse.data.nbytes + sparse.indices.nbytes + sparse.indptr.nbytes
+
+    def predict_dense():
+        return predictor.model.predict(xgb.DMatrix(dense, feature_names=pipeline.features))
+
+    dense_predict_time, dense_probs = timeit(predict_dense, args.repeat)
+    sparse_predict_time, sparse_probs = timeit(lambda: predictor.predict_probabilities_sparse(sparse), args.repeat)
+
+    print(f"📊 Filas: {args.rows} | Features: {len(pipeline.features)} | Densidad: {sparse.nnz / np.prod(sparse.shape):.1%}")
+    print(f"   Transform   denso: {dense_time * 1000:8.1f} ms | CSR: {sparse_time * 1000:8.1f} ms")
+    print(f"   Memoria     denso: {dense_bytes / 1e6:8.1f} MB | CSR: {sparse_bytes / 1e6:8.1f} MB")
+    print(f"   DMatrix+predict denso: {dense_predict_time * 1000:8.1f} ms | CSR: {sparse_predict_time * 1000:8.1f} ms")
+    print(f"   Diferencia máxima de probabilidades: {np.abs(dense_probs - sparse_probs).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from server.models.preprocessing import split_one_hot_feature
+
+# Nombres del API para las variables categóricas del dataset
+API_CATEGORICAL_FIELDS = {
+    'scholarship_holder': 'scholarship_holder',
+    'tuition_fees_up_to_date': 'tuition_fees_up_to_date',
+    'marital_status': 'marital_status',
+    'previous_qualification': 'previous_qualification',
+    "mother's_qualification": 'mothers_qualification',
+    "father's_qualification": 'fathers_qualification'
+}
+
+
+def make_synthetic_records(pipeline, n_rows, seed=42):
+    """
+    Genera n_rows estudiantes aleatorios con el formato de StudentInput.model_dump()
+    usando las categorías que conoce el pipeline
+    """
+    categories = {field: ['No'] for field in API_CATEGORICAL_FIELDS}
+    for feature in pipeline.true_categorical_features:
+        parsed = split_one_hot_feature(feature)
+        if parsed is not None and parsed[0] in categories:
+            categories[parsed[0]].append(parsed[1])
+
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n_rows):
+        record = {
+            'curricular_units_1st_sem_grade': round(rng.uniform(0, 20), 2),
+            'curricular_units_2nd_sem_grade': round(rng.uniform(0, 20), 2),
+            'curricular_units_1st_sem_approved': rng.randint(0, 8),
+            'curricular_units_2nd_sem_approved': rng.randint(0, 8),
+            'curricular_units_1st_sem_evaluations': rng.randint(0, 12),
+            'curricular_units_2nd_sem_evaluations': rng.randint(0, 12),
+            'unemployment_rate': round(rng.uniform(7, 17), 1),
+            'gdp': round(rng.uniform(-4, 4), 2),
+            'age_at_enrollment': rng.randint(17, 60)
+        }
+        for field, api_field in API_CATEGORICAL_FIELDS.items():
+            record[api_field] = rng.choice(categories[field])
+        records.append(record)
+    return records
+
+
+def to_api_payload(record):
+    """
+    Registro interno → JSON que acepta StudentInput (nombres con apóstrofe)
+    """
+    payload = dict(record)
+    payload["mother's_qualification"] = payload.pop('mothers_qualification')
+    payload["father's_qualification"] = payload.pop('fathers_qualification')
+    return payload
+
+
+def timeit(function, repeat=5):
+    """
+    Ejecuta function `repeat` veces y devuelve (mejor tiempo en segundos, último resultado)
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
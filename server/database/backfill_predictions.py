@@ -0,0 +1,91 @@
+"""
+Backfill: puntúa un CSV de estudiantes con el modelo activo y guarda las predicciones en students con COPY.
+
+El CSV lleva las columnas de StudentInput (los nombres del API, con "mother's_qualification" y
+"father's_qualification"). Se lee, valida, puntúa y escribe por bloques, así que la memoria no
+crece con el tamaño del fichero. Cada fila recibe un record_id nuevo: volver a lanzar el mismo
+fichero inserta filas nuevas, pero un bloque reintentado no se duplica.
+
+Ejecutar con:
+    python -m server.database.backfill_predictions estudiantes.csv [--chunk-size 5000]
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from pydantic import ValidationError
+from server.database.bulk_writer import copy_rows
+from server.database.postgres_client import get_postgres_connection
+from server.database.records import build_student_record
+from server.models.schemas import StudentInput
+
+
+def score_rows(raw_rows, errors):
+    """
+    Valida y puntúa un bloque; devuelve las filas para students. Las inválidas se añaden a errors.
+    """
+    from server.models.predictor import predict_students_with_probabilities
+
+    valid = []
+    for line, raw in raw_rows:
+        try:
+            valid.append(StudentInput.model_validate(raw).model_dump())
+        except ValidationError as e:
+            errors.append((line, e.errors(include_url=False)))
+    if not valid:
+        return []
+
+    results = predict_students_with_probabilities(valid)
+    return [dict(build_student_record(student, result), record_id=str(uuid.uuid4()))
+            for student, result in zip(valid, results)]
+
+
+def backfill(csv_path, conn, chunk_size=5000):
+    """
+    Devuelve {"rows", "inserted", "invalid", "seconds"}
+    """
+    start = time.perf_counter()
+    errors = []
+    rows = inserted = 0
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        # Línea 1 = cabecera
+        numbered = enumerate(csv.DictReader(f), start=2)
+        while True:
+            block = list(itertools.islice(numbered, chunk_size))
+            if not block:
+                break
+            records = score_rows(block, errors)
+            result = copy_rows(conn, records, chunk_size=chunk_size)
+            rows += result["rows"]
+            inserted += result["inserted"]
+            print(f"   ✅ {rows} filas guardadas ({len(errors)} inválidas)")
+
+    for line, line_errors in errors[:10]:
+        print(f"   ⚠️ Línea {line}: {line_errors}")
+    return {"rows": rows, "inserted": inserted, "invalid": len(errors), "seconds": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Puntúa un CSV de estudiantes y guarda las predicciones con COPY")
+    parser.add_argument("csv_path")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"🚀 Backfill de {args.csv_path}")
+    conn = get_postgres_connection()
+    try:
+        result = backfill(args.csv_path, conn, chunk_size=args.chunk_size)
+    finally:
+        conn.close()
+    print(f"🎉 {result['rows']} filas ({result['inserted']} nuevas, {result['invalid']} inválidas) "
+          f"en {result['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Carga masiva de filas en students con COPY FROM STDIN (psycopg2).
+
+Insertar por la API REST de Supabase (PostgREST) cuesta una petición HTTP por llamada; para lotes
+grandes (predicción por lotes, backfills de miles de estudiantes) se usa una conexión directa a
+PostgreSQL y COPY, que carga las filas en un solo flujo.
+
+Las filas se envían en bloques de chunk_size: cada bloque es una transacción (si uno falla, los
+anteriores ya están guardados). El CSV se genera a medida que COPY lo lee, sin construirlo entero
+en memoria. Con skip_duplicates (por defecto) cada bloque se copia a una tabla temporal y se pasa a
+students con ON CONFLICT (record_id) DO NOTHING: repetir una carga no duplica filas.
+"""
+import itertools
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Columnas de students que escribe la API (id y created_at los pone la base de datos)
+STUDENT_COLUMNS = (
+    'curricular_units_1st_sem_grade',
+    'curricular_units_2nd_sem_grade',
+    'curricular_units_1st_sem_approved',
+    'curricular_units_2nd_sem_approved',
+    'curricular_units_1st_sem_evaluations',
+    'curricular_units_2nd_sem_evaluations',
+    'unemployment_rate',
+    'gdp',
+    'age_at_enrollment',
+    'scholarship_holder',
+    'tuition_fees_up_to_date',
+    'marital_status',
+    'previous_qualification',
+    'mothers_qualification',
+    'fathers_qualification',
+    'target',
+    'probability_graduate',
+    'probability_dropout',
+    'probability_enrolled',
+    'predicted_outcome',
+    'confidence',
+    'record_id'
+)
+
+_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def quote_identifier(name):
+    # Los nombres de tabla y columna van en el SQL: solo se aceptan identificadores simples
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Identificador SQL no válido: {name!r}")
+    return f'"{name}"'
+
+
+def csv_value(value):
+    """
+    Campo CSV para COPY: None vacío y sin comillas (NULL), textos siempre entre comillas (así un
+    texto vacío no se confunde con NULL), números y booleanos tal cual
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class CsvRowStream:
+    """
+    Fichero de solo lectura para copy_expert: genera el CSV de las filas a medida que se lee
+    """
+
+    def __init__(self, rows, columns):
+        self._rows = iter(rows)
+        self._columns = columns
+        self._pending = ""
+        self.rows_written = 0
+
+    def read(self, size=-1):
+        lines = []
+        pending_size = len(self._pending)
+        while size is None or size < 0 or pending_size < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = ",".join(csv_value(row.get(column)) for column in self._columns) + "\n"
+            lines.append(line)
+            pending_size += len(line)
+            self.rows_written += 1
+        if lines:
+            self._pending += "".join(lines)
+
+        if size is None or size < 0:
+            size = len(self._pending)
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+
+def copy_sql(table, columns):
+    column_list = ", ".join(quote_identifier(column) for column in columns)
+    return f"COPY {quote_identifier(table)} ({column_list}) FROM STDIN WITH (FORMAT csv)"
+
+
+def copy_rows(conn, rows, table="students", columns=STUDENT_COLUMNS, chunk_size=5000, skip_duplicates=True,
+              conflict_column="record_id"):
+    """
+    Escribe rows (iterable de dicts) en table con COPY, en transacciones de chunk_size filas.
+    Devuelve {"rows", "inserted", "chunks", "seconds"}; "inserted" no cuenta los duplicados omitidos.
+    """
+    chunk_size = max(1, int(chunk_size))
+    column_list = ", ".join(quote_identifier(column) for column in columns)
+    staging = quote_identifier(f"{table}_copy_staging")
+    iterator = iter(rows)
+
+    start = time.perf_counter()
+    total = inserted = chunks = 0
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            break
+        try:
+            with conn.cursor() as cursor:
+                if skip_duplicates:
+                    # Tabla temporal con las mismas columnas (sin restricciones ni defaults), borrada al confirmar
+                    cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                                   f"SELECT {column_list} FROM {quote_identifier(table)} WITH NO DATA")
+                    cursor.copy_expert(copy_sql(f"{table}_copy_staging", columns), CsvRowStream(chunk, columns))
+                    cursor.execute(f"INSERT INTO {quote_identifier(table)} ({column_list}) "
+                                   f"SELECT {column_list} FROM {staging} "
+                                   f"ON CONFLICT ({quote_identifier(conflict_column)}) DO NOTHING")
+                    inserted += cursor.rowcount
+                else:
+                    cursor.copy_expert(copy_sql(table, columns), CsvRowStream(chunk, columns))
+                    inserted += len(chunk)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception("❌ COPY en %s falló en el bloque %d (%d filas ya guardadas)", table, chunks + 1, inserted)
+            raise
+        total += len(chunk)
+        chunks += 1
+
+    seconds = time.perf_counter() - start
+    logger.info("💾 COPY en %s: %d filas (%d nuevas) en %d bloques, %.2fs", table, total, inserted, chunks, seconds)
+    return {"rows": total, "inserted": inserted, "chunks": chunks, "seconds": seconds}
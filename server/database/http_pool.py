@@ -0,0 +1,103 @@
+"""
+Cliente httpx compartido para las llamadas a Supabase (PostgREST).
+
+Un único httpx.Client para todo el proceso: las conexiones quedan abiertas (keep-alive) y se
+reutilizan entre peticiones, así que el handshake TCP + TLS solo se paga al abrir una conexión y no
+en cada inserción. El pool está acotado (max_connections) y con HTTP/2 las peticiones concurrentes
+se multiplexan sobre la misma conexión. Los certificados se indican de forma explícita (certifi o
+SUPABASE_CA_BUNDLE) en vez de depender de SSL_CERT_FILE del entorno.
+"""
+import importlib.util
+import logging
+import ssl
+import threading
+
+import certifi
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """
+    Envuelve el transporte de red: cuenta las peticiones en curso y expone el estado del pool de conexiones
+    """
+
+    def __init__(self, transport, max_connections, http2=False):
+        self.transport = transport
+        self.max_connections = max_connections
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+
+    def handle_request(self, request):
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return self.transport.handle_request(request)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def close(self):
+        self.transport.close()
+
+    def stats(self):
+        # Conexiones del pool de httpcore (en uso o esperando con keep-alive); 0 con otros transportes
+        connections = list(getattr(getattr(self.transport, "_pool", None), "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "requests": self.requests,
+            "errors": self.errors
+        }
+
+
+def http2_available():
+    return importlib.util.find_spec("h2") is not None
+
+
+def ssl_context(ca_bundle=""):
+    return ssl.create_default_context(cafile=ca_bundle or certifi.where())
+
+
+def create_http_client(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0,
+                       connect_timeout=5.0, timeout=30.0, http2=True, ca_bundle="", transport=None):
+    """
+    httpx.Client con pool acotado y keep-alive. Devuelve (cliente, transporte instrumentado).
+    transport permite sustituir el transporte de red (p. ej. httpx.MockTransport en los tests).
+    """
+    if http2 and not http2_available():
+        logger.warning("⚠️ HTTP2_ENABLED sin el paquete h2 instalado: se usa HTTP/1.1")
+        http2 = False
+
+    max_connections = max(1, int(max_connections))
+    limits = httpx.Limits(max_connections=max_connections,
+                          max_keepalive_connections=max(0, min(int(max_keepalive_connections), max_connections)),
+                          keepalive_expiry=keepalive_expiry)
+    if transport is None:
+        transport = httpx.HTTPTransport(http2=http2, limits=limits, verify=ssl_context(ca_bundle))
+    instrumented = InstrumentedTransport(transport, max_connections, http2=http2)
+    client = httpx.Client(
+        transport=instrumented,
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        follow_redirects=True
+    )
+    logger.info("🔗 Cliente HTTP compartido: %d conexiones máx., %d keep-alive (%.0fs), HTTP/2 %s",
+                max_connections, limits.max_keepalive_connections, keepalive_expiry, "sí" if http2 else "no")
+    return client, instrumented
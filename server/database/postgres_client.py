@@ -0,0 +1,188 @@
+import os
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+# Mismo .env que el cliente de Supabase (POSTGRES_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_PORT)
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_VARS = ("POSTGRES_HOST", "POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD")
+
+
+def postgres_settings():
+    """
+    Parámetros de conexión directa a PostgreSQL (la base de datos de Supabase), o None si faltan variables
+    """
+    values = {name: os.environ.get(name) for name in REQUIRED_VARS}
+    if not all(values.values()):
+        return None
+    return {
+        "host": values["POSTGRES_HOST"],
+        "dbname": values["POSTGRES_DB"],
+        "user": values["POSTGRES_USER"],
+        "password": values["POSTGRES_PASSWORD"],
+        "port": int(os.environ.get("POSTGRES_PORT", "5432"))
+    }
+
+
+def is_postgres_configured():
+    return postgres_settings() is not None
+
+
+def get_postgres_connection(**kwargs):
+    """
+    Conexión psycopg2 nueva (la librería se importa aquí: el servidor no la carga si no la usa).
+    Lanza ValueError si faltan variables en el .env.
+    """
+    params = postgres_settings()
+    if params is None:
+        missing = [name for name in REQUIRED_VARS if not os.environ.get(name)]
+        raise ValueError(f"Faltan variables de PostgreSQL en el .env: {', '.join(missing)}")
+
+    import psycopg2
+    conn = psycopg2.connect(**params, **kwargs)
+    logger.debug("🔗 Conexión PostgreSQL abierta con %s:%s", params["host"], params["port"])
+    return conn
+
+
+class PostgresPool:
+    """
+    Pool acotado de conexiones psycopg2 (ThreadedConnectionPool). Con todas las conexiones ocupadas,
+    connection() espera hasta timeout segundos a que se libere una en lugar de fallar al instante.
+    """
+
+    def __init__(self, minconn=1, maxconn=5, timeout=10.0, pool_factory=None, **connect_kwargs):
+        if pool_factory is None:
+            from psycopg2.pool import ThreadedConnectionPool as pool_factory
+        self.minconn = max(0, int(minconn))
+        self.maxconn = max(1, int(maxconn), self.minconn)
+        self.timeout = timeout
+        self._pool = pool_factory(self.minconn, self.maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.discarded = 0
+
+    @contextmanager
+    def connection(self):
+        """
+        Presta una conexión y la devuelve al pool. Si el bloque lanza una excepción se hace rollback;
+        las conexiones cerradas (caída del servidor) se descartan en vez de volver al pool.
+        """
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.waits += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise TimeoutError(f"Sin conexiones libres a PostgreSQL tras {self.timeout}s "
+                                   f"({self.maxconn} en uso)")
+            with self._lock:
+                self.wait_seconds += time.perf_counter() - start
+
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    logger.warning("⚠️ Rollback fallido: la conexión PostgreSQL se descarta")
+                    conn.close()
+            raise
+        finally:
+            discard = bool(conn.closed)
+            if discard:
+                with self._lock:
+                    self.discarded += 1
+            if getattr(self._pool, "closed", False):
+                # Pool cerrado mientras la conexión estaba prestada (parada del servidor)
+                conn.close()
+            else:
+                self._pool.putconn(conn, close=discard)
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def close(self):
+        self._pool.closeall()
+
+    def stats(self):
+        return {
+            "min_connections": self.minconn,
+            "max_connections": self.maxconn,
+            "in_use": self.in_use,
+            # Conexiones abiertas esperando en el pool
+            "idle": len(getattr(self._pool, "_pool", [])),
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "wait_seconds": self.wait_seconds,
+            "timeouts": self.timeouts,
+            "discarded": self.discarded
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_postgres_pool():
+    """
+    Pool compartido del proceso, creado en el primer uso con los límites de settings.
+    Lanza ValueError si faltan variables en el .env.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from server import settings
+
+            params = postgres_settings()
+            if params is None:
+                missing = [name for name in REQUIRED_VARS if not os.environ.get(name)]
+                raise ValueError(f"Faltan variables de PostgreSQL en el .env: {', '.join(missing)}")
+            _pool = PostgresPool(settings.POSTGRES_POOL_MIN, settings.POSTGRES_POOL_MAX,
+                                 timeout=settings.POSTGRES_POOL_TIMEOUT_SECONDS,
+                                 connect_timeout=settings.POSTGRES_CONNECT_TIMEOUT_SECONDS, **params)
+            logger.info("🔗 Pool PostgreSQL con %s:%s (%d-%d conexiones)", params["host"], params["port"],
+                        _pool.minconn, _pool.maxconn)
+        return _pool
+
+
+def postgres_connection():
+    """
+    with postgres_connection() as conn: ... — conexión prestada del pool compartido
+    """
+    return get_postgres_pool().connection()
+
+
+def postgres_pool_stats():
+    """
+    Estado del pool, o None si todavía no se ha creado
+    """
+    return _pool.stats() if _pool is not None else None
+
+
+def close_postgres_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            logger.info("🔌 Pool PostgreSQL cerrado.")
+        _pool = None
@@ -0,0 +1,22 @@
+"""
+Filas de la tabla students a partir de los datos del estudiante y su predicción.
+
+Lo usan la API (server/main.py) y los scripts que escriben en students sin levantar la app
+(backfill_predictions).
+"""
+
+
+def build_student_record(student_dict: dict, prediction_result: dict) -> dict:
+    """
+    Añade a los datos del estudiante la predicción y las probabilidades individuales
+    (columnas que usa el frontend en la tabla students)
+    """
+    probabilities = prediction_result['probabilities']
+    record = dict(student_dict)
+    record['target'] = prediction_result['prediction']
+    record['probability_graduate'] = probabilities.get('Graduate', 0.0)
+    record['probability_dropout'] = probabilities.get('Dropout', 0.0)
+    record['probability_enrolled'] = probabilities.get('Enrolled', 0.0)
+    record['predicted_outcome'] = prediction_result['prediction']  # Campo adicional
+    record['confidence'] = prediction_result['confidence']
+    return record
@@ -0,0 +1,290 @@
+"""
+Spool local de filas que no se pudieron guardar en la base de datos.
+
+Si la escritura diferida agota los reintentos (o su cola está llena), las filas se añaden a un
+fichero local de solo escritura al final: cada registro es su longitud (4 bytes, big-endian)
+seguida del JSON. Los datos se pasan al sistema operativo en cada append y el fsync se agrupa
+(cada fsync_batch_size registros o fsync_interval_ms). Los ficheros se rotan en segmentos
+(spool-000000000001.log, ...).
+
+Un hilo reenvía los segmentos cerrados a la base de datos por lotes cuando vuelve a responder y
+borra cada segmento al terminarlo. Las filas llevan record_id: se escriben con upsert ignorando
+duplicados, así que reenviar un segmento a medias (o dos veces tras una caída) no duplica filas.
+Los segmentos que quedan al parar (o tras una caída del proceso) se reenvían en el siguiente arranque.
+"""
+import json
+import logging
+import os
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct(">I")
+SEGMENT_PREFIX = "spool-"
+SEGMENT_SUFFIX = ".log"
+
+
+def segment_name(sequence):
+    return f"{SEGMENT_PREFIX}{sequence:012d}{SEGMENT_SUFFIX}"
+
+
+def encode_record(record):
+    payload = json.dumps(record, ensure_ascii=False, default=str).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def read_segment(path):
+    """
+    Registros de un segmento y si el final está cortado (escritura interrumpida por una caída:
+    lo que sigue al último registro completo se descarta)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    records = []
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        (length,) = HEADER.unpack_from(data, offset)
+        start, end = offset + HEADER.size, offset + HEADER.size + length
+        if end > len(data):
+            break
+        try:
+            records.append(json.loads(data[start:end].decode("utf-8")))
+        except ValueError:
+            break
+        offset = end
+    return records, offset != len(data)
+
+
+class RecordSpool:
+    """
+    write_batch(filas) guarda una lista de filas (idempotente por id_field) y lanza una excepción si falla
+    """
+
+    def __init__(self, directory, write_batch, name="students", batch_size=500, segment_max_bytes=8 * 1024 * 1024,
+                 fsync_interval_ms=100, fsync_batch_size=100, replay_interval_seconds=5.0, id_field="record_id",
+                 enabled=True):
+        self.directory = directory
+        self.write_batch = write_batch
+        self.name = name
+        self.batch_size = max(1, int(batch_size))
+        self.segment_max_bytes = max(1, int(segment_max_bytes))
+        self.fsync_interval = max(0.0, float(fsync_interval_ms)) / 1000
+        self.fsync_batch_size = max(1, int(fsync_batch_size))
+        self.replay_interval = max(0.01, float(replay_interval_seconds))
+        self.id_field = id_field
+        self.enabled = enabled
+
+        self._lock = threading.Lock()           # Segmento activo
+        self._replay_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._active = None
+        self._active_path = None
+        self._active_bytes = 0
+        self._active_records = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._sequence = None
+        self._worker = None
+        self._stopping = threading.Event()
+
+        self.appended = 0
+        self.replayed = 0
+        self.duplicates_skipped = 0
+        self.replay_failures = 0
+        self.truncated_segments = 0
+        self.last_replay_at = None
+        self.last_error = None
+
+    # ---------------------------
+    # Escritura
+
+    def append(self, records):
+        """
+        Añade filas al segmento activo. Devuelve False si el spool está desactivado o no se pudo escribir.
+        """
+        if not self.enabled or not records:
+            return False
+        data = b"".join(encode_record(record) for record in records)
+        try:
+            with self._lock:
+                if self._active is None:
+                    self._open_segment()
+                self._active.write(data)
+                self._active.flush()
+                self._active_bytes += len(data)
+                self._active_records += len(records)
+                self._unsynced += len(records)
+                self.appended += len(records)
+
+                if self._unsynced >= self.fsync_batch_size or time.monotonic() - self._last_sync >= self.fsync_interval:
+                    self._sync_locked()
+                if self._active_bytes >= self.segment_max_bytes:
+                    self._seal_locked()
+        except OSError as e:
+            logger.error("❌ No se pudieron escribir %d filas en el spool %s: %s", len(records), self.directory, e)
+            self.last_error = str(e)
+            return False
+
+        logger.warning("📥 %d filas de %s guardadas en el spool local para reenviarlas", len(records), self.name)
+        self._ensure_worker()
+        return True
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._sequence is None:
+            existing = [int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for name in self._segment_names()]
+            self._sequence = max(existing, default=0)
+        self._sequence += 1
+        self._active_path = os.path.join(self.directory, segment_name(self._sequence))
+        self._active = open(self._active_path, "ab")
+        self._active_bytes = 0
+        self._active_records = 0
+
+    def _sync_locked(self):
+        if self._active is not None and self._unsynced:
+            os.fsync(self._active.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _seal_locked(self):
+        # El segmento activo pasa a cerrado (ya se puede reenviar); el siguiente append abre otro
+        if self._active is None:
+            return
+        self._sync_locked()
+        self._active.close()
+        self._active = None
+        self._active_path = None
+        self._active_records = 0
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    # ---------------------------
+    # Reenvío
+
+    def _segment_names(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+    def _sealed_segments(self):
+        return [os.path.join(self.directory, name) for name in self._segment_names()
+                if os.path.join(self.directory, name) != self._active_path]
+
+    def replay_once(self):
+        """
+        Reenvía los segmentos cerrados y, si todos se guardaron, también el activo.
+        Devuelve True si no quedó nada pendiente.
+        """
+        with self._replay_lock:
+            seen = set()
+            if not self._replay_segments(seen):
+                return False
+            # Con la base de datos respondiendo, lo que haya en el segmento activo también se envía ya
+            with self._lock:
+                if self._active_records:
+                    self._seal_locked()
+            return self._replay_segments(seen)
+
+    def _replay_segments(self, seen):
+        # seen: record_id ya enviados en este reenvío (una fila puede estar en varios segmentos)
+        for path in self._sealed_segments():
+            records, truncated = read_segment(path)
+            if truncated:
+                self.truncated_segments += 1
+                logger.warning("⚠️ Segmento del spool con el final cortado (se ignora el final): %s", path)
+
+            unique = []
+            for record in records:
+                record_id = record.get(self.id_field) if isinstance(record, dict) else None
+                if record_id is not None:
+                    if record_id in seen:
+                        self.duplicates_skipped += 1
+                        continue
+                    seen.add(record_id)
+                unique.append(record)
+
+            try:
+                for start in range(0, len(unique), self.batch_size):
+                    self.write_batch(unique[start:start + self.batch_size])
+            except Exception as e:
+                # Las filas ya enviadas de este segmento se volverán a enviar: el upsert por id las ignora
+                self.replay_failures += 1
+                self.last_error = str(e)
+                logger.warning("⚠️ No se pudo reenviar el spool de %s (se reintentará): %s", self.name, e)
+                return False
+
+            os.remove(path)
+            self.replayed += len(unique)
+            self.last_replay_at = time.time()
+            logger.info("📤 %d filas del spool reenviadas a %s", len(unique), self.name)
+        return True
+
+    # ---------------------------
+    # Hilo de fsync y reenvío
+
+    def start(self):
+        """
+        Arranca el hilo (al arrancar el servidor: reenvía lo que quedó de la ejecución anterior)
+        """
+        if self.enabled:
+            self._ensure_worker(replay_first=True)
+
+    def _ensure_worker(self, replay_first=False):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stopping.clear()
+                self._worker = threading.Thread(target=self._run, args=(replay_first,), name=f"spool-{self.name}",
+                                                daemon=True)
+                self._worker.start()
+
+    def _run(self, replay_first):
+        # Tras un append la base de datos acaba de fallar: el primer reenvío espera un intervalo
+        next_replay = time.monotonic() + (0 if replay_first else self.replay_interval)
+        while not self._stopping.is_set():
+            if time.monotonic() >= next_replay:
+                if self._segment_names():
+                    self.replay_once()
+                next_replay = time.monotonic() + self.replay_interval
+            self.sync()
+            self._stopping.wait(min(self.fsync_interval or self.replay_interval, self.replay_interval))
+
+    def stop(self, timeout=5.0):
+        """
+        fsync y cierre del segmento activo. Lo pendiente se queda en disco para el siguiente arranque.
+        """
+        self._stopping.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+        with self._lock:
+            self._seal_locked()
+
+    def stats(self):
+        names = self._segment_names()
+        pending_bytes = 0
+        for name in names:
+            try:
+                pending_bytes += os.path.getsize(os.path.join(self.directory, name))
+            except OSError:
+                pass    # Reenviado y borrado mientras tanto
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "pending_segments": len(names),
+            "pending_bytes": pending_bytes,
+            "appended": self.appended,
+            "replayed": self.replayed,
+            "duplicates_skipped": self.duplicates_skipped,
+            "replay_failures": self.replay_failures,
+            "truncated_segments": self.truncated_segments,
+            "last_replay_at": self.last_replay_at,
+            "last_error": self.last_error
+        }
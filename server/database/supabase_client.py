@@ -1,37 +1,87 @@
 import os
-from supabase import create_client, Client, ClientOptions
+import logging
+import threading
 from dotenv import load_dotenv
-from httpx import Client as HTTPXClient
 # Cargar variables de entorno exactas a que apunten a un sitio o puede haber problemas al ejecutar uvicorn
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
 
 supabase_url = os.environ.get("SUPABASE_URL")
 supabase_key = os.environ.get("SUPABASE_KEY")
 
-if not supabase_url or not supabase_key:
-    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+logger = logging.getLogger(__name__)
 
-# Hay muchos errores con la librería httpx con supabase ya que está intentando encontrar un certificado SSL y cada vez se está desactivando desde terminal, para evitarlo, se añade esta línea
-# Esto desactiva la verificación SSL
-os.environ.pop("SSL_CERT_FILE", None)
-client_options = ClientOptions(headers={"Authorization": f"Bearer {supabase_key}"})
+# ---------------------------------
+# El cliente se crea la primera vez que se usa: importar este módulo no carga la librería supabase
+# (httpx, gotrue, postgrest...), que es lenta de importar y retrasa el arranque del servidor
+_supabase = None
+_http_client = None
+_http_transport = None
+_client_lock = threading.Lock()
 
-supabase: Client = create_client(supabase_url, supabase_key, options=client_options)
+def get_http_client():
+    """
+    httpx.Client compartido (pool keep-alive acotado, HTTP/2) que usa el cliente de Supabase
+    """
+    global _http_client, _http_transport
+    with _client_lock:
+        if _http_client is None:
+            from server import settings
+            from server.database.http_pool import create_http_client
 
+            _http_client, _http_transport = create_http_client(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+                connect_timeout=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+                timeout=settings.HTTP_TIMEOUT_SECONDS,
+                http2=settings.HTTP2_ENABLED,
+                ca_bundle=settings.SUPABASE_CA_BUNDLE
+            )
+        return _http_client
 
-print("✅ Cliente de Supabase inicializado.")
+def get_supabase_client():
+    global _supabase
+    if _supabase is None:
+        from supabase import create_client, ClientOptions
 
-# ---------------------------------
-# _supabase: Client = None
-
-# def get_supabase_client() -> Client:
-#     global _supabase
-#     if _supabase is None:
-#         os.environ.pop("SSL_CERT_FILE", None)  # Evitar errores de certificado
-#         client_options = ClientOptions(headers={"Authorization": f"Bearer {supabase_key}"})
-#         _supabase = create_client(supabase_url, supabase_key, options=client_options)
-#         print("✅ Cliente de Supabase inicializado.")
-#     return _supabase
+        if not supabase_url or not supabase_key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+
+        # El cliente HTTP compartido lleva sus propios certificados (certifi o SUPABASE_CA_BUNDLE):
+        # ya no hace falta quitar SSL_CERT_FILE del entorno para que httpx no falle al buscarlo
+        client_options = ClientOptions(headers={"Authorization": f"Bearer {supabase_key}"},
+                                       httpx_client=get_http_client())
+        _supabase = create_client(supabase_url, supabase_key, options=client_options)
+        logger.info("✅ Cliente de Supabase inicializado.")
+    return _supabase
+
+def http_pool_stats():
+    """
+    Estado del pool HTTP, o None si todavía no se ha creado el cliente
+    """
+    return _http_transport.stats() if _http_transport is not None else None
+
+def close_http_client():
+    """
+    Cierra las conexiones del pool (al parar el servidor); el siguiente uso crea un cliente nuevo
+    """
+    global _supabase, _http_client, _http_transport
+    with _client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            logger.info("🔌 Cliente HTTP de Supabase cerrado.")
+        _supabase = _http_client = _http_transport = None
+
+
+class LazySupabaseClient:
+    """
+    Se usa igual que el cliente de Supabase (supabase.table(...)); el cliente real se crea en el primer acceso
+    """
+    def __getattr__(self, name):
+        return getattr(get_supabase_client(), name)
+
+
+supabase = LazySupabaseClient()
 
 # import logging
 # logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,233 @@
+"""
+Escritura diferida (write-behind) de filas en la base de datos.
+
+/predict deja la fila en una cola acotada en memoria y responde sin esperar a Supabase. Un hilo
+aparte la vacía en inserciones por lotes: escribe cuando hay batch_size filas o cuando la más
+antigua lleva flush_interval_ms esperando. Si el lote falla se reintenta con espera exponencial;
+al parar el servidor se escribe lo que quede en la cola. Si al parar la base de datos no responde,
+no se reintenta más: el lote en curso y lo que quede en la cola se entregan a on_failure (el spool).
+"""
+import logging
+import queue
+import random
+import threading
+import time
+
+from server.metrics import DB_FLUSH_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """
+    write_batch(filas) inserta una lista de filas y lanza una excepción si no se guardaron.
+    on_failure(filas, error), si se indica, recibe los lotes que agotan los reintentos.
+    """
+
+    def __init__(self, write_batch, name="students", max_queue_size=10000, batch_size=100, flush_interval_ms=200,
+                 max_retries=5, retry_backoff_seconds=0.5, max_backoff_seconds=30.0, enabled=True, on_failure=None):
+        self.write_batch = write_batch
+        self.name = name
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.enabled = enabled
+        self.on_failure = on_failure
+
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue_size)))
+        self._worker = None
+        self._stopping = threading.Event()
+        self._flush_requested = threading.Event()
+        self._start_lock = threading.Lock()
+        # Lote que el hilo está escribiendo: si stop() no puede esperarlo, lo entrega él a on_failure
+        self._in_flight = None
+        self._handoff_lock = threading.Lock()
+        # Error con el que se abandonó la escritura al parar: el resto de la cola ya no se intenta
+        self._abandon_error = None
+        # Filas aceptadas y todavía no escritas (ni descartadas): flush() espera a que lleguen a 0
+        self._unfinished = 0
+        self._idle = threading.Condition()
+
+        self.submitted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.retries = 0
+        self.last_flush_seconds = None
+        self.last_error = None
+
+    def submit(self, record):
+        """
+        Encola una fila sin bloquear. Devuelve False si la escritura diferida está desactivada
+        o la cola está llena (el llamador decide qué hacer con la fila, p. ej. guardarla en el spool).
+        """
+        if not self.enabled:
+            return False
+        self._ensure_worker()
+        with self._idle:
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.rejected += 1
+                return False
+            self._unfinished += 1
+            self.submitted += 1
+        return True
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stopping.clear()
+                self._abandon_error = None
+                self._worker = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                self._flush_requested.clear()
+                continue
+
+            # Completar el lote hasta batch_size o hasta que la primera fila lleve flush_interval esperando
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                urgent = self._stopping.is_set() or self._flush_requested.is_set()
+                remaining = 0 if urgent else deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=min(remaining, 0.05)) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    if remaining <= 0:
+                        break
+            if self._abandon_error is not None:
+                # Parando con la base de datos caída: lo que queda en la cola no se intenta escribir
+                self._hand_over(batch, self._abandon_error)
+                self._finish(len(batch))
+                continue
+            self._write(batch)
+
+    def _write(self, batch):
+        with self._handoff_lock:
+            self._in_flight = batch
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                DB_FLUSH_DURATION.observe(elapsed, table=self.name, outcome="error")
+                self.last_error = str(e)
+                if attempt >= self.max_retries or self._stopping.is_set():
+                    self._give_up(batch, e, attempt + 1)
+                    break
+                # Espera exponencial con jitter: 0.5s, 1s, 2s... (hasta max_backoff_seconds)
+                backoff = min(self.max_backoff_seconds, self.retry_backoff_seconds * 2 ** attempt)
+                backoff *= random.uniform(0.5, 1.0)
+                logger.warning("⚠️ Error guardando %d filas en %s (intento %d), reintento en %.2fs: %s",
+                               len(batch), self.name, attempt + 1, backoff, e)
+                self.retries += 1
+                attempt += 1
+                # stop() interrumpe la espera: al parar no se reintenta
+                if self._stopping.wait(backoff):
+                    self._give_up(batch, e, attempt)
+                    break
+                continue
+
+            elapsed = time.perf_counter() - start
+            DB_FLUSH_DURATION.observe(elapsed, table=self.name, outcome="ok")
+            self.written += len(batch)
+            self.flushes += 1
+            self.last_flush_seconds = elapsed
+            logger.debug("💾 %d filas guardadas en %s en %.3fs", len(batch), self.name, elapsed)
+            break
+
+        with self._handoff_lock:
+            if self._in_flight is batch:
+                self._in_flight = None
+        self._finish(len(batch))
+
+    def _give_up(self, batch, error, attempts):
+        with self._handoff_lock:
+            if self._in_flight is not batch:
+                # stop() no pudo esperar a este lote y ya lo entregó a on_failure
+                return
+            self._in_flight = None
+        if self._stopping.is_set():
+            self._abandon_error = error
+        logger.error("❌ No se pudieron guardar %d filas en %s tras %d intentos: %s",
+                     len(batch), self.name, attempts, error)
+        self._hand_over(batch, error)
+
+    def _hand_over(self, rows, error):
+        self.failed += len(rows)
+        if self.on_failure is not None:
+            self.on_failure(rows, error)
+        else:
+            logger.warning("⚠️ Se pierden %d filas de %s: %s", len(rows), self.name, error)
+
+    def _finish(self, n_rows):
+        with self._idle:
+            self._unfinished -= n_rows
+            if self._unfinished == 0:
+                self._idle.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Escribe ya lo encolado (sin esperar a flush_interval) y espera a que termine.
+        Devuelve False si no terminó en timeout segundos.
+        """
+        with self._idle:
+            if self._unfinished == 0:
+                return True
+            self._flush_requested.set()
+            return self._idle.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def stop(self, timeout=10.0):
+        """
+        Vacía la cola (lo pendiente se escribe) y para el hilo. Si un lote falla al parar no se reintenta:
+        ese lote y el resto de la cola van a on_failure. Si en timeout segundos el hilo no ha terminado
+        (escritura colgada), el lote en curso y lo encolado se entregan a on_failure desde aquí.
+        """
+        self._stopping.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            if self._worker.is_alive():
+                with self._handoff_lock:
+                    rows, self._in_flight = list(self._in_flight or []), None
+                queued = []
+                while True:
+                    try:
+                        queued.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if rows or queued:
+                    logger.warning("⚠️ La escritura en %s no terminó en %.1fs al parar: %d filas a on_failure",
+                                   self.name, timeout, len(rows) + len(queued))
+                    self._hand_over(rows + queued, TimeoutError(f"escritura en {self.name} sin terminar al parar"))
+                self._finish(len(queued))
+            self._worker = None
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize(),
+            "max_queue_size": self._queue.maxsize,
+            "unfinished": self._unfinished,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "retries": self.retries,
+            "last_flush_seconds": self.last_flush_seconds,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,177 @@
+"""
+Logging del servidor: niveles, muestreo por petición, una línea JSON por evento y escritura asíncrona.
+
+Todos los loggers cuelgan de "server" (logging.getLogger(__name__) en cada módulo). Los registros
+se encolan con un QueueHandler y un QueueListener los formatea y escribe en stdout desde su propio
+hilo, así formatear y escribir no ocurre en el camino de la petición. Si la cola se llena, los
+registros se descartan (y se cuentan) en lugar de bloquear la petición.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+
+from server import settings
+
+# Contexto de la petición en curso: id y si sus registros INFO/DEBUG se muestrean (se escriben)
+_request_id = contextvars.ContextVar("request_id", default=None)
+_request_sampled = contextvars.ContextVar("request_sampled", default=True)
+
+_listener = None
+_queue_handler = None
+
+prediction_logger = logging.getLogger("server.predictions")
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Una línea JSON por registro: ts, level, logger, message, request_id y los campos de extra={"fields": {...}}
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + json.dumps(fields, ensure_ascii=False, default=str)
+        return line
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Añade el request_id de la petición en curso y descarta los registros INFO/DEBUG de las
+    peticiones no muestreadas (WARNING y superiores se escriben siempre)
+    """
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return record.levelno >= logging.WARNING or _request_sampled.get()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo de la petición y que, con la cola llena, descarta el registro
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # El listener está en el mismo proceso: el registro se encola tal cual y el mensaje (msg % args)
+        # y la traza de la excepción se formatean en su hilo. Los argumentos se leen al escribir la línea.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=None, log_format=None, stream=None):
+    """
+    Configura el logger "server" (idempotente). Por defecto usa LOG_LEVEL y LOG_FORMAT de settings.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if (log_format or settings.LOG_FORMAT) == "json" else TextFormatter())
+
+    server_logger = logging.getLogger("server")
+    server_logger.setLevel((level or settings.LOG_LEVEL).upper())
+    server_logger.propagate = False
+    _start_queue(output)
+
+
+def _start_queue(output):
+    global _listener, _queue_handler
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=max(1, settings.LOG_QUEUE_MAX_SIZE)))
+    _queue_handler.addFilter(RequestContextFilter())
+    logging.getLogger("server").addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # Un proceso hijo (p. ej. los workers del pool en modo process) no hereda el hilo del
+    # listener: se crean una cola y un listener nuevos que escriben en la misma salida
+    if _listener is None:
+        return
+    output = _listener.handlers[0]
+    logging.getLogger("server").removeHandler(_queue_handler)
+    _start_queue(output)
+
+
+def shutdown_logging():
+    """
+    Escribe los registros pendientes y quita el handler (se vuelve a configurar con setup_logging)
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger("server").removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+
+
+# Al salir del proceso se escriben los registros que queden en la cola
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def begin_request(request_id=None):
+    """
+    Abre el contexto de logging de una petición: le asigna un id y decide (con LOG_SAMPLE_RATE)
+    si sus registros INFO/DEBUG se escriben. Devuelve el id.
+    """
+    request_id = request_id or uuid.uuid4().hex[:12]
+    _request_id.set(request_id)
+    _request_sampled.set(settings.LOG_SAMPLE_RATE >= 1 or random.random() < settings.LOG_SAMPLE_RATE)
+    return request_id
+
+
+def log_prediction(**fields):
+    """
+    Una línea estructurada por predicción (event="prediction"), sujeta al muestreo de la petición
+    """
+    if prediction_logger.isEnabledFor(logging.INFO):
+        prediction_logger.info("prediction", extra={"fields": {"event": "prediction", **fields}})
+
+
+def stats():
+    return {
+        "level": logging.getLevelName(logging.getLogger("server").level),
+        "sample_rate": settings.LOG_SAMPLE_RATE,
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0
+    }
@@ -1,15 +1,37 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Body, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Literal, Dict, Optional
-from server.models.predictor import predict_student_outcome_with_probabilities  # ✅ Nueva función
-from .database.supabase_client import supabase
+from pydantic import BaseModel, ValidationError
+from typing import Literal, Dict, Optional, List, Any
+from server.models.predictor import predict_students_cached, prediction_cache, configure_process_worker, process_worker_state, export_process_worker_state, remove_process_worker_state, worker_model_stats, collect_worker_stats, merge_worker_stats, forget_worker_stats, reload_model, rollback_model, model_versions, load_model, warm_up, is_model_loaded, get_active_model, self_test, explain_students_cached, explanation_cache, predict_students_with_model, model_registry
+from server.models.batching import MicroBatcher
+from server.models.shadow import ShadowScorer
+from server.models.inference_pool import InferencePool, available_cpus, set_cpu_affinity
+from fastapi.concurrency import run_in_threadpool
+from server import settings
+from server.logging_setup import setup_logging, shutdown_logging, begin_request, log_prediction
+from server.logging_setup import stats as logging_stats
+from server import metrics
+from server.metrics import ENDPOINT_STAGE_DURATION, REQUEST_DURATION
+from .database.supabase_client import close_http_client, http_pool_stats, supabase
+from .database.write_behind import WriteBehindQueue
+from .database.spool import RecordSpool
+from .database.bulk_writer import copy_rows
+from .database.records import build_student_record
+from .database.postgres_client import close_postgres_pool, is_postgres_configured, postgres_connection, postgres_pool_stats
 from server.models.preprocessing import PreprocessingPipeline
 from server.models.schemas import StudentInput
 
 import os
+import time
+import asyncio
+import functools
+import logging
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
@@ -21,8 +43,9 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import os
-print("SSL_CERT_FILE:", os.environ.get("SSL_CERT_FILE"))
+# ✅ LOGGING: niveles, muestreo por petición y una línea JSON por predicción, escrito desde un hilo aparte
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # ✅ RESPONSE MODEL ACTUALIZADO CON PROBABILIDADES
 class PredictionResponse(BaseModel):
@@ -31,6 +54,41 @@ class PredictionResponse(BaseModel):
     confidence: float                # ✅ Confianza (probabilidad máxima)
     message: str
     model_type: Optional[str] = "XGBoost"  # ✅ Tipo de modelo
+    mode: Literal["full", "fast"] = "full"  # "fast": solo las primeras iteraciones del modelo
+
+# ✅ RESPONSE MODELS PARA PREDICCIÓN POR LOTES
+class BatchPredictionItem(BaseModel):
+    index: int                                      # Posición en la lista de entrada
+    prediction: Optional[str] = None
+    probabilities: Optional[Dict[str, float]] = None
+    confidence: Optional[float] = None
+    errors: Optional[List[Dict[str, Any]]] = None   # Errores de validación de esta fila
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionItem]
+    total: int
+    successful: int
+    failed: int
+    message: str
+    model_type: Optional[str] = "XGBoost"
+    mode: Literal["full", "fast"] = "full"
+
+# ✅ RESPONSE MODELS PARA EXPLICACIONES (contribución de cada campo, pred_contribs de XGBoost)
+class ExplanationItem(BaseModel):
+    index: int
+    prediction: Optional[str] = None
+    probabilities: Optional[Dict[str, float]] = None
+    base_values: Optional[Dict[str, float]] = None                  # Clase → valor base (log-odds)
+    contributions: Optional[Dict[str, Dict[str, float]]] = None     # Clase → campo → contribución (log-odds)
+    top_factors: Optional[List[Dict[str, Any]]] = None              # Campos con más peso en la clase predicha
+    errors: Optional[List[Dict[str, Any]]] = None
+
+class ExplanationResponse(BaseModel):
+    results: List[ExplanationItem]
+    total: int
+    successful: int
+    failed: int
+    message: str
 
 class StudentData(BaseModel):
     curricular_units_1st_sem_grade: float
@@ -58,10 +116,277 @@ class StudentData(BaseModel):
     probability_enrolled: Optional[float] = None
     predicted_outcome: Optional[str] = None
     confidence: Optional[float] = None
+    record_id: Optional[str] = None     # UUID único: los reintentos y el spool no duplican filas
+
+# ✅ INFERENCIA FUERA DEL EVENT LOOP: el modelo se ejecuta en un pool acotado de hilos o de procesos
+# (en modo process los workers salen de un forkserver que precarga el modelo activo; tras una recarga o un
+# rollback el pool reinicia el forkserver con el modelo nuevo y los workers lo siguen compartiendo)
+inference_pool = InferencePool(
+    max_workers=settings.INFERENCE_POOL_SIZE,
+    mode=settings.INFERENCE_POOL_MODE,
+    initializer=configure_process_worker if settings.INFERENCE_POOL_MODE == "process" else None,
+    initargs_provider=(lambda: (None, process_worker_state())) if settings.INFERENCE_POOL_MODE == "process" else None,
+    preload=("server.models.forkserver_preload",),
+    preload_setup=export_process_worker_state if settings.INFERENCE_POOL_MODE == "process" else None,
+    # En modo process la caché, las latencias y las métricas del modelo se actualizan en los workers:
+    # cada resultado trae lo acumulado allí y se suma aquí (/metrics, /models, /model/status)
+    stats_collector=collect_worker_stats,
+    stats_merger=merge_worker_stats
+)
+
+def restart_inference_pool():
+    # Solo en modo process: workers nuevos con el modelo activo; las cachés de los anteriores ya no cuentan
+    inference_pool.restart()
+    forget_worker_stats()
+
+# ✅ MICRO-BATCHING: las peticiones /predict concurrentes se puntúan juntas en una sola llamada al modelo
+# (con caché delante: los perfiles repetidos no llegan al modelo)
+prediction_batcher = MicroBatcher(
+    predict_students_cached,
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS,
+    enabled=settings.MICRO_BATCH_ENABLED,
+    executor=inference_pool
+)
+
+# ✅ MODO RÁPIDO (?mode=fast): mismo micro-batching pero puntuando solo las primeras iteraciones del modelo
+# (un lote no mezcla peticiones rápidas y completas)
+fast_prediction_batcher = MicroBatcher(
+    functools.partial(predict_students_cached, fast=True),
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS,
+    enabled=settings.MICRO_BATCH_ENABLED,
+    executor=inference_pool
+)
+
+# ✅ VARIOS MODELOS (?model=random_forest): un micro-batcher por modelo y modo, creado la primera vez
+model_batchers = {
+    (model_registry.default_name, "full"): prediction_batcher,
+    (model_registry.default_name, "fast"): fast_prediction_batcher
+}
+
+def resolve_model(model_name, mode="full"):
+    """
+    Nombre del modelo pedido (por defecto el XGBoost activo). 404 si no está registrado y 400 si
+    se pide el modo rápido a un modelo que no es XGBoost.
+    """
+    model_name = model_name or model_registry.default_name
+    if model_name not in model_registry.names():
+        raise HTTPException(
+            status_code=404,
+            detail=f"Modelo desconocido: {model_name}. Disponibles: {model_registry.names()}"
+        )
+    if mode == "fast" and model_registry.kind(model_name) != "xgboost":
+        raise HTTPException(status_code=400, detail="El modo rápido solo está disponible para modelos XGBoost")
+    return model_name
+
+def get_prediction_batcher(model_name, mode):
+    batcher = model_batchers.get((model_name, mode))
+    if batcher is None:
+        batcher = model_batchers[(model_name, mode)] = MicroBatcher(
+            functools.partial(predict_students_cached, fast=(mode == "fast"), model_name=model_name),
+            max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS,
+            enabled=settings.MICRO_BATCH_ENABLED,
+            executor=inference_pool
+        )
+    return batcher
+
+# ✅ ESCRITURA DIFERIDA: /predict encola la fila y responde; un hilo la inserta en Supabase por lotes
+def upsert_students(records):
+    # record_id es único: un lote reintentado o reenviado desde el spool no duplica filas
+    return supabase.table("students").upsert(records, on_conflict="record_id", ignore_duplicates=True).execute()
+
+# ✅ SPOOL LOCAL: lo que la base de datos no acepta se guarda en disco y se reenvía cuando responde
+student_spool = RecordSpool(
+    settings.SPOOL_DIR,
+    upsert_students,
+    name="students",
+    batch_size=settings.SPOOL_REPLAY_BATCH_SIZE,
+    segment_max_bytes=settings.SPOOL_SEGMENT_MAX_BYTES,
+    fsync_interval_ms=settings.SPOOL_FSYNC_INTERVAL_MS,
+    fsync_batch_size=settings.SPOOL_FSYNC_BATCH_SIZE,
+    replay_interval_seconds=settings.SPOOL_REPLAY_INTERVAL_SECONDS,
+    enabled=settings.SPOOL_ENABLED
+)
+
+def spool_student_records(records, error=None):
+    if not student_spool.append(records):
+        logger.error("❌ Se pierden %d filas de students (spool desactivado o sin escribir): %s", len(records), error)
+        return False
+    return True
+
+student_writer = WriteBehindQueue(
+    upsert_students,
+    name="students",
+    max_queue_size=settings.WRITE_BEHIND_QUEUE_MAX_SIZE,
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval_ms=settings.WRITE_BEHIND_FLUSH_INTERVAL_MS,
+    max_retries=settings.WRITE_BEHIND_MAX_RETRIES,
+    retry_backoff_seconds=settings.WRITE_BEHIND_RETRY_BACKOFF_SECONDS,
+    enabled=settings.WRITE_BEHIND_ENABLED,
+    on_failure=spool_student_records
+)
+
+# ✅ COPY: los lotes grandes de /predict/batch se cargan por una conexión directa a PostgreSQL
+def use_bulk_copy(n_rows):
+    return bool(settings.BULK_COPY_MIN_ROWS) and n_rows >= settings.BULK_COPY_MIN_ROWS and is_postgres_configured()
+
+def copy_students(records):
+    # Conexión prestada del pool: sin abrir una conexión (y su handshake TLS) por lote
+    with postgres_connection() as conn:
+        return copy_rows(conn, records, chunk_size=settings.BULK_COPY_CHUNK_SIZE)
+
+async def save_student_record(record):
+    """
+    Guarda una fila de /predict. Devuelve "queued" (escritura diferida), "saved" (inserción directa),
+    "spooled" (en el spool local, se reenviará) o "failed".
+    """
+    if student_writer.submit(record):
+        return "queued"
+    if student_writer.enabled:
+        # Cola llena: la base de datos no da abasto, al spool sin esperarla
+        return "spooled" if await run_in_threadpool(spool_student_records, [record]) else "failed"
+
+    # Sin escritura diferida: inserción directa. El cliente de Supabase es síncrono: se ejecuta en
+    # un hilo para no bloquear el event loop
+    try:
+        response = await run_in_threadpool(upsert_students, [record])
+        if response.data:
+            logger.debug("✅ Datos guardados en Supabase: ID %s", response.data[0].get('id', 'N/A'))
+            return "saved"
+        error = f"respuesta sin datos: {response}"
+    except Exception as db_error:
+        error = db_error
+    logger.warning("⚠️ Error al guardar en Supabase: %s", error)
+    return "spooled" if await run_in_threadpool(spool_student_records, [record], error) else "failed"
+
+SAVE_MESSAGES = {
+    "queued": "y datos en cola de guardado ✅",
+    "saved": "y datos guardados ✅",
+    "spooled": "y datos pendientes de guardar (la base de datos no responde, se reenviarán) ⚠️",
+    "failed": "pero error al guardar en BD ⚠️"
+}
+
+# ✅ MODELO EN SOMBRA (SHADOW_MODEL): copia de las entradas de /predict puntuada en segundo plano con el
+# candidato para comparar sus predicciones con las servidas (la petición solo encola, sin esperar)
+def create_shadow_scorer():
+    shadow_model = settings.SHADOW_MODEL
+    enabled = bool(shadow_model)
+    if shadow_model and (shadow_model not in model_registry.names() or shadow_model == model_registry.default_name):
+        logger.warning("⚠️ SHADOW_MODEL=%s no es un modelo adicional del registro (%s): puntuación en sombra desactivada",
+                       shadow_model, model_registry.names())
+        enabled = False
+    return ShadowScorer(
+        functools.partial(predict_students_with_model, model_name=shadow_model),
+        model_name=shadow_model or None,
+        max_queue_size=settings.SHADOW_QUEUE_MAX_SIZE,
+        batch_size=settings.SHADOW_BATCH_SIZE,
+        enabled=enabled
+    )
+
+shadow_scorer = create_shadow_scorer()
+
+# ✅ ARRANQUE RÁPIDO: importar este módulo no carga el modelo ni las librerías pesadas (xgboost, pandas,
+# supabase). El modelo se carga en segundo plano al arrancar y /readyz indica cuándo está listo.
+class StartupState:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.ready = False
+        self.error = None
+        self.model_load_seconds = None
+        # Resultado de la última predicción de prueba periódica (None hasta la primera)
+        self.self_test = None
+
+startup_state = StartupState()
+
+def load_and_warm_up_model():
+    warm_up(load_model())
+
+async def load_model_in_background():
+    start = time.perf_counter()
+    try:
+        await run_in_threadpool(load_and_warm_up_model)
+        # En modo process los workers se crean ahora, con el modelo ya cargado
+        await run_in_threadpool(restart_inference_pool)
+    except Exception as e:
+        startup_state.error = str(e)
+        logger.exception("❌ Error cargando el modelo al arrancar")
+        return
+
+    startup_state.model_load_seconds = time.perf_counter() - start
+    startup_state.self_test = await inference_pool.run(run_self_test)
+    startup_state.ready = True
+    logger.info("✅ Modelo listo en %.2fs", startup_state.model_load_seconds)
+
+# ✅ SONDAS BARATAS: /healthz y /readyz responden con el estado en memoria. La predicción de prueba
+# se repite en segundo plano cada SELF_TEST_INTERVAL_SECONDS y las sondas devuelven su último resultado.
+def run_self_test():
+    start = time.perf_counter()
+    try:
+        result = self_test()
+    except Exception as e:
+        logger.warning("⚠️ Falló la predicción de prueba: %s", e)
+        return {"success": False, "error": str(e), "latency_ms": (time.perf_counter() - start) * 1000,
+                "checked_at": time.time()}
+    return {
+        "success": True,
+        "prediction": result['prediction'],
+        "confidence": result['confidence'],
+        "model_version": result['model_version'],
+        "latency_ms": (time.perf_counter() - start) * 1000,
+        "checked_at": time.time()
+    }
+
+async def load_model_and_monitor():
+    await load_model_in_background()
+    if not startup_state.ready:
+        return
+    while True:
+        await asyncio.sleep(settings.SELF_TEST_INTERVAL_SECONDS)
+        startup_state.self_test = await inference_pool.run(run_self_test)
+
+def is_ready():
+    return startup_state.ready and bool(startup_state.self_test and startup_state.self_test['success'])
+
+def apply_cpu_affinity():
+    # Antes de cargar el modelo y de crear los workers: los hilos de XGBoost y los procesos la heredan
+    if not settings.INFERENCE_CPU_AFFINITY:
+        return
+    try:
+        cpus = set_cpu_affinity(settings.INFERENCE_CPU_AFFINITY)
+        logger.info("📌 Afinidad de CPU: %s", cpus)
+    except (OSError, ValueError) as e:
+        logger.warning("⚠️ No se pudo fijar la afinidad de CPU (%s): %s", settings.INFERENCE_CPU_AFFINITY, e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    logger.debug("SSL_CERT_FILE: %s", os.environ.get("SSL_CERT_FILE"))
+    apply_cpu_affinity()
+    # Reenvía lo que quedó en el spool de la ejecución anterior
+    student_spool.start()
+    # El servidor acepta conexiones mientras se carga el modelo; las predicciones que lleguen antes esperan a la carga
+    loading_task = asyncio.create_task(load_model_and_monitor())
+    yield
+    loading_task.cancel()
+    shadow_scorer.stop()
+    # Las filas encoladas se escriben antes de salir; con la base de datos caída no se reintenta y, como lo
+    # que no termina en WRITE_BEHIND_DRAIN_TIMEOUT_SECONDS, van al spool antes de cerrarlo
+    await run_in_threadpool(student_writer.stop, settings.WRITE_BEHIND_DRAIN_TIMEOUT_SECONDS)
+    # Lo que la escritura diferida no pudo guardar ya está en el spool: fsync y cierre
+    student_spool.stop()
+    # Las conexiones compartidas se cierran cuando ya no queda nada por escribir
+    close_http_client()
+    close_postgres_pool()
+    inference_pool.shutdown(wait=False)
+    remove_process_worker_state()
+    shutdown_logging()
 
 app = FastAPI(
     title="API de Predicción Estudiantil con XGBoost",
-    description="API para predecir rendimiento académico usando un modelo entrenado con probabilidades reales."
+    description="API para predecir rendimiento académico usando un modelo entrenado con probabilidades reales.",
+    lifespan=lifespan
 )
 
 # ----------    
@@ -74,37 +399,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_logging_context(request, call_next):
+    # Cada petición tiene su request_id (cabecera X-Request-ID si viene) y su decisión de muestreo
+    request_id = begin_request(request.headers.get("x-request-id"))
+    metrics.mark_request_start()
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+
+    # Ruta como plantilla (/students/{student_id}) para no crear una serie por cada id
+    route = request.scope.get("route")
+    REQUEST_DURATION.observe(
+        metrics.seconds_since_request_start(),
+        method=request.method, path=route.path if route else "unmatched", status=response.status_code
+    )
+    return response
+
 @app.get("/")
 async def root():
     return {"message": "✅ API corriendo. Usa /predict para predicciones con probabilidades reales."}
 
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness: el proceso responde (no toca el modelo)
+    """
+    return {"status": "alive", "uptime_seconds": time.monotonic() - startup_state.started_at}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: 200 cuando el modelo está cargado y la última predicción de prueba fue correcta,
+    503 mientras tanto (o si la carga o la prueba fallaron)
+    """
+    ready = is_ready()
+    body = {
+        "ready": ready,
+        "model_loaded": is_model_loaded(),
+        "model_load_seconds": startup_state.model_load_seconds,
+        "self_test": startup_state.self_test,
+        "error": startup_state.error
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_student(input_data: StudentInput):
+async def predict_student(input_data: StudentInput, mode: Literal["full", "fast"] = "full", model: Optional[str] = None):
     """
     Endpoint para predicción académica con probabilidades reales del modelo XGBoost
     ✅ SOLO MODELO ML - SIN RESPALDO
+    Con ?mode=fast se puntúa con menos árboles (menor latencia, precisión algo menor)
+    Con ?model=<nombre> se usa otro modelo registrado (GET /models)
     """
+    model_name = resolve_model(model, mode)
     try:
-        print(f"\n🎯 Nueva solicitud de predicción:")
-        print(f"   Datos recibidos: {input_data.dict()}")
-        
+        start = time.perf_counter()
+        ENDPOINT_STAGE_DURATION.observe(metrics.seconds_since_request_start(), endpoint="/predict", stage="validation")
+        logger.debug("🎯 Nueva solicitud de predicción: %s", input_data)
+
         # ✅ USAR FUNCIÓN MEJORADA QUE DEVUELVE PROBABILIDADES REALES
         try:
-            print("🔮 Llamando al modelo XGBoost...")
-            prediction_result = predict_student_outcome_with_probabilities(input_data.dict())
-            print(f"✅ Resultado completo del modelo ML: {prediction_result}")
+            with ENDPOINT_STAGE_DURATION.time(endpoint="/predict", stage="model"):
+                prediction_result = await get_prediction_batcher(model_name, mode).submit(input_data.model_dump())
             
             prediction = prediction_result['prediction']
             probabilities = prediction_result['probabilities']
             confidence = prediction_result['confidence']
             model_type = prediction_result.get('model_type', 'XGBoost')
             
-            print(f"🎯 Predicción: {prediction}")
-            print(f"📊 Probabilidades: {probabilities}")
-            print(f"🎯 Confianza: {confidence:.4f}")
-            
         except Exception as predictor_error:
-            print(f"❌ Error crítico en modelo ML: {predictor_error}")
+            logger.exception("❌ Error crítico en modelo ML: %s", predictor_error)
             # ✅ NO HAY RESPALDO - Error directo
             raise HTTPException(
                 status_code=500, 
@@ -129,7 +492,7 @@ async def predict_student(input_data: StudentInput):
         # Verificar que las probabilidades suman aproximadamente 1.0
         prob_sum = sum(probabilities.values())
         if abs(prob_sum - 1.0) > 0.01:
-            print(f"⚠️ ADVERTENCIA: Probabilidades suman {prob_sum:.6f} en lugar de 1.0")
+            logger.warning("⚠️ Probabilidades suman %.6f en lugar de 1.0", prob_sum)
         
         # Verificar que la confianza está en rango válido
         if not (0.0 <= confidence <= 1.0):
@@ -138,74 +501,222 @@ async def predict_student(input_data: StudentInput):
                 detail=f"Confianza inválida: {confidence}. Debe estar entre 0.0 y 1.0"
             )
 
+        # Copia para el modelo en sombra (solo lo servido por el modelo por defecto completo)
+        if model_name == model_registry.default_name and mode == "full":
+            shadow_scorer.submit(input_data.model_dump(), prediction_result)
+
         # ✅ GUARDAR EN SUPABASE CON PROBABILIDADES INDIVIDUALES
         try:
             # Crear datos base del estudiante
-            student_data_dict = input_data.dict()
-            student_data_dict['target'] = prediction
-            
             # ✅ AGREGAR PROBABILIDADES INDIVIDUALES para que el frontend las encuentre
-            student_data_dict['probability_graduate'] = probabilities.get('Graduate', 0.0)
-            student_data_dict['probability_dropout'] = probabilities.get('Dropout', 0.0) 
-            student_data_dict['probability_enrolled'] = probabilities.get('Enrolled', 0.0)
-            student_data_dict['predicted_outcome'] = prediction  # Campo adicional
-            student_data_dict['confidence'] = confidence
-            
-            print(f"💾 Datos para guardar en Supabase:")
-            print(f"   probability_graduate: {student_data_dict['probability_graduate']}")
-            print(f"   probability_dropout: {student_data_dict['probability_dropout']}")
-            print(f"   probability_enrolled: {student_data_dict['probability_enrolled']}")
-            
+            student_data_dict = build_student_record(input_data.model_dump(), prediction_result)
+
+
             # Crear objeto StudentData extendido
-            student_data = StudentData(**student_data_dict)
-            response = supabase.table("students").insert(student_data.model_dump()).execute()
-            
-            if response.data:
-                print(f"✅ Datos guardados en Supabase: ID {response.data[0].get('id', 'N/A')}")
-                success_message = f"Predicción XGBoost realizada (confianza: {confidence:.1%}) y datos guardados ✅"
-            else:
-                print(f"⚠️ Error al guardar en Supabase: {response}")
-                success_message = f"Predicción XGBoost realizada (confianza: {confidence:.1%}) pero error al guardar ⚠️"
+            student_data = StudentData(**student_data_dict, record_id=str(uuid.uuid4()))
+            # Con escritura diferida la etapa db_insert solo mide el encolado
+            with ENDPOINT_STAGE_DURATION.time(endpoint="/predict", stage="db_insert"):
+                saved = await save_student_record(student_data.model_dump())
+            success_message = f"Predicción XGBoost realizada (confianza: {confidence:.1%}) {SAVE_MESSAGES[saved]}"
                 
         except Exception as db_error:
-            print(f"⚠️ Error en base de datos: {db_error}")
+            logger.warning("⚠️ Error en base de datos: %s", db_error)
             success_message = f"Predicción XGBoost realizada (confianza: {confidence:.1%}) pero error al guardar en BD ⚠️"
 
+        log_prediction(
+            endpoint="/predict",
+            mode=mode,
+            model=model_name,
+            prediction=prediction,
+            confidence=round(confidence, 4),
+            probabilities={name: round(value, 4) for name, value in probabilities.items()},
+            model_version=model_registry.get(model_name).version,
+            latency_ms=round((time.perf_counter() - start) * 1000, 2)
+        )
+
         # ✅ RESPUESTA CON PROBABILIDADES REALES
         return PredictionResponse(
             prediction=prediction,
             probabilities=probabilities,
             confidence=confidence,
             message=success_message,
-            model_type=model_type
+            model_type=model_type,
+            mode=mode
         )
             
     except HTTPException:
         # Re-lanzar errores HTTP sin modificar
         raise
     except Exception as e:
-        print(f"❌ Error inesperado en /predict: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error inesperado en /predict: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=f"Error interno del servidor en predicción: {str(e)}"
         )
 
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_students_batch(students: List[Any] = Body(...), mode: Literal["full", "fast"] = "full",
+                                 model: Optional[str] = None):
+    """
+    Predicción para una lista de estudiantes en una sola petición.
+    Cada fila se valida por separado: las inválidas devuelven sus errores y el resto se predice
+    con un único preprocesamiento vectorizado y una sola llamada al modelo XGBoost.
+    """
+    if len(students) > settings.PREDICT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Demasiados estudiantes en el lote: {len(students)}. Máximo: {settings.PREDICT_BATCH_MAX_SIZE}"
+        )
+    model_name = resolve_model(model, mode)
+
+    start = time.perf_counter()
+    logger.debug("📦 Nueva solicitud de predicción por lotes: %d estudiantes", len(students))
+
+    # 1. Validar cada fila por separado
+    results = [BatchPredictionItem(index=i) for i in range(len(students))]
+    valid_indices = []
+    valid_inputs = []
+    for i, raw_student in enumerate(students):
+        try:
+            valid_inputs.append(StudentInput.model_validate(raw_student).model_dump())
+            valid_indices.append(i)
+        except ValidationError as validation_error:
+            results[i].errors = [
+                {"loc": list(error["loc"]), "msg": error["msg"], "type": error["type"]}
+                for error in validation_error.errors()
+            ]
+    # Lectura del JSON + validación fila a fila
+    ENDPOINT_STAGE_DURATION.observe(metrics.seconds_since_request_start(), endpoint="/predict/batch", stage="validation")
+
+    # 2. Una sola pasada de preprocesamiento + modelo para todas las filas válidas
+    try:
+        with ENDPOINT_STAGE_DURATION.time(endpoint="/predict/batch", stage="model"):
+            prediction_results = await inference_pool.run(
+                predict_students_with_model, valid_inputs, model_name=model_name, fast=(mode == "fast")
+            )
+    except Exception as predictor_error:
+        logger.exception("❌ Error crítico en modelo ML (lote): %s", predictor_error)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error en el modelo de predicción XGBoost: {str(predictor_error)}"
+        )
+
+    for i, prediction_result in zip(valid_indices, prediction_results):
+        results[i].prediction = prediction_result['prediction']
+        results[i].probabilities = prediction_result['probabilities']
+        results[i].confidence = prediction_result['confidence']
+
+    # 3. Guardar en Supabase con una sola inserción
+    saved_message = "sin filas válidas que guardar"
+    if valid_inputs:
+        # Fuera del try: si la inserción falla, estas mismas filas van al spool
+        records = [
+            StudentData(**build_student_record(student, prediction_result), record_id=str(uuid.uuid4())).model_dump()
+            for student, prediction_result in zip(valid_inputs, prediction_results)
+        ]
+        error = None
+        try:
+            with ENDPOINT_STAGE_DURATION.time(endpoint="/predict/batch", stage="db_insert"):
+                if use_bulk_copy(len(records)):
+                    await run_in_threadpool(copy_students, records)
+                    saved_message = "datos guardados con COPY ✅"
+                else:
+                    response = await run_in_threadpool(upsert_students, records)
+                    if response.data:
+                        saved_message = "datos guardados ✅"
+                    else:
+                        error = f"respuesta sin datos: {response}"
+        except Exception as db_error:
+            error = db_error
+        if error is not None:
+            logger.warning("⚠️ Error en base de datos (lote): %s", error)
+            # Las filas quedan en el spool local y se reenvían cuando la base de datos responda
+            if await run_in_threadpool(spool_student_records, records, error):
+                saved_message = "datos pendientes de guardar (la base de datos no responde, se reenviarán) ⚠️"
+            else:
+                saved_message = "error al guardar en BD ⚠️"
+
+    failed = len(students) - len(valid_indices)
+    log_prediction(
+        endpoint="/predict/batch",
+        mode=mode,
+        model=model_name,
+        batch_size=len(students),
+        successful=len(valid_indices),
+        failed=failed,
+        predictions=dict(Counter(result['prediction'] for result in prediction_results)),
+        latency_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
+
+    return BatchPredictionResponse(
+        results=results,
+        total=len(students),
+        successful=len(valid_indices),
+        failed=failed,
+        message=f"Predicción por lotes realizada ({len(valid_indices)}/{len(students)}): {saved_message}",
+        model_type=prediction_results[0]['model_type'] if prediction_results else None,
+        mode=mode
+    )
+
+@app.post("/explain", response_model=ExplanationResponse)
+async def explain_students_endpoint(students: List[Any] = Body(...)):
+    """
+    Por qué el modelo predice lo que predice, para una lista de estudiantes: contribución de cada campo
+    de StudentInput (los bloques one-hot se suman en su campo) al margen de cada clase.
+    Las filas se validan por separado, como en /predict/batch. No guarda nada en la base de datos.
+    """
+    if len(students) > settings.EXPLAIN_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Demasiados estudiantes en el lote: {len(students)}. Máximo: {settings.EXPLAIN_BATCH_MAX_SIZE}"
+        )
+
+    results = [ExplanationItem(index=i) for i in range(len(students))]
+    valid_indices = []
+    valid_inputs = []
+    for i, raw_student in enumerate(students):
+        try:
+            valid_inputs.append(StudentInput.model_validate(raw_student).model_dump())
+            valid_indices.append(i)
+        except ValidationError as validation_error:
+            results[i].errors = [
+                {"loc": list(error["loc"]), "msg": error["msg"], "type": error["type"]}
+                for error in validation_error.errors()
+            ]
+    ENDPOINT_STAGE_DURATION.observe(metrics.seconds_since_request_start(), endpoint="/explain", stage="validation")
+
+    # Fuera del micro-batcher de /predict: las explicaciones no retrasan las predicciones normales
+    try:
+        with ENDPOINT_STAGE_DURATION.time(endpoint="/explain", stage="model"):
+            explanations = await inference_pool.run(explain_students_cached, valid_inputs) if valid_inputs else []
+    except Exception as explain_error:
+        logger.exception("❌ Error calculando explicaciones: %s", explain_error)
+        raise HTTPException(status_code=500, detail=f"Error calculando explicaciones: {str(explain_error)}")
+
+    for i, explanation in zip(valid_indices, explanations):
+        results[i] = ExplanationItem(index=i, **explanation)
+
+    return ExplanationResponse(
+        results=results,
+        total=len(students),
+        successful=len(valid_indices),
+        failed=len(students) - len(valid_indices),
+        message=f"Explicaciones calculadas ({len(valid_indices)}/{len(students)})"
+    )
+
 @app.get("/students")
 async def get_students():
     """
     Endpoint para obtener todos los estudiantes/predicciones guardadas
     """
     try:
-        print("📋 Obteniendo lista de estudiantes...")
-        response = supabase.table("students").select("*").execute()
+        response = await run_in_threadpool(supabase.table("students").select("*").execute)
         
         if response.data:
-            print(f"✅ Obtenidos {len(response.data)} registros de estudiantes")
+            logger.debug("✅ Obtenidos %d registros de estudiantes", len(response.data))
             return response.data
         else:
-            print("⚠️ No se encontraron estudiantes en la base de datos")
+            logger.info("⚠️ No se encontraron estudiantes en la base de datos")
             raise HTTPException(
                 status_code=404, 
                 detail="No se encontraron registros de estudiantes"
@@ -215,9 +726,7 @@ async def get_students():
         # Re-lanzar errores HTTP
         raise
     except Exception as e:
-        print(f"❌ Error obteniendo estudiantes: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error obteniendo estudiantes: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=f"Error interno al obtener estudiantes: {str(e)}"
@@ -229,26 +738,31 @@ async def update_student(
     input_data: StudentInput
 ):
     try:
-        print(f"\n🔧 Actualizando estudiante ID: {student_id}")
-        
+        start = time.perf_counter()
+        ENDPOINT_STAGE_DURATION.observe(metrics.seconds_since_request_start(), endpoint="/students/{student_id}", stage="validation")
+        logger.debug("🔧 Actualizando estudiante ID: %s", student_id)
+
         # Generar nueva predicción con los datos actualizados
-        print("🔮 Generando nueva predicción...")
-        prediction_result = predict_student_outcome_with_probabilities(input_data.dict())
+        with ENDPOINT_STAGE_DURATION.time(endpoint="/students/{student_id}", stage="model"):
+            prediction_result = await prediction_batcher.submit(input_data.model_dump())
+        log_prediction(
+            endpoint="/students/{student_id}",
+            student_id=student_id,
+            prediction=prediction_result['prediction'],
+            confidence=round(prediction_result['confidence'], 4),
+            model_version=get_active_model().version,
+            latency_ms=round((time.perf_counter() - start) * 1000, 2)
+        )
         
         # Preparar datos completos para actualizar
-        update_data = input_data.dict()
-        update_data['target'] = prediction_result['prediction']
-        update_data['probability_graduate'] = prediction_result['probabilities'].get('Graduate', 0.0)
-        update_data['probability_dropout'] = prediction_result['probabilities'].get('Dropout', 0.0)
-        update_data['probability_enrolled'] = prediction_result['probabilities'].get('Enrolled', 0.0)
-        update_data['predicted_outcome'] = prediction_result['prediction']
-        update_data['confidence'] = prediction_result['confidence']
+        update_data = build_student_record(input_data.model_dump(), prediction_result)
         
         # Actualizar en Supabase
-        response = supabase.table("students").update(update_data).eq("id", student_id).execute()
+        with ENDPOINT_STAGE_DURATION.time(endpoint="/students/{student_id}", stage="db_update"):
+            response = await run_in_threadpool(supabase.table("students").update(update_data).eq("id", student_id).execute)
 
         if response.data and len(response.data) > 0:
-            print("✅ Actualización exitosa")
+            logger.debug("✅ Actualización exitosa")
             return {
                 "message": f"Predicción actualizada correctamente",
                 "updated": response.data[0]
@@ -257,72 +771,197 @@ async def update_student(
             raise HTTPException(status_code=404, detail="Estudiante no encontrado")
 
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.exception("❌ Error actualizando estudiante %s: %s", student_id, e)
         raise HTTPException(status_code=500, detail=f"Error al actualizar: {str(e)}")
 
+# ✅ RECARGA EN CALIENTE DEL MODELO (sin reiniciar el servidor)
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if settings.ADMIN_TOKEN and x_admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Token de administración no válido")
+
+@app.post("/model/reload", dependencies=[Depends(require_admin_token)])
+async def reload_model_endpoint():
+    """
+    Carga de disco los artefactos del modelo, los calienta y los activa sin cortar las peticiones en curso
+    """
+    try:
+        # Se carga en el proceso principal (no en el pool): después se recrean los workers, que lo reciben al arrancar
+        result = await run_in_threadpool(reload_model)
+    except Exception as e:
+        logger.exception("❌ Error recargando el modelo: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error recargando el modelo (se mantiene el actual): {str(e)}")
+
+    if result["reloaded"]:
+        await run_in_threadpool(restart_inference_pool)
+    return {**result, "message": "Modelo recargado" if result["reloaded"] else "El modelo ya estaba actualizado"}
+
+@app.post("/model/rollback", dependencies=[Depends(require_admin_token)])
+async def rollback_model_endpoint():
+    """
+    Vuelve a la versión anterior del modelo
+    """
+    try:
+        result = await run_in_threadpool(rollback_model)
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    await run_in_threadpool(restart_inference_pool)
+    return {**result, "message": "Rollback completado"}
+
 # ✅ ENDPOINT ADICIONAL PARA VERIFICAR ESTADO DEL MODELO
+# ✅ MÉTRICAS PROMETHEUS: duración por etapa (histogramas) + estado del modelo, caché, micro-batching y pool
+MICRO_BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+def collect_service_metrics():
+    cache = prediction_cache.stats()
+    batching = prediction_batcher.stats()
+    collected = [
+        metrics.single_value("student_model_ready", "gauge", "1 si el modelo está cargado y pasa la predicción de prueba", int(is_ready())),
+        metrics.single_value("student_prediction_cache_hits_total", "counter", "Aciertos de la caché de predicciones", cache["hits"]),
+        metrics.single_value("student_prediction_cache_misses_total", "counter", "Fallos de la caché de predicciones", cache["misses"]),
+        metrics.single_value("student_prediction_cache_evictions_total", "counter", "Entradas expulsadas por tamaño (LRU)", cache["evictions"]),
+        metrics.single_value("student_prediction_cache_expirations_total", "counter", "Entradas caducadas por TTL", cache["expirations"]),
+        metrics.single_value("student_prediction_cache_size", "gauge", "Entradas en la caché de predicciones", cache["size"]),
+        metrics.single_value("student_micro_batch_requests_total", "counter", "Peticiones puntuadas por el micro-batcher", batching["requests_total"]),
+        metrics.single_value("student_micro_batch_batches_total", "counter", "Lotes enviados al modelo por el micro-batcher", batching["batches_total"]),
+        metrics.single_value("student_micro_batch_pending", "gauge", "Peticiones esperando lote", batching["pending"]),
+        metrics.histogram_from_counts("student_micro_batch_size", "Tamaño de los lotes del micro-batcher",
+                                      prediction_batcher.batch_size_histogram, MICRO_BATCH_SIZE_BUCKETS),
+        metrics.single_value("student_inference_pool_workers", "gauge", "Workers del pool de inferencia",
+                             inference_pool.max_workers, {"mode": inference_pool.mode}),
+        metrics.single_value("student_log_records_dropped_total", "counter", "Registros de log descartados con la cola llena",
+                             logging_stats()["dropped"])
+    ]
+    if student_writer.enabled:
+        writer = student_writer.stats()
+        labels = {"table": student_writer.name}
+        collected += [
+            metrics.single_value("student_db_write_queue_size", "gauge", "Filas esperando a la escritura diferida", writer["queued"], labels),
+            metrics.single_value("student_db_write_queue_capacity", "gauge", "Tamaño máximo de la cola de escritura diferida", writer["max_queue_size"], labels),
+            metrics.single_value("student_db_rows_written_total", "counter", "Filas guardadas por la escritura diferida", writer["written"], labels),
+            metrics.single_value("student_db_rows_failed_total", "counter", "Filas que agotaron los reintentos", writer["failed"], labels),
+            metrics.single_value("student_db_rows_rejected_total", "counter", "Filas que no entraron en la cola llena (van al spool local)", writer["rejected"], labels),
+            metrics.single_value("student_db_flush_retries_total", "counter", "Reintentos de lotes fallidos", writer["retries"], labels)
+        ]
+    if student_spool.enabled:
+        spool = student_spool.stats()
+        labels = {"table": student_spool.name}
+        collected += [
+            metrics.single_value("student_spool_pending_bytes", "gauge", "Bytes en el spool local pendientes de reenviar", spool["pending_bytes"], labels),
+            metrics.single_value("student_spool_pending_segments", "gauge", "Segmentos del spool pendientes de reenviar", spool["pending_segments"], labels),
+            metrics.single_value("student_spool_appended_total", "counter", "Filas escritas en el spool local", spool["appended"], labels),
+            metrics.single_value("student_spool_replayed_total", "counter", "Filas del spool reenviadas a la base de datos", spool["replayed"], labels),
+            metrics.single_value("student_spool_replay_failures_total", "counter", "Reenvíos del spool fallidos", spool["replay_failures"], labels)
+        ]
+    http_pool = http_pool_stats()
+    if http_pool is not None:
+        collected += [
+            ("student_http_pool_connections", "gauge", "Conexiones HTTP abiertas con Supabase", [
+                ("student_http_pool_connections", {"state": "active"}, http_pool["active_connections"]),
+                ("student_http_pool_connections", {"state": "idle"}, http_pool["idle_connections"])
+            ]),
+            metrics.single_value("student_http_pool_max_connections", "gauge", "Límite de conexiones HTTP con Supabase", http_pool["max_connections"]),
+            metrics.single_value("student_http_requests_in_flight", "gauge", "Peticiones HTTP a Supabase en curso", http_pool["in_flight"]),
+            metrics.single_value("student_http_requests_total", "counter", "Peticiones HTTP a Supabase", http_pool["requests"]),
+            metrics.single_value("student_http_request_errors_total", "counter", "Peticiones HTTP a Supabase sin respuesta", http_pool["errors"])
+        ]
+    postgres_pool = postgres_pool_stats()
+    if postgres_pool is not None:
+        collected += [
+            ("student_postgres_pool_connections", "gauge", "Conexiones PostgreSQL del pool", [
+                ("student_postgres_pool_connections", {"state": "in_use"}, postgres_pool["in_use"]),
+                ("student_postgres_pool_connections", {"state": "idle"}, postgres_pool["idle"])
+            ]),
+            metrics.single_value("student_postgres_pool_max_connections", "gauge", "Límite de conexiones PostgreSQL", postgres_pool["max_connections"]),
+            metrics.single_value("student_postgres_pool_waits_total", "counter", "Préstamos que esperaron a una conexión libre", postgres_pool["waits"]),
+            metrics.single_value("student_postgres_pool_wait_seconds_total", "counter", "Segundos esperando una conexión libre", postgres_pool["wait_seconds"]),
+            metrics.single_value("student_postgres_pool_timeouts_total", "counter", "Préstamos sin conexión libre a tiempo", postgres_pool["timeouts"])
+        ]
+    if shadow_scorer.enabled:
+        shadow = shadow_scorer.stats()
+        labels = {"model": shadow["model"]}
+        collected += [
+            metrics.single_value("student_shadow_submitted_total", "counter", "Predicciones copiadas al modelo en sombra", shadow["submitted"], labels),
+            metrics.single_value("student_shadow_dropped_total", "counter", "Copias descartadas con la cola de sombra llena", shadow["dropped"], labels),
+            metrics.single_value("student_shadow_scored_total", "counter", "Predicciones puntuadas por el modelo en sombra", shadow["scored"], labels),
+            metrics.single_value("student_shadow_errors_total", "counter", "Predicciones en sombra fallidas", shadow["errors"], labels),
+            metrics.single_value("student_shadow_queue_size", "gauge", "Copias esperando al modelo en sombra", shadow["queued"], labels)
+        ]
+        if shadow["agreement_rate"] is not None:
+            collected.append(metrics.single_value("student_shadow_agreement_ratio", "gauge",
+                                                  "Fracción de predicciones en sombra con la misma clase", shadow["agreement_rate"], labels))
+    if startup_state.self_test is not None:
+        collected.append(metrics.single_value("student_model_self_test_latency_seconds", "gauge",
+                                              "Duración de la última predicción de prueba",
+                                              startup_state.self_test['latency_ms'] / 1000))
+    if is_model_loaded():
+        collected.append(metrics.single_value("student_model_info", "gauge", "Versión del modelo activo", 1,
+                                              {"version": get_active_model().version, "engine": settings.INFERENCE_ENGINE}))
+    return collected
+
+metrics.registry.add_collector(collect_service_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Métricas en formato de texto de Prometheus
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas (METRICS_ENABLED=false)")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/models")
+async def list_models():
+    """
+    Modelos registrados: tipo, si están cargados, versión, memoria aproximada, latencia observada
+    y métricas del entrenamiento (para elegir el más barato que cumpla la precisión necesaria)
+    """
+    return {"default": model_registry.default_name, "models": model_registry.stats()}
+
 @app.get("/model/status")
 async def model_status():
     """
-    Endpoint para verificar el estado del modelo y pipeline
+    Estado del modelo y pipeline a partir del estado en memoria (no carga el modelo ni ejecuta
+    una predicción: la prueba es la última periódica)
     """
-    try:
-        from server.models.predictor import preprocessing_pipeline, model
-        
-        # Verificar que el modelo y pipeline están cargados
-        model_loaded = model is not None
-        pipeline_loaded = preprocessing_pipeline is not None
-        
-        # Información del modelo
-        model_info = {
-            "model_loaded": model_loaded,
-            "pipeline_loaded": pipeline_loaded,
-            "model_type": "XGBoost" if model_loaded else None,
-            "pipeline_type": type(preprocessing_pipeline).__name__ if pipeline_loaded else None
-        }
-        
-        if model_loaded and pipeline_loaded:
-            # Hacer una predicción de prueba para verificar funcionamiento
-            test_data = {
-                'curricular_units_1st_sem_grade': 15.0,
-                'curricular_units_2nd_sem_grade': 14.0,
-                'curricular_units_1st_sem_approved': 5,
-                'curricular_units_2nd_sem_approved': 4,
-                'curricular_units_1st_sem_evaluations': 6,
-                'curricular_units_2nd_sem_evaluations': 5,
-                'unemployment_rate': 10.0,
-                'gdp': 1.5,
-                'age_at_enrollment': 20,
-                'scholarship_holder': 'Yes',
-                'tuition_fees_up_to_date': 'Yes',
-                'marital_status': 'Single',
-                'previous_qualification': 'Secondary education',
-                'mothers_qualification': 'Higher education—bachelor\'s degree',
-                'fathers_qualification': 'Secondary education—12th year of schooling or equivalent'
-            }
-            
-            try:
-                test_result = predict_student_outcome_with_probabilities(test_data)
-                model_info["test_prediction"] = {
-                    "success": True,
-                    "prediction": test_result['prediction'],
-                    "confidence": test_result['confidence']
-                }
-            except Exception as test_error:
-                model_info["test_prediction"] = {
-                    "success": False,
-                    "error": str(test_error)
-                }
-        
-        return {
-            "status": "healthy" if model_loaded and pipeline_loaded else "unhealthy",
-            "model_info": model_info,
-            "message": "Modelo y pipeline funcionando correctamente" if model_loaded and pipeline_loaded else "Problema con modelo o pipeline"
-        }
-        
-    except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e),
-            "message": "Error verificando estado del modelo"
-        }
\ No newline at end of file
+    loaded = get_active_model() if is_model_loaded() else None
+    model_info = {
+        "model_loaded": loaded is not None,
+        "pipeline_loaded": loaded is not None,
+        "model_type": "XGBoost" if loaded else None,
+        "pipeline_type": type(loaded.pipeline).__name__ if loaded else None,
+        "test_prediction": startup_state.self_test
+    }
+    healthy = loaded is not None and is_ready()
+
+    return {
+        "status": "healthy" if healthy else "unhealthy",
+        "model_info": model_info,
+        "micro_batching": prediction_batcher.stats(),
+        "fast_mode": {
+            "iterations": loaded.fast_iterations,
+            "total_iterations": loaded.num_iterations,
+            # Métricas por corte medidas al entrenar (None si el modelo no trae metadatos)
+            "iteration_cutoffs": (loaded.metadata or {}).get("iteration_cutoffs"),
+            "micro_batching": fast_prediction_batcher.stats()
+        } if loaded else None,
+        "inference_pool": {
+            **inference_pool.stats(),
+            # Modelo de los workers: private_copies > 0 si alguno no comparte el del forkserver
+            "worker_models": worker_model_stats() if inference_pool.mode == "process" else None
+        },
+        "inference_runtime": {
+            "nthread": loaded.nthread if loaded else None,
+            "available_cpus": available_cpus(),
+            "cpu_affinity": settings.INFERENCE_CPU_AFFINITY or None
+        },
+        "prediction_cache": prediction_cache.stats(),
+        "explanation_cache": explanation_cache.stats(),
+        "write_behind": student_writer.stats(),
+        "spool": student_spool.stats(),
+        "connections": {"http": http_pool_stats(), "postgres": postgres_pool_stats()},
+        "shadow": shadow_scorer.stats(),
+        "model_versions": model_versions() if loaded else None,
+        "logging": logging_stats(),
+        "message": "Modelo y pipeline funcionando correctamente" if healthy else "Problema con modelo o pipeline"
+    }
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""
+Métricas del servidor en formato de texto de Prometheus (GET /metrics), sin dependencias externas.
+
+Contadores e histogramas con etiquetas, seguros entre hilos. Además de las métricas propias,
+el registro admite "collectors": funciones que devuelven valores calculados en el momento de
+exportar (versión del modelo, estadísticas de caché y de micro-batching...).
+Con METRICS_ENABLED=false observe()/inc() no hacen nada.
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from server import settings
+
+# Límites de los histogramas de latencia (segundos)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, registry, name, documentation, label_names=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.label_names, key)), value
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, registry, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas → [conteo por bucket (no acumulado, +Inf al final), suma, total]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Mide la duración del bloque: with STAGE_DURATION.time(stage="preprocess"): ...
+        """
+        if not self.registry.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket", {**labels, "le": _format_value(float(bound))}, cumulative
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, count
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, (counts, total, count) in values.items():
+                entry = self._values.get(key)
+                if entry is None:
+                    entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, label_names=()):
+        metric = Counter(self, name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(self, name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """
+        collector() devuelve una lista de (nombre, tipo, ayuda, [(nombre_muestra, etiquetas, valor), ...])
+        """
+        self._collectors.append(collector)
+
+    def drain(self):
+        """
+        Valores acumulados desde la última llamada, que quedan a cero: en un worker del pool de procesos
+        se envían al proceso principal, que los suma con merge() y los exporta en /metrics
+        """
+        return {metric.name: values for metric in self._metrics for values in [metric.drain()] if values}
+
+    def merge(self, drained):
+        for metric in self._metrics:
+            if metric.name in drained:
+                metric.merge(drained[metric.name])
+
+    def render(self):
+        """
+        Todas las métricas en formato de texto de Prometheus (version 0.0.4)
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in metric.samples())
+
+        for collector in self._collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                lines.extend(f"{sample}{_format_labels(labels)} {_format_value(value)}" for sample, labels, value in samples)
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+# Instante en que empezó la petición en curso (lo fija el middleware HTTP)
+_request_started_at = contextvars.ContextVar("request_started_at", default=None)
+
+
+def mark_request_start():
+    _request_started_at.set(time.perf_counter())
+
+
+def seconds_since_request_start():
+    """
+    Tiempo desde que el middleware recibió la petición: dentro de un endpoint es lo que han tardado
+    la lectura del cuerpo y la validación con pydantic
+    """
+    started_at = _request_started_at.get()
+    return time.perf_counter() - started_at if started_at is not None else 0.0
+
+
+def single_value(name, metric_type, documentation, value, labels=None):
+    """
+    Métrica de una sola muestra para un collector
+    """
+    return name, metric_type, documentation, [(name, labels or {}, value)]
+
+
+def histogram_from_counts(name, documentation, counts, buckets):
+    """
+    Muestras de un histograma Prometheus a partir de un Counter {valor: veces} (p. ej. tamaños de lote)
+    """
+    samples = [
+        (name + "_bucket", {"le": _format_value(float(bound))}, sum(c for value, c in counts.items() if value <= bound))
+        for bound in tuple(buckets) + (math.inf,)
+    ]
+    samples.append((name + "_sum", {}, sum(value * c for value, c in counts.items())))
+    samples.append((name + "_count", {}, sum(counts.values())))
+    return name, "histogram", documentation, samples
+
+
+# ---------------------------
+# Métricas del servidor
+
+REQUEST_DURATION = registry.histogram(
+    "student_api_request_duration_seconds",
+    "Duración total de las peticiones HTTP",
+    ["method", "path", "status"]
+)
+
+# Etapas de cada endpoint: validation, model, db_insert / db_update
+ENDPOINT_STAGE_DURATION = registry.histogram(
+    "student_api_stage_duration_seconds",
+    "Duración de cada etapa de los endpoints de predicción y actualización",
+    ["endpoint", "stage"]
+)
+
+# Etapas dentro del modelo (por lote): cache_lookup, preprocess, predict, format. model = nombre en el
+# registro: ?model=<nombre> y el modelo en sombra no se mezclan con el XGBoost servido por defecto
+MODEL_STAGE_DURATION = registry.histogram(
+    "student_model_stage_duration_seconds",
+    "Duración de cada etapa de la inferencia, por llamada (un lote puede tener varias filas)",
+    ["stage", "model"]
+)
+
+ROWS_SCORED = registry.counter(
+    "student_model_rows_scored_total",
+    "Filas puntuadas por cada modelo (sin contar aciertos de caché)",
+    ["model"]
+)
+
+# Escritura diferida en la base de datos (server/database/write_behind.py): un lote por observación
+DB_FLUSH_DURATION = registry.histogram(
+    "student_db_flush_duration_seconds",
+    "Duración de cada inserción por lotes de la escritura diferida (outcome=ok/error por intento)",
+    ["table", "outcome"]
+)
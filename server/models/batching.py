@@ -0,0 +1,121 @@
+import asyncio
+from collections import Counter, deque
+
+
+class MicroBatcher:
+    """
+    Agrupa las peticiones de predicción concurrentes en un solo lote.
+
+    Cada llamada a submit() deja su registro en una cola y espera su resultado. Un worker
+    recoge hasta max_batch_size registros (o los que hayan llegado tras max_wait_ms), los
+    puntúa con una sola llamada a predict_batch(lista) y resuelve el future de cada llamada.
+    Si se pasa un executor (InferencePool), los lotes se puntúan en él y varios lotes pueden
+    estar en curso a la vez sin bloquear el event loop.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=2.0, enabled=True, executor=None):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.enabled = enabled
+        self.executor = executor
+
+        self._pending = deque()
+        self._worker = None
+        self._worker_loop = None
+        self._batch_full = None
+        self._in_flight = set()
+
+        # Estadísticas: tamaño de lote → número de lotes
+        self.batch_size_histogram = Counter()
+        self.requests_total = 0
+        self.batches_total = 0
+
+    async def submit(self, record):
+        """
+        Encola un registro y devuelve su resultado cuando se procese su lote
+        """
+        if not self.enabled:
+            self._record_batch(1)
+            return (await self._predict([record]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._ensure_worker(loop)
+        self._pending.append((record, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+
+        return await future
+
+    def _ensure_worker(self, loop):
+        if self._worker is not None and not self._worker.done() and self._worker_loop is loop:
+            return
+        if self._worker_loop is not loop:
+            # Peticiones de un event loop anterior (p. ej. otro TestClient): ya no se pueden resolver
+            self._pending.clear()
+        self._worker_loop = loop
+        self._batch_full = asyncio.Event()
+        self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        # El worker vive mientras haya peticiones pendientes; el siguiente submit lo vuelve a arrancar
+        while self._pending:
+            if len(self._pending) < self.max_batch_size and self.max_wait_ms > 0:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self.max_wait_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_full.clear()
+
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch_size, len(self._pending)))]
+            if self.executor is None:
+                await self._process(batch)
+            else:
+                # El lote se puntúa en el pool mientras se empieza a llenar el siguiente
+                task = asyncio.get_running_loop().create_task(self._process(batch))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+    async def _predict(self, records):
+        if self.executor is None:
+            return self.predict_batch(records)
+        return await self.executor.run(self.predict_batch, records)
+
+    async def _process(self, batch):
+        self._record_batch(len(batch))
+        records = [record for record, _ in batch]
+
+        try:
+            results = await self._predict(records)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _record_batch(self, size):
+        self.batch_size_histogram[size] += 1
+        self.batches_total += 1
+        self.requests_total += size
+
+    def stats(self):
+        """
+        Resumen de la configuración y del histograma de tamaños de lote
+        """
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "pending": len(self._pending),
+            "in_flight_batches": len(self._in_flight),
+            "requests_total": self.requests_total,
+            "batches_total": self.batches_total,
+            "mean_batch_size": self.requests_total / self.batches_total if self.batches_total else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_size_histogram.items())}
+        }
@@ -0,0 +1,32 @@
+"""
+Precarga del forkserver del pool de inferencia (INFERENCE_POOL_MODE=process).
+
+El forkserver es un proceso aparte y sin hilos: importa este módulo una vez y de él salen por fork
+todos los workers. Así los workers no se crean a partir del servidor (con hilos de logging, de la
+escritura diferida, de anyio y de OpenMP, que no sobreviven a un fork) y comparten por copy-on-write
+el modelo cargado aquí. Se carga el par activo del servidor (el fichero de
+predictor.export_process_worker_state) o, sin él, el de disco. Tras una recarga o un rollback el pool
+reinicia el forkserver, que vuelve a importar este módulo con el modelo nuevo.
+"""
+import gc
+import logging
+import os
+import pickle
+
+from server.models import predictor
+
+logger = logging.getLogger(__name__)
+
+try:
+    state_file = os.environ.get(predictor.WORKER_STATE_ENV)
+    if state_file and os.path.exists(state_file):
+        with open(state_file, "rb") as f:
+            predictor.activate_worker_state(pickle.load(f))
+    else:
+        predictor.load_model()
+except Exception as e:
+    # Los workers cargarán el modelo que les envíe el servidor
+    logger.warning("⚠️ El forkserver no pudo precargar el modelo: %s", e)
+
+# Una sola vez por forkserver: el GC no vuelve a recorrer (ni a copiar en los workers) los objetos ya creados
+gc.freeze()
@@ -0,0 +1,243 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+POOL_MODES = ("thread", "process")
+
+
+def available_cpus():
+    """
+    Núcleos que puede usar este proceso (respeta la afinidad de CPU y el cpuset del contenedor)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def parse_cpu_list(spec):
+    """
+    Lista de núcleos al estilo de taskset/cpuset: "0-3,6" → {0, 1, 2, 3, 6}. Lanza ValueError si no es válida.
+    """
+    cpus = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        if not first.isdigit() or (last and not last.isdigit()) or int(last or first) < int(first):
+            raise ValueError(f"Lista de CPUs no válida: {spec!r}")
+        cpus.update(range(int(first), int(last or first) + 1))
+    if not cpus:
+        raise ValueError(f"Lista de CPUs no válida: {spec!r}")
+    return cpus
+
+
+def set_cpu_affinity(spec):
+    """
+    Fija los núcleos del proceso (Linux). Lo heredan los hilos y los procesos que se creen después,
+    así que se llama antes de cargar el modelo y de arrancar el pool. Devuelve los núcleos fijados.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        raise OSError("La afinidad de CPU no está disponible en esta plataforma")
+    os.sched_setaffinity(0, parse_cpu_list(spec))
+    return sorted(os.sched_getaffinity(0))
+
+
+def threads_per_call(pool_size, nthread=0):
+    """
+    Hilos de XGBoost por llamada a predict: nthread si es > 0; si no, los núcleos disponibles
+    repartidos entre las llamadas concurrentes del pool, para que N predicciones a la vez no
+    lancen N x núcleos hilos (sobresuscripción)
+    """
+    if nthread > 0:
+        return nthread
+    return max(1, available_cpus() // max(1, pool_size))
+
+
+def call_and_collect(collector, function, args, kwargs):
+    """
+    En un worker del pool de procesos: el resultado de la función y lo que devuelve collector()
+    (estadísticas que solo existen en ese proceso, para sumarlas en el proceso principal)
+    """
+    return function(*args, **kwargs), collector()
+
+
+def stop_forkserver():
+    """
+    Para el forkserver de este proceso (uno por proceso) para que el siguiente pool arranque otro que
+    vuelva a importar los módulos de preload. Solo con todos sus workers terminados: el forkserver
+    guarda los pipes con los que se detecta que un worker ha muerto. Devuelve False si no se pudo.
+    """
+    stop = getattr(multiprocessing.forkserver._forkserver, "_stop", None)
+    if stop is None:
+        return False
+    stop()
+    return True
+
+
+class InferencePool:
+    """
+    Ejecuta el trabajo del modelo (preprocesamiento + predict) fuera del event loop de asyncio.
+
+    - mode="thread": ThreadPoolExecutor acotado. XGBoost y NumPy liberan el GIL durante el
+      cálculo, así que el event loop sigue atendiendo otras peticiones mientras se predice.
+    - mode="process": ProcessPoolExecutor para repartir la inferencia entre varios núcleos. Los
+      workers se crean con el método forkserver: un proceso aparte, sin hilos, importa una vez los
+      módulos de preload (p. ej. el que carga el modelo) y cada worker sale de él por fork, así que
+      comparten esa copia (copy-on-write) y nunca se hace fork del servidor, que ya tiene hilos.
+      initargs_provider, si se indica, se llama en cada start()/restart() para obtener los initargs
+      (p. ej. el modelo activo tras una recarga). Las funciones y sus argumentos deben poder
+      serializarse con pickle (funciones de módulo). Los procesos se crean en start() (el servidor
+      lo llama tras cargar el modelo) o, si no, en la primera llamada a run().
+      restart() reinicia también el forkserver (antes llama a preload_setup, p. ej. para dejar el
+      modelo activo donde lo lea el preload), así que tras una recarga los workers siguen
+      compartiendo el modelo. Como el forkserver es uno por proceso, solo un pool con preload por proceso.
+      Lo que la inferencia acumula en el worker (métricas, cachés, latencias) no llega solo al
+      proceso principal: con stats_collector (se ejecuta en el worker tras cada llamada) y
+      stats_merger (recibe su resultado en el proceso principal) se envía con cada resultado.
+
+    Con max_workers=0 el trabajo se ejecuta en línea (comportamiento anterior, útil para comparar).
+    """
+
+    def __init__(self, max_workers=4, mode="thread", initializer=None, initargs=(), initargs_provider=None,
+                 preload=(), preload_setup=None, stats_collector=None, stats_merger=None):
+        if mode not in POOL_MODES:
+            raise ValueError(f"Modo de pool no válido: {mode!r} (usar {' o '.join(POOL_MODES)})")
+
+        self.max_workers = max(0, int(max_workers))
+        self.mode = mode if self.max_workers > 0 else "inline"
+        self._executor = None
+        self._initializer = initializer
+        self._initargs = initargs
+        self._initargs_provider = initargs_provider
+        self._preload = list(preload)
+        self._preload_setup = preload_setup
+        self._forkserver_restarts = 0
+        self._stats_collector = stats_collector
+        self._stats_merger = stats_merger
+        self._lock = threading.Lock()
+
+        if self.mode == "thread":
+            self.start()
+
+    def _start_process_pool(self):
+        context = multiprocessing.get_context(self._start_method())
+        if self._uses_preload():
+            if self._preload_setup is not None:
+                self._preload_setup()
+            # Solo tiene efecto cuando arranca el forkserver (uno por proceso): ver restart()
+            context.set_forkserver_preload(self._preload)
+
+        initargs = self._initargs_provider() if self._initargs_provider is not None else self._initargs
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=context,
+            initializer=self._initializer, initargs=initargs
+        )
+        # Los workers se crean ya (y fallan ya si el initializer falla), no en la primera petición
+        executor.submit(os.getpid).result()
+        return executor
+
+    @staticmethod
+    def _start_method():
+        # Sin forkserver (Windows/macOS) cada worker importa y carga su propia copia del modelo
+        return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+    def _uses_preload(self):
+        return self._start_method() == "forkserver" and bool(self._preload)
+
+    def start(self):
+        """
+        Arranca los workers si aún no están arrancados (o si se pararon con shutdown())
+        """
+        if self._executor is not None or self.mode == "inline":
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            if self.mode == "process":
+                self._executor = self._start_process_pool()
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="inference",
+                    initializer=self._initializer, initargs=self._initargs
+                )
+
+    def restart(self):
+        """
+        Solo en modo process: crea workers nuevos (que reciben el modelo activo ahora en el padre,
+        p. ej. tras una recarga) y retira los anteriores cuando terminen el trabajo que ya tienen.
+        Con preload se reinicia además el forkserver, para que los workers nuevos compartan el modelo
+        activo en lugar de cargar cada uno su copia: mientras terminan los workers anteriores (el
+        forkserver no se puede parar antes) las peticiones nuevas se atienden en hilos.
+        Espera a que arranquen los workers: desde el event loop se llama con run_in_threadpool.
+        """
+        if self.mode != "process":
+            return
+        with self._lock:
+            previous = self._executor
+            if previous is None or not self._uses_preload():
+                self._executor = self._start_process_pool()
+                if previous is not None:
+                    previous.shutdown(wait=False)
+                return
+            bridge = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+            self._executor = bridge
+        previous.shutdown(wait=True)
+        if stop_forkserver():
+            self._forkserver_restarts += 1
+        executor = self._start_process_pool()
+        with self._lock:
+            self._executor = executor
+        bridge.shutdown(wait=False)
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Ejecuta function(*args, **kwargs) en el pool y espera su resultado sin bloquear el event loop.
+        En modo thread se ejecuta con una copia del contexto (request_id y muestreo del logging de la petición).
+        """
+        loop = asyncio.get_running_loop()
+        if self._executor is None and self.mode == "process":
+            # Arrancar los workers bloquea: fuera del event loop
+            await loop.run_in_executor(None, self.start)
+        self.start()
+        if self._executor is None:
+            return function(*args, **kwargs)
+        if isinstance(self._executor, ThreadPoolExecutor):
+            # También en modo process mientras restart() reinicia el forkserver: el trabajo corre en este proceso.
+            # run_in_executor no propaga las contextvars al hilo (un Context no se puede enviar a otro proceso)
+            return await loop.run_in_executor(
+                self._executor, functools.partial(contextvars.copy_context().run, function, *args, **kwargs)
+            )
+        if self._stats_collector is not None:
+            result, stats = await loop.run_in_executor(
+                self._executor, functools.partial(call_and_collect, self._stats_collector, function, args, kwargs)
+            )
+            if self._stats_merger is not None:
+                self._stats_merger(stats)
+            return result
+        return await loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    def worker_pids(self):
+        if self.mode != "process" or not isinstance(self._executor, ProcessPoolExecutor):
+            return []
+        return sorted(self._executor._processes)
+
+    def shutdown(self, wait=True):
+        # Un run() posterior (p. ej. otro arranque de la app en el mismo proceso) crea workers nuevos
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self):
+        stats = {
+            "mode": self.mode,
+            "max_workers": self.max_workers
+        }
+        if self.mode == "process":
+            stats["worker_pids"] = self.worker_pids()
+            stats["forkserver_preload"] = self._uses_preload()
+            stats["forkserver_restarts"] = self._forkserver_restarts
+        return stats
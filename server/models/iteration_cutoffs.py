@@ -0,0 +1,94 @@
+"""
+Modo rápido: predecir con solo las primeras iteraciones (árboles) del modelo.
+
+Con iteration_range=(0, k) XGBoost suma solo los árboles de las k primeras rondas: la predicción
+es más barata y algo menos precisa. Al entrenar se mide, para varios cortes k, la exactitud y el
+F1 (validación y test) y la latencia, y se guarda en los metadatos del artefacto
+(xgboost_multiclass_metadata.json). El servidor elige con esos datos el corte del modo rápido:
+el menor k cuyo F1 de validación no baja más de FAST_MODE_MAX_F1_DROP respecto al modelo completo.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+
+def default_cutoffs(n_rounds):
+    """
+    Cortes a evaluar: 10, 25, 50, 100... y 1/4, 1/2, 3/4 del total, más el modelo completo
+    """
+    cutoffs = {k for k in (10, 25, 50, 100, 200, 500, 1000) if k < n_rounds}
+    cutoffs.update(max(1, int(n_rounds * fraction)) for fraction in (0.25, 0.5, 0.75))
+    cutoffs.add(n_rounds)
+    return sorted(cutoffs)
+
+
+def measure_latency_ms(booster, X, iterations, repeat=50):
+    """
+    Mediana (ms) de inplace_predict sobre X con las primeras `iterations` rondas
+    """
+    booster.inplace_predict(X, iteration_range=(0, iterations))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        booster.inplace_predict(X, iteration_range=(0, iterations))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def evaluate_cutoffs(booster, datasets, cutoffs=None, latency_batch_sizes=(1, 256)):
+    """
+    Métricas por corte de iteraciones.
+
+    datasets: {"validation": (X, y), "test": (X, y)} con X float32 en el orden de features del modelo.
+    Devuelve una lista de {"iterations", "<nombre>_accuracy", "<nombre>_f1_macro", "latency_ms": {filas: ms}}.
+    """
+    from sklearn.metrics import accuracy_score, f1_score
+
+    n_rounds = booster.num_boosted_rounds()
+    datasets = {name: (np.ascontiguousarray(X, dtype=np.float32), np.asarray(y)) for name, (X, y) in datasets.items()}
+    X_latency = next(iter(datasets.values()))[0]
+
+    results = []
+    for iterations in cutoffs or default_cutoffs(n_rounds):
+        entry = {"iterations": int(iterations)}
+        for name, (X, y) in datasets.items():
+            y_pred = np.argmax(booster.inplace_predict(X, iteration_range=(0, iterations)), axis=1)
+            entry[f"{name}_accuracy"] = float(accuracy_score(y, y_pred))
+            entry[f"{name}_f1_macro"] = float(f1_score(y, y_pred, average="macro"))
+
+        # Lote de latencia: las primeras filas (repetidas si hacen falta)
+        entry["latency_ms"] = {
+            str(batch_size): measure_latency_ms(booster, np.resize(X_latency, (batch_size, X_latency.shape[1])), iterations)
+            for batch_size in latency_batch_sizes
+        }
+        results.append(entry)
+    return results
+
+
+def choose_fast_iterations(cutoff_metrics, max_f1_drop, metric="validation_f1_macro"):
+    """
+    Menor corte cuyo F1 no baja más de max_f1_drop respecto al corte más largo (el modelo completo).
+    Devuelve None si no hay métricas.
+    """
+    if not cutoff_metrics:
+        return None
+    full = max(cutoff_metrics, key=lambda entry: entry["iterations"])
+    candidates = [entry for entry in cutoff_metrics if entry[metric] >= full[metric] - max_f1_drop]
+    return min(entry["iterations"] for entry in candidates)
+
+
+def save_metadata(path, metadata):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+
+def load_metadata(path):
+    """
+    Metadatos del artefacto, o None si no existen (modelos entrenados antes de guardarlos)
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,203 @@
+"""
+Registro de modelos con nombre.
+
+Además del modelo XGBoost por defecto (el activo, con recarga en caliente en predictor.py), el
+servidor puede servir otros modelos entrenados con las mismas features, p. ej. el Random Forest,
+que se piden con ?model=<nombre>. Cada modelo se carga la primera vez que se pide y, si sus
+features coinciden con las de un modelo ya cargado, usa la misma instancia del pipeline de
+preprocesamiento en lugar de otra copia.
+"""
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+MODEL_KINDS = ("xgboost", "sklearn")
+
+
+class ModelSpec:
+    def __init__(self, name, kind, model_file, pipeline_file, metadata_file=None):
+        if kind not in MODEL_KINDS:
+            raise ValueError(f"Tipo de modelo no válido para {name!r}: {kind!r} (usar {' o '.join(MODEL_KINDS)})")
+        self.name = name
+        self.kind = kind
+        self.model_file = model_file
+        self.pipeline_file = pipeline_file
+        self.metadata_file = metadata_file or metadata_file_for(model_file)
+
+
+def metadata_file_for(model_file):
+    """
+    Metadatos de entrenamiento junto al modelo: "<prefijo>_model.<ext>" → "<prefijo>_metadata.json"
+    """
+    stem = os.path.splitext(model_file)[0]
+    if stem.endswith("_model"):
+        stem = stem[:-len("_model")]
+    return stem + "_metadata.json"
+
+
+def parse_model_specs(spec_string, artifacts_dir, default_pipeline_file):
+    """
+    "nombre:tipo:fichero_modelo[:fichero_pipeline]" separados por comas → [ModelSpec].
+    Las rutas relativas se resuelven en artifacts_dir; sin pipeline se usa el del modelo por defecto.
+    """
+    specs = []
+    for entry in spec_string.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(":")
+        if len(parts) not in (3, 4):
+            raise ValueError(f"Modelo mal definido: {entry!r} (formato nombre:tipo:fichero_modelo[:fichero_pipeline])")
+        name, kind, model_file = parts[:3]
+        pipeline_file = os.path.join(artifacts_dir, parts[3]) if len(parts) == 4 else default_pipeline_file
+        specs.append(ModelSpec(name, kind, os.path.join(artifacts_dir, model_file), pipeline_file))
+    return specs
+
+
+def estimate_model_bytes(model, kind):
+    """
+    Memoria aproximada de la estructura del modelo: el tamaño binario de los árboles en XGBoost (o de sus
+    arrays con el evaluador NumPy) y la suma de los arrays de nodos y valores de cada árbol en los
+    bosques de scikit-learn
+    """
+    if kind == "xgboost":
+        if hasattr(model, "nbytes"):
+            return model.nbytes     # TreeEnsemble
+        return len(model.save_raw("ubj"))
+    estimators = getattr(model, "estimators_", None)
+    if estimators is None:
+        return None
+    total = 0
+    for estimator in estimators:
+        tree = getattr(estimator, "tree_", None)
+        if tree is not None:
+            state = tree.__getstate__()
+            total += state["nodes"].nbytes + state["values"].nbytes
+    return total
+
+
+def latency_summary(latencies):
+    """
+    p50/p99 y ms por fila de una lista de (segundos, filas) por llamada al modelo
+    """
+    if not latencies:
+        return None
+    seconds = np.array([elapsed for elapsed, _ in latencies])
+    rows = sum(n_rows for _, n_rows in latencies)
+    return {
+        "calls": len(seconds),
+        "p50_ms": float(np.percentile(seconds, 50) * 1000),
+        "p99_ms": float(np.percentile(seconds, 99) * 1000),
+        "ms_per_row": float(seconds.sum() / rows * 1000)
+    }
+
+
+class ModelRegistry:
+    """
+    default_name/default_loader/default_loaded: el modelo por defecto lo gestiona predictor.py
+    (carga y recarga); el registro solo lo expone con su nombre. loader(spec) carga los demás.
+    """
+
+    def __init__(self, loader, default_name, default_loader, default_loaded, specs=()):
+        self.loader = loader
+        self.default_name = default_name
+        self.default_loader = default_loader
+        self.default_loaded = default_loaded
+        self.specs = {spec.name: spec for spec in specs}
+        if default_name in self.specs:
+            raise ValueError(f"El nombre {default_name!r} está reservado para el modelo por defecto")
+
+        self._models = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        # Latencias de modelos que solo están cargados en los workers del pool de procesos
+        self._worker_latencies = {}
+
+    def names(self):
+        return [self.default_name] + list(self.specs)
+
+    def kind(self, name=None):
+        """
+        Tipo del modelo sin cargarlo. Lanza KeyError si el nombre no está registrado.
+        """
+        if name in (None, self.default_name):
+            return "xgboost"
+        return self.specs[name].kind
+
+    def get(self, name=None):
+        """
+        Modelo cargado con ese nombre (lo carga si es la primera vez). Lanza KeyError si no está registrado.
+        """
+        if name in (None, self.default_name):
+            return self.default_loader()
+        spec = self.specs[name]
+
+        loaded = self._models.get(name)
+        if loaded is None:
+            with self._lock:
+                loaded = self._models.get(name)
+                if loaded is None:
+                    try:
+                        loaded = self.loader(spec)
+                    except Exception as e:
+                        self._errors[name] = str(e)
+                        raise
+                    loaded.pipeline = self._shared_pipeline(loaded.pipeline)
+                    self._models[name] = loaded
+                    self._errors.pop(name, None)
+        return loaded
+
+    def loaded_models(self):
+        models = {}
+        default = self.default_loaded()
+        if default is not None:
+            models[self.default_name] = default
+        models.update(self._models)
+        return models
+
+    def record_worker_latencies(self, name, version, latencies):
+        """
+        Latencias medidas en un worker del pool de procesos: se suman al modelo si también está cargado
+        aquí con la misma versión; si no, se guardan aparte para stats()
+        """
+        loaded = self.loaded_models().get(name)
+        if loaded is not None and loaded.version == version:
+            loaded.latencies.extend(latencies)
+            return
+        if loaded is None:
+            self._worker_latencies.setdefault(name, deque(maxlen=1000)).extend(latencies)
+
+    def _shared_pipeline(self, pipeline):
+        # Mismas features en el mismo orden: el pipeline ya cargado transforma igual
+        for loaded in self.loaded_models().values():
+            if list(loaded.pipeline.features) == list(pipeline.features):
+                return loaded.pipeline
+        return pipeline
+
+    def stats(self):
+        loaded_models = self.loaded_models()
+        pipeline_owners = {}
+        for name, loaded in loaded_models.items():
+            pipeline_owners.setdefault(id(loaded.pipeline), []).append(name)
+
+        stats = {}
+        for name in self.names():
+            loaded = loaded_models.get(name)
+            entry = {"kind": self.kind(name), "loaded": loaded is not None}
+            if loaded is not None:
+                entry.update(loaded.describe())
+                # Con el motor NumPy y el booster sin deserializar se mide el evaluador de árboles
+                model = loaded.model if loaded.model_loaded else loaded.tree_ensemble
+                entry["memory_bytes"] = estimate_model_bytes(model, loaded.kind)
+                entry["shares_pipeline_with"] = [other for other in pipeline_owners[id(loaded.pipeline)] if other != name]
+                entry["latency"] = loaded.latency_stats()
+                entry["training_metrics"] = (loaded.metadata or {}).get("metrics")
+            elif name in self._errors:
+                entry["error"] = self._errors[name]
+            if loaded is None and name in self._worker_latencies:
+                entry["loaded_in_workers"] = True
+                entry["latency"] = latency_summary(self._worker_latencies[name])
+            stats[name] = entry
+        return stats
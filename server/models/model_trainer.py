@@ -7,6 +7,8 @@ from sklearn.model_selection import train_test_split, cross_val_score, Stratifie
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix
 from sklearn.metrics import classification_report, roc_auc_score, roc_curve
 from server.models.preprocessing import PreprocessingPipeline
+from server.models.tree_ensemble import export_artifacts
+from server.models.iteration_cutoffs import evaluate_cutoffs, choose_fast_iterations, save_metadata
 from collections import Counter
 
 #-------------------------------------------------------------------------------------------------------
@@ -24,8 +26,12 @@ process_data_path = os.path.join(data_root_path, "processed", "dataset_procesado
 
 # Rutas para guardar modelos (en server/data)
 data_server_path = os.path.join(server_path, "artifacts")      # \...\Multiclass_Clasification\server\data
+# MODEL_OUTPUT_DIR=server/artifacts/candidate guarda un candidato sin tocar el modelo en producción
+# (se puede puntuar en sombra con SHADOW_MODEL antes de promoverlo)
+data_server_path = os.environ.get("MODEL_OUTPUT_DIR") or data_server_path
 pipeline_path = os.path.join(data_server_path, "xgboost_multiclass_pipeline.pkl")
 model_path = os.path.join(data_server_path, "xgboost_multiclass_model.pkl")
+metadata_path = os.path.join(data_server_path, "xgboost_multiclass_metadata.json")
 
 print(f"📁 Rutas configuradas:")
 print(f"   Dataset procesado: {process_data_path}")
@@ -206,6 +212,21 @@ print(f"Diferencia en F1 (train-val): {train_f1 - val_f1:.4f}")
 print("\nReporte de clasificación (Test):")
 print(classification_report(y_test, y_test_pred, target_names=['Dropout', 'Graduate', 'Enrolled']))
 
+# ✅ MÉTRICAS POR CORTE DE ITERACIONES (modo rápido con iteration_range)
+print("\n⚡ Evaluando cortes de iteraciones para el modo rápido...")
+
+iteration_cutoffs = evaluate_cutoffs(final_model, {
+    "validation": (X_val.to_numpy(dtype=np.float32), y_val.to_numpy()),
+    "test": (X_test.to_numpy(dtype=np.float32), y_test.to_numpy())
+})
+print(f"{'iteraciones':>12} {'F1 val':>8} {'F1 test':>8} {'acc test':>9} {'ms 1 fila':>10} {'ms 256 filas':>13}")
+for entry in iteration_cutoffs:
+    print(f"{entry['iterations']:>12} {entry['validation_f1_macro']:>8.4f} {entry['test_f1_macro']:>8.4f} "
+          f"{entry['test_accuracy']:>9.4f} {entry['latency_ms']['1']:>10.3f} {entry['latency_ms']['256']:>13.3f}")
+
+suggested_fast_iterations = choose_fast_iterations(iteration_cutoffs, max_f1_drop=0.01)
+print(f"✅ Corte sugerido (F1 val a menos de 0.01 del modelo completo): {suggested_fast_iterations} iteraciones")
+
 # Guardar modelo
 print("\n💾 Guardando modelo...")
 
@@ -213,6 +234,20 @@ with open(model_path, 'wb') as f:
     pickle.dump(final_model, f)
 print(f"✅ Modelo guardado en: {model_path}")
 
+# Metadatos del artefacto: métricas finales y por corte de iteraciones (los lee el servidor para el modo rápido)
+save_metadata(metadata_path, {
+    "num_boosted_rounds": final_model.num_boosted_rounds(),
+    "best_iteration": final_model.best_iteration,
+    "params": best_params,
+    "metrics": {
+        "validation_accuracy": val_accuracy, "validation_f1_macro": val_f1,
+        "test_accuracy": test_accuracy, "test_f1_macro": test_f1
+    },
+    "iteration_cutoffs": iteration_cutoffs,
+    "suggested_fast_iterations": suggested_fast_iterations
+})
+print(f"✅ Metadatos guardados en: {metadata_path}")
+
 # ✅ GUARDAR PIPELINE CORREGIDO
 print("\n🔧 Configurando pipeline de preprocesamiento corregido...")
 
@@ -254,6 +289,12 @@ with open(pipeline_path, 'wb') as f:
     pickle.dump(preprocessing_pipeline, f)
 print(f"✅ Pipeline guardado en: {pipeline_path}")
 
+# Exportar los árboles a arrays para el evaluador NumPy (INFERENCE_ENGINE=numpy), con la versión del par
+# pipeline/modelo recién guardado: el servidor solo usa el .npz si coincide con los pickles
+trees_path = os.path.join(data_server_path, "xgboost_multiclass_trees.npz")
+export_artifacts(pipeline_path, model_path, trees_path)
+print(f"✅ Árboles exportados en: {trees_path}")
+
 # ✅ VERIFICACIÓN COMPLETA: Probar con datos realistas
 print("\n🧪 Verificando pipeline con datos de prueba...")
 
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+
+from server.models.schemas import StudentInput
+
+# Contadores que los workers del pool de procesos envían al proceso principal (drain_stats/merge_stats)
+COUNTER_FIELDS = ("hits", "misses", "evictions", "expirations", "invalidations")
+
+# Los 15 campos de StudentInput, en orden fijo (nombres Python, sin apóstrofe)
+CACHE_KEY_FIELDS = list(StudentInput.model_fields)
+
+# Alias del API → nombre del campo
+FIELD_ALIASES = {
+    field.alias: name for name, field in StudentInput.model_fields.items() if field.alias
+}
+
+
+class PredictionCache:
+    """
+    Caché LRU con TTL para resultados de predicción, con clave canónica sobre los campos de StudentInput.
+
+    Cada entrada guarda la versión del modelo con la que se calculó: cuando version_provider()
+    devuelve otra versión (modelo o pipeline distintos), la caché se vacía entera.
+    Es segura entre hilos (se usa desde el pool de inferencia).
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=3600, version_provider=None, enabled=True):
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = ttl_seconds
+        self.version_provider = version_provider or (lambda: None)
+        self.enabled = enabled and self.max_size > 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        # Con INFERENCE_POOL_MODE=process la caché que se usa es la de cada worker: tamaño y versión
+        # de cada uno (por pid) y lo ya enviado al proceso principal
+        self._worker_sizes = {}
+        self._worker_version = None
+        self._drained = dict.fromkeys(COUNTER_FIELDS, 0)
+
+    @staticmethod
+    def make_key(record):
+        """
+        Clave canónica: los 15 campos en orden fijo, aceptando tanto "mothers_qualification"
+        como "mother's_qualification", y con los números normalizados (5 y 5.0 son la misma clave)
+        """
+        normalized = {FIELD_ALIASES.get(name, name): value for name, value in record.items()}
+        key = []
+        for field in CACHE_KEY_FIELDS:
+            value = normalized.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = float(value)
+            key.append(value)
+        return tuple(key)
+
+    def _check_version(self):
+        version = self.version_provider()
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, result = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _copy_result(result)
+
+    def put(self, key, result, version=None):
+        """
+        Guarda un resultado. Si se indica la versión del modelo que lo calculó y ya no es la
+        activa (el modelo se recargó mientras tanto), el resultado no se guarda.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_version()
+            if version is not None and version != self._version:
+                return
+            self._entries[key] = (time.monotonic(), _copy_result(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def drain_stats(self):
+        """
+        En un worker: contadores desde la última llamada, tamaño y versión (para merge_stats)
+        """
+        with self._lock:
+            delta = {field: getattr(self, field) - self._drained[field] for field in COUNTER_FIELDS}
+            self._drained = {field: getattr(self, field) for field in COUNTER_FIELDS}
+            return {**delta, "size": len(self._entries), "model_version": self._version}
+
+    def merge_stats(self, worker, delta):
+        """
+        En el proceso principal: suma lo que envía el worker (su pid) con drain_stats
+        """
+        with self._lock:
+            for field in COUNTER_FIELDS:
+                setattr(self, field, getattr(self, field) + delta[field])
+            self._worker_sizes[worker] = delta["size"]
+            self._worker_version = delta["model_version"] or self._worker_version
+
+    def forget_workers(self):
+        # Tras recrear los workers: los tamaños de los anteriores ya no cuentan
+        with self._lock:
+            self._worker_sizes.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries) + sum(self._worker_sizes.values()),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "model_version": self._version or self._worker_version,
+            # Workers del pool de procesos que han enviado sus estadísticas (0 en modo thread)
+            "workers": len(self._worker_sizes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+
+def _copy_result(result):
+    # Copia para que quien reciba el resultado no pueda modificar la entrada de la caché
+    return {**result, 'probabilities': dict(result['probabilities'])}
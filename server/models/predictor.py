@@ -1,36 +1,799 @@
 import os
+import json
+import logging
 import pickle
-import xgboost as xgb
-import pandas as pd
+import tempfile
+import threading
+import time
+from collections import deque
 import numpy as np
 
 from .preprocessing import PreprocessingPipeline
+from .prediction_cache import PredictionCache
+from .tree_ensemble import TreeEnsemble, artifact_version
+from .inference_pool import threads_per_call
+from .iteration_cutoffs import choose_fast_iterations, load_metadata
+from .model_registry import ModelRegistry, latency_summary, parse_model_specs
+from server import settings
+from server.metrics import MODEL_STAGE_DURATION, ROWS_SCORED
+from server.metrics import registry as metrics_registry
 import sys
 import server.models.preprocessing as preprocessing_module
 sys.modules['preprocessing'] = preprocessing_module
 
+logger = logging.getLogger(__name__)
+
 # Rutas relativas
 current_dir = os.path.dirname(os.path.abspath(__file__))
 pipeline_path = os.path.join(current_dir, "..", "artifacts", "xgboost_multiclass_pipeline.pkl")
 model_path = os.path.join(current_dir, "..", "artifacts", "xgboost_multiclass_model.pkl")
+metadata_path = os.path.join(current_dir, "..", "artifacts", "xgboost_multiclass_metadata.json")
+artifacts_dir = os.path.join(current_dir, "..", "artifacts")
+
+# Nombre con el que se pide el modelo XGBoost activo (?model=xgboost, o sin indicar modelo)
+DEFAULT_MODEL_NAME = "xgboost"
+
+
+class LoadedModel:
+    """
+    Par pipeline + modelo cargado desde disco, con su versión (hash del contenido de ambos artefactos).
+    Se sustituye siempre entero: una predicción en curso usa un pipeline y un modelo del mismo par
+    aunque mientras tanto se recargue otra versión.
+    kind: "xgboost" (Booster) o "sklearn" (clasificador con predict_proba, p. ej. RandomForestClassifier).
+    Con model=None el modelo se deserializa con model_loader() la primera vez que se usa (con
+    INFERENCE_ENGINE=numpy solo lo necesitan las explicaciones y la entrada dispersa).
+    """
+
+    def __init__(self, pipeline, model, version, metadata=None, kind="xgboost", model_loader=None, tree_ensemble=None):
+        self.pipeline = pipeline
+        self._model = model
+        self._model_loader = model_loader
+        self._model_lock = threading.Lock()
+        self.version = version
+        self.metadata = metadata
+        self.kind = kind
+        # Nombre en el registro de modelos (etiqueta model de las métricas de inferencia)
+        self.name = DEFAULT_MODEL_NAME
+        self.loaded_at = time.time()
+        # Columnas de predict_proba en el orden de CLASS_NAMES (solo sklearn)
+        self.class_order = None
+        # Duración y filas de las últimas llamadas al modelo, para comparar modelos
+        self.latencies = deque(maxlen=1000)
+        # Iteraciones que usa el modo rápido (resolve_fast_iterations)
+        self.fast_iterations = None
+        # Hilos de XGBoost por llamada a predict (set_inference_threads)
+        self.nthread = None
+
+        # Variantes del modelo que se construyen la primera vez que se piden
+        self.sparse_model = None
+        self.tree_ensemble = tree_ensemble
+        # Contenido de los ficheros (pipeline, modelo): los workers del pool de procesos cargan el mismo par
+        self.artifacts = None
+        self.contribution_groups = None
+
+    @property
+    def model(self):
+        if self._model is None and self._model_loader is not None:
+            with self._model_lock:
+                if self._model is None:
+                    model = self._model_loader()
+                    if self.nthread is not None:
+                        model.set_param({'nthread': self.nthread})
+                    logger.info("✅ Booster %s deserializado bajo demanda", self.version)
+                    self._model = model
+        return self._model
+
+    @property
+    def model_loaded(self):
+        return self._model is not None
+
+    @property
+    def num_iterations(self):
+        if self.kind != "xgboost":
+            return None
+        if not self.model_loaded and self.tree_ensemble is not None:
+            return self.tree_ensemble.num_iterations
+        return self.model.num_boosted_rounds()
+
+    @property
+    def model_type(self):
+        return "XGBoost" if self.kind == "xgboost" else type(self.model).__name__
+
+    def record_latency(self, seconds, n_rows):
+        self.latencies.append((seconds, n_rows))
+
+    def latency_stats(self):
+        return latency_summary(self.latencies)
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "kind": self.kind,
+            "model_type": self.model_type,
+            "loaded_at": self.loaded_at,
+            "nthread": self.nthread,
+            "iterations": self.num_iterations,
+            "booster_loaded": self.model_loaded,
+            "fast_iterations": self.fast_iterations,
+            "n_features": len(self.pipeline.features)
+        }
+
+
+def load_artifacts(pipeline_file=pipeline_path, model_file=model_path, metadata_file=metadata_path, kind="xgboost"):
+    """
+    Lee y deserializa el pipeline y el modelo (y sus metadatos de entrenamiento si existen),
+    y comprueba que el orden de features coincide
+    """
+    logger.info("🔍 Cargando pipeline desde %s y modelo desde %s", pipeline_file, model_file)
+
+    with open(pipeline_file, 'rb') as f:
+        pipeline_bytes = f.read()
+    with open(os.path.abspath(model_file), "rb") as f:
+        model_bytes = f.read()
+    version = artifact_version(pipeline_bytes, model_bytes)
+
+    tree_ensemble = None
+    if kind == "xgboost" and settings.INFERENCE_ENGINE == "numpy":
+        # Motor NumPy: los árboles exportados de esta misma versión evitan deserializar el booster (y xgboost)
+        tree_ensemble = load_tree_ensemble(trees_file_for(model_file), version)
+    return build_loaded_model(pipeline_bytes, model_bytes, load_metadata(metadata_file), kind, tree_ensemble)
+
+
+def build_loaded_model(pipeline_bytes, model_bytes, metadata=None, kind="xgboost", tree_ensemble=None):
+    """
+    LoadedModel a partir del contenido de los artefactos (también lo usan los workers del pool de procesos)
+    """
+    pipeline = pickle.loads(pipeline_bytes)
+    logger.info("✅ Pipeline cargado: %s", type(pipeline).__name__)
+    version = artifact_version(pipeline_bytes, model_bytes)
+    logger.info("🏷️ Versión del modelo: %s", version)
+
+    model = None
+    if kind == "sklearn":
+        import io
+        import joblib
+        model = joblib.load(io.BytesIO(model_bytes))
+    elif tree_ensemble is None:
+        model = pickle.loads(model_bytes)
+    if model is not None:
+        logger.info("✅ Modelo cargado: %s", type(model).__name__)
+    check_model_features(model if model is not None else tree_ensemble, kind, pipeline.features)
+
+    loaded = LoadedModel(pipeline, model, version, metadata=metadata, kind=kind,
+                         model_loader=lambda: pickle.loads(model_bytes), tree_ensemble=tree_ensemble)
+    loaded.artifacts = (pipeline_bytes, model_bytes)
+    set_inference_threads(loaded, inference_nthread())
+    if kind == "sklearn":
+        loaded.class_order = sklearn_class_order(model.classes_)
+    else:
+        loaded.fast_iterations = resolve_fast_iterations(loaded)
+        logger.info("⚡ Modo rápido: %d de %d iteraciones", loaded.fast_iterations, loaded.num_iterations)
+    return loaded
+
+
+def trees_file_for(model_file):
+    # xgboost_multiclass_model.pkl → xgboost_multiclass_trees.npz (mismo directorio)
+    base = model_file[:-len("_model.pkl")] if model_file.endswith("_model.pkl") else os.path.splitext(model_file)[0]
+    return base + "_trees.npz"
+
+
+def load_tree_ensemble(trees_file, version):
+    """
+    Árboles exportados si el .npz existe y es de esta versión del modelo; si no, None
+    (se deserializa el booster y el evaluador se construye a partir de él)
+    """
+    if not os.path.exists(trees_file):
+        logger.info("ℹ️ Sin árboles exportados en %s: se carga el booster", trees_file)
+        return None
+    ensemble = TreeEnsemble.load(trees_file)
+    if ensemble.model_version != version:
+        logger.warning("⚠️ Los árboles de %s son de la versión %s y el modelo es la %s: se carga el booster "
+                       "(vuelve a exportarlos con python -m server.models.tree_ensemble)",
+                       trees_file, ensemble.model_version, version)
+        return None
+    logger.info("🌲 Árboles de la versión %s cargados desde %s (sin deserializar el booster)", version, trees_file)
+    return ensemble
+
+
+def check_model_features(model, kind, features):
+    if kind == "sklearn":
+        # Un modelo de scikit-learn con otro número de features no se puede usar con este pipeline
+        if getattr(model, "n_features_in_", len(features)) != len(features):
+            raise ValueError(f"El modelo espera {model.n_features_in_} features y el pipeline genera {len(features)}")
+        names = getattr(model, "feature_names_in_", None)
+    else:
+        # Booster o TreeEnsemble cargado del .npz
+        names = model.feature_names
+    # inplace_predict no valida nombres de columnas: comprobar una vez que el orden coincide
+    if names is not None and list(names) != list(features):
+        logger.warning("⚠️ El orden de features del pipeline no coincide con el del modelo")
+
+
+def sklearn_class_order(classes):
+    """
+    Índices de columna de predict_proba en el orden de CLASS_NAMES. Las clases pueden venir como
+    nombres ("Dropout") o como la codificación del dataset (0 = Dropout, 1 = Graduate, 2 = Enrolled).
+    """
+    classes = [c.item() if hasattr(c, "item") else c for c in classes]
+    order = []
+    for i, name in enumerate(CLASS_NAMES):
+        if name in classes:
+            order.append(classes.index(name))
+        elif i in classes:
+            order.append(classes.index(i))
+        else:
+            raise ValueError(f"El modelo no tiene la clase {name!r} (clases: {classes})")
+    return order
+
+
+def resolve_fast_iterations(loaded):
+    """
+    Corte del modo rápido: FAST_MODE_ITERATIONS si se define; si no, el menor corte medido al entrenar
+    dentro de FAST_MODE_MAX_F1_DROP; sin metadatos, la mitad de las iteraciones
+    """
+    n_rounds = loaded.num_iterations
+    if settings.FAST_MODE_ITERATIONS > 0:
+        return min(settings.FAST_MODE_ITERATIONS, n_rounds)
+    chosen = choose_fast_iterations((loaded.metadata or {}).get("iteration_cutoffs"), settings.FAST_MODE_MAX_F1_DROP)
+    return min(chosen, n_rounds) if chosen else max(1, n_rounds // 2)
+
+
+def inference_nthread():
+    # INFERENCE_NTHREAD, o los núcleos disponibles repartidos entre los workers del pool
+    return threads_per_call(settings.INFERENCE_POOL_SIZE, settings.INFERENCE_NTHREAD)
+
+
+def set_inference_threads(loaded, nthread):
+    """
+    Fija los hilos de XGBoost por predicción del par cargado (y de su copia para matrices dispersas)
+    """
+    loaded.nthread = nthread
+    if loaded.kind == "sklearn":
+        # Los bosques reparten los árboles entre n_jobs hilos al predecir
+        if hasattr(loaded.model, "n_jobs"):
+            loaded.model.n_jobs = nthread
+        return
+    # Sin el booster deserializado el nthread se aplica al cargarlo (LoadedModel.model)
+    if loaded.model_loaded:
+        loaded.model.set_param({'nthread': nthread})
+    if loaded.sparse_model is not None:
+        loaded.sparse_model.set_param({'nthread': nthread})
+
+
+# Par pipeline/modelo activo. No se carga al importar el módulo (arranque rápido): lo carga el
+# lifespan del servidor con load_model(), o la primera predicción que lo necesite
+active_model = None
+
+# Versiones anteriores para poder volver atrás (la más reciente al final)
+previous_models = deque(maxlen=max(1, settings.MODEL_ROLLBACK_HISTORY))
+_reload_lock = threading.Lock()
+
+def load_model() -> "LoadedModel":
+    """
+    Carga el par pipeline/modelo de disco si aún no está cargado y lo devuelve
+    """
+    global active_model
+    if active_model is None:
+        with _reload_lock:
+            if active_model is None:
+                try:
+                    active_model = load_artifacts()
+                except Exception as e:
+                    logger.exception("❌ Error cargando archivos: %s", e)
+                    raise
+    return active_model
+
+def get_active_model() -> "LoadedModel":
+    return active_model or load_model()
+
+def is_model_loaded() -> bool:
+    return active_model is not None
+
+def load_registered_model(spec) -> "LoadedModel":
+    loaded = load_artifacts(spec.pipeline_file, spec.model_file, spec.metadata_file, kind=spec.kind)
+    loaded.name = spec.name
+    return loaded
+
+# Modelos con nombre: el XGBoost activo y los de EXTRA_MODELS (se cargan la primera vez que se piden)
+model_registry = ModelRegistry(
+    loader=load_registered_model,
+    default_name=DEFAULT_MODEL_NAME,
+    default_loader=get_active_model,
+    default_loaded=lambda: active_model,
+    specs=parse_model_specs(settings.EXTRA_MODELS, artifacts_dir, pipeline_path)
+)
+
+def get_model(name=None) -> "LoadedModel":
+    """
+    Modelo por nombre (None = el XGBoost activo). Lanza KeyError si no está registrado.
+    """
+    return model_registry.get(name)
+
+def __getattr__(name):
+    # Alias de módulo del par activo (predictor.model, predictor.preprocessing_pipeline, predictor.model_version):
+    # se resuelven en cada acceso, así que siempre apuntan a la versión activa y cargan el modelo si hace falta
+    if name == "preprocessing_pipeline":
+        return get_active_model().pipeline
+    if name == "model":
+        return get_active_model().model
+    if name == "model_version":
+        return get_active_model().version
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Caché de predicciones: se invalida sola cuando cambia la versión del modelo activo
+prediction_cache = PredictionCache(
+    max_size=settings.PREDICTION_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
+    version_provider=lambda: active_model.version if active_model is not None else None,
+    enabled=settings.PREDICTION_CACHE_ENABLED
+)
+
+# Caché de explicaciones (mismas claves e invalidación; entradas más grandes, así que menos)
+explanation_cache = PredictionCache(
+    max_size=settings.EXPLANATION_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
+    version_provider=lambda: active_model.version if active_model is not None else None,
+    enabled=settings.PREDICTION_CACHE_ENABLED
+)
+
+def make_sparse_compatible_booster(booster):
+    """
+    Devuelve una copia del booster en la que el valor missing sigue la misma rama que el 0.
+    En una matriz CSR las entradas ausentes llegan como missing; el modelo se entrenó con ceros
+    densos y, sin este ajuste, muchas divisiones mandarían esas filas por la rama equivocada.
+    """
+    import xgboost as xgb
+
+    model_json = json.loads(booster.save_raw('json'))
+    for tree in model_json['learner']['gradient_booster']['model']['trees']:
+        # Un 0 va a la izquierda cuando 0 < umbral (las hojas no se consultan)
+        tree['default_left'] = [int(0 < condition) for condition in tree['split_conditions']]
+
+    sparse_booster = xgb.Booster()
+    sparse_booster.load_model(bytearray(json.dumps(model_json, ensure_ascii=False), 'utf-8'))
+    return sparse_booster
+
+def get_sparse_model(loaded=None):
+    # Copia del modelo para matrices dispersas (se construye la primera vez que se pide)
+    loaded = loaded or get_active_model()
+    if loaded.sparse_model is None:
+        loaded.sparse_model = make_sparse_compatible_booster(loaded.model)
+        if loaded.nthread is not None:
+            loaded.sparse_model.set_param({'nthread': loaded.nthread})
+    return loaded.sparse_model
+
+def predict_probabilities_sparse(X_sparse, loaded=None, iteration_range=None):
+    """
+    Probabilidades para una matriz CSR de PreprocessingPipeline.transform_sparse (misma salida que la ruta densa)
+    """
+    import xgboost as xgb
+
+    loaded = loaded or get_active_model()
+    dmatrix = xgb.DMatrix(X_sparse, feature_names=loaded.pipeline.features)
+    return get_sparse_model(loaded).predict(dmatrix, iteration_range=iteration_range or (0, 0))
+
+# Buffers de entrada float32 reutilizables, uno por hilo (cada worker del pool de inferencia tiene el suyo)
+_input_buffers = threading.local()
+
+def get_input_buffer(n_rows, loaded=None):
+    """
+    Devuelve una vista (n_rows, n_features) de un buffer float32 contiguo propio del hilo actual.
+    Solo crece: se reserva de nuevo únicamente cuando llega un lote más grande que los anteriores.
+    """
+    n_features = len((loaded or get_active_model()).pipeline.features)
+    buffer = getattr(_input_buffers, 'array', None)
+    if buffer is None or buffer.shape[0] < n_rows or buffer.shape[1] != n_features:
+        buffer = np.empty((max(n_rows, 32), n_features), dtype=np.float32)
+        _input_buffers.array = buffer
+    return buffer[:n_rows]
+
+def get_tree_ensemble(loaded=None):
+    # Evaluador NumPy de los mismos árboles (se construye la primera vez que se pide)
+    loaded = loaded or get_active_model()
+    if loaded.tree_ensemble is None:
+        loaded.tree_ensemble = TreeEnsemble.from_booster(loaded.model, model_version=loaded.version)
+    return loaded.tree_ensemble
+
+def predict_probabilities(X, loaded=None, iteration_range=None):
+    """
+    Probabilidades del modelo para una matriz float32 contigua, sin construir un DMatrix.
+    inplace_predict es thread-safe y devuelve un array nuevo, así que el buffer se puede reutilizar.
+    Con INFERENCE_ENGINE=numpy se evalúan los árboles exportados en NumPy (mismo resultado).
+    iteration_range=(0, k) usa solo las k primeras iteraciones (modo rápido).
+    """
+    loaded = loaded or get_active_model()
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if loaded.kind == "sklearn":
+        return loaded.model.predict_proba(X)[:, loaded.class_order]
+    if settings.INFERENCE_ENGINE == "numpy":
+        return get_tree_ensemble(loaded).predict_proba(X, iteration_range=iteration_range)
+    return loaded.model.inplace_predict(X, iteration_range=iteration_range or (0, 0))
+
+def process_worker_state(loaded=None):
+    """
+    Par activo del proceso principal, para configure_process_worker (se envía a cada worker al crearlo)
+    """
+    loaded = loaded or get_active_model()
+    pipeline_bytes, model_bytes = loaded.artifacts
+    return {
+        "version": loaded.version,
+        "kind": loaded.kind,
+        "pipeline_bytes": pipeline_bytes,
+        "model_bytes": model_bytes,
+        "metadata": loaded.metadata,
+        # Con el motor NumPy los árboles ya construidos evitan deserializar el booster en cada worker
+        "tree_ensemble": loaded.tree_ensemble if settings.INFERENCE_ENGINE == "numpy" else None
+    }
+
+# Variable de entorno con el fichero del modelo activo que precarga el forkserver (forkserver_preload)
+WORKER_STATE_ENV = "INFERENCE_WORKER_STATE_FILE"
+
+# En un worker del pool de procesos: False si tuvo que cargar su propia copia del modelo
+worker_model_shared = None
+# En el proceso principal: modelo de cada worker (pid → {"version", "shared"}), enviado con sus estadísticas
+worker_models = {}
+
+def export_process_worker_state(loaded=None):
+    """
+    Escribe el par activo en el fichero que lee forkserver_preload al arrancar el forkserver. El pool lo
+    llama antes de (re)arrancarlo: tras una recarga o un rollback el forkserver nuevo precarga el modelo
+    activo y los workers lo comparten por copy-on-write, sin cargar cada uno su copia.
+    """
+    path = os.environ.get(WORKER_STATE_ENV)
+    if not path:
+        fd, path = tempfile.mkstemp(prefix="inference-worker-state-", suffix=".pkl")
+        os.close(fd)
+        # El forkserver hereda el entorno del proceso principal
+        os.environ[WORKER_STATE_ENV] = path
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(process_worker_state(loaded), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+    return path
+
+def remove_process_worker_state():
+    path = os.environ.pop(WORKER_STATE_ENV, None)
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def activate_worker_state(state):
+    """
+    Activa en este proceso el par de process_worker_state si no es ya el activo. Devuelve True si se cargó.
+    """
+    global active_model
+    if active_model is not None and active_model.version == state["version"]:
+        return False
+    active_model = build_loaded_model(state["pipeline_bytes"], state["model_bytes"], state["metadata"],
+                                      state["kind"], state["tree_ensemble"])
+    return True
 
-print(f"🔍 Cargando desde:")
-print(f"   Pipeline: {pipeline_path}")
-print(f"   Modelo: {model_path}")
-
-# Cargar pipeline y modelo
-try:
-    with open(pipeline_path, 'rb') as f:
-        preprocessing_pipeline = pickle.load(f)
-    print(f"✅ Pipeline cargado: {type(preprocessing_pipeline)}")
-    
-    with open(os.path.abspath(model_path), "rb") as f:
-        model = pickle.load(f)
-    print(f"✅ Modelo cargado: {type(model)}")
-    
-except Exception as e:
-    print(f"❌ Error cargando archivos: {e}")
-    raise
+def configure_process_worker(threads_per_worker=None, state=None):
+    """
+    Inicializador de cada proceso del pool de inferencia (INFERENCE_POOL_MODE=process).
+    El worker nace del forkserver con el modelo activo ya cargado (forkserver_preload). Si el proceso
+    principal tiene otro (el forkserver no se pudo reiniciar tras una recarga), se carga a partir de
+    state: funciona, pero ese worker tiene su propia copia (se indica en /model/status).
+    Limita los hilos de XGBoost del worker para que N workers no compitan por los mismos núcleos
+    (por defecto inference_nthread()).
+    """
+    global worker_model_shared
+    worker_model_shared = True
+    if state is not None and activate_worker_state(state):
+        worker_model_shared = False
+        logger.warning("⚠️ Worker %d con copia propia del modelo %s (el forkserver precargó otra versión)",
+                       os.getpid(), state["version"])
+    set_inference_threads(get_active_model(), threads_per_worker or inference_nthread())
+
+# Mapeo de clases (debe coincidir con el entrenamiento)
+CLASS_NAMES = ["Dropout", "Graduate", "Enrolled"]
+
+# Hasta este tamaño de lote se preprocesa con transform_records en lugar de DataFrame
+RECORDS_FAST_PATH_MAX_ROWS = 1000
+
+def collect_worker_stats():
+    """
+    En un worker del pool de procesos: métricas, contadores de las cachés y latencias de los modelos
+    acumulados desde la última llamada. El pool los devuelve con cada resultado y el proceso
+    principal los suma con merge_worker_stats (en modo process la inferencia no ocurre allí).
+    """
+    latencies = []
+    for loaded in model_registry.loaded_models().values():
+        if loaded.latencies:
+            samples = [loaded.latencies.popleft() for _ in range(len(loaded.latencies))]
+            latencies.append((loaded.name, loaded.version, samples))
+    return {
+        "pid": os.getpid(),
+        "metrics": metrics_registry.drain(),
+        "prediction_cache": prediction_cache.drain_stats(),
+        "explanation_cache": explanation_cache.drain_stats(),
+        "latencies": latencies,
+        "model": {"version": active_model.version if active_model else None, "shared": worker_model_shared}
+    }
+
+def merge_worker_stats(stats):
+    metrics_registry.merge(stats["metrics"])
+    prediction_cache.merge_stats(stats["pid"], stats["prediction_cache"])
+    explanation_cache.merge_stats(stats["pid"], stats["explanation_cache"])
+    for name, version, samples in stats["latencies"]:
+        model_registry.record_worker_latencies(name, version, samples)
+    worker_models[stats["pid"]] = stats["model"]
+
+def forget_worker_stats():
+    # Tras recrear los workers del pool: el tamaño de sus cachés y su modelo vuelven a empezar
+    prediction_cache.forget_workers()
+    explanation_cache.forget_workers()
+    worker_models.clear()
+
+def worker_model_stats():
+    """
+    Modelo de los workers del pool de procesos que ya han respondido: versiones y cuántos tienen su
+    propia copia en lugar de compartir la del forkserver
+    """
+    models = list(worker_models.values())
+    return {
+        "workers_reporting": len(models),
+        "versions": sorted({model["version"] for model in models if model["version"]}),
+        "private_copies": sum(1 for model in models if model["shared"] is False)
+    }
+
+def format_prediction(probs_array, n_features, model_type="XGBoost") -> dict:
+    """
+    Convierte una fila de probabilidades del modelo en el diccionario de resultado del API
+    """
+    predicted_class_idx = int(np.argmax(probs_array))
+    return {
+        'prediction': CLASS_NAMES[predicted_class_idx],
+        'probabilities': {name: float(probs_array[i]) for i, name in enumerate(CLASS_NAMES)},
+        'confidence': float(probs_array[predicted_class_idx]),  # Confianza = probabilidad máxima
+        'model_type': model_type,
+        'preprocessed_features_count': n_features
+    }
+
+def predict_students_with_probabilities(records: list, loaded=None, fast=False) -> list:
+    """
+    Predicción por lotes: un único preprocesamiento vectorizado y una sola llamada al booster.
+    Devuelve un resultado por registro, en el mismo orden de entrada.
+    Con fast=True se usan solo las primeras loaded.fast_iterations iteraciones.
+    """
+    if not records:
+        return []
+
+    loaded = loaded or get_active_model()
+    logger.debug("📦 Predicción por lotes: %d estudiantes", len(records))
+    with MODEL_STAGE_DURATION.time(stage="preprocess", model=loaded.name):
+        if len(records) <= RECORDS_FAST_PATH_MAX_ROWS:
+            # Lotes pequeños (micro-batching): la ruta sin pandas, escribiendo en el buffer del hilo
+            X_preprocessed = loaded.pipeline.transform_records(records, out=get_input_buffer(len(records), loaded))
+        else:
+            import pandas as pd
+            X_preprocessed = loaded.pipeline.transform(pd.DataFrame(records)).to_numpy(dtype=np.float32)
+
+    with MODEL_STAGE_DURATION.time(stage="predict", model=loaded.name):
+        start = time.perf_counter()
+        prediction_probabilities = predict_probabilities(
+            X_preprocessed, loaded, iteration_range=(0, loaded.fast_iterations) if fast else None
+        )
+        loaded.record_latency(time.perf_counter() - start, len(records))
+    ROWS_SCORED.inc(len(records), model=loaded.name)
+
+    with MODEL_STAGE_DURATION.time(stage="format", model=loaded.name):
+        return [
+            format_prediction(probs_array, X_preprocessed.shape[1], loaded.model_type)
+            for probs_array in prediction_probabilities
+        ]
+
+def predict_students_with_model(records: list, model_name=None, fast=False) -> list:
+    """
+    predict_students_with_probabilities con el modelo registrado con ese nombre (None = el XGBoost activo)
+    """
+    return predict_students_with_probabilities(records, get_model(model_name), fast=fast)
+
+def predict_students_cached(records: list, fast=False, model_name=None) -> list:
+    """
+    Igual que predict_students_with_probabilities pero consultando antes la caché de predicciones:
+    solo los registros que no están en caché se mandan al modelo (en un único lote).
+    """
+    loaded = get_model(model_name)
+    # Los resultados del modo rápido y de otros modelos se guardan aparte de los del modelo por defecto
+    mode_key = ("fast",) if fast else ()
+    # put() descarta lo que no calculó el XGBoost activo; la clave de otros modelos ya lleva su versión
+    put_version = loaded.version
+    if model_name not in (None, DEFAULT_MODEL_NAME):
+        mode_key += (model_name, loaded.version)
+        put_version = None
+    with MODEL_STAGE_DURATION.time(stage="cache_lookup", model=loaded.name):
+        keys = [prediction_cache.make_key(record) + mode_key for record in records]
+        results = [prediction_cache.get(key) for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        fresh_results = predict_students_with_probabilities([records[i] for i in missing], loaded, fast=fast)
+        for i, result in zip(missing, fresh_results):
+            prediction_cache.put(keys[i], result, version=put_version)
+            results[i] = result
+
+    return results
+
+# ---------------------------
+# Explicaciones: contribución de cada campo de StudentInput (pred_contribs)
+
+# Número de factores que se destacan por estudiante
+TOP_FACTORS = 5
+
+def get_contribution_groups(loaded=None):
+    """
+    (campos, matriz de agrupación) para sumar las contribuciones de cada bloque one-hot en su campo
+    original. La matriz tiene forma (n_features + 1, n_campos + 1): la última fila/columna es el sesgo.
+    """
+    loaded = loaded or get_active_model()
+    if loaded.contribution_groups is None:
+        groups = loaded.pipeline.feature_groups()
+        fields = list(groups)
+        grouping = np.zeros((len(loaded.pipeline.features) + 1, len(fields) + 1), dtype=np.float32)
+        for j, field in enumerate(fields):
+            grouping[groups[field], j] = 1.0
+        grouping[-1, -1] = 1.0
+        loaded.contribution_groups = (fields, grouping)
+    return loaded.contribution_groups
+
+def explain_students(records: list, loaded=None) -> list:
+    """
+    Explicación por lotes con los valores SHAP exactos de XGBoost (pred_contribs), en una sola llamada.
+    Para cada clase: contribución de cada campo al margen (log-odds) y valor base; la suma de ambos
+    es el margen de la clase, y su softmax las probabilidades del modelo completo.
+    """
+    import xgboost as xgb
+
+    if not records:
+        return []
+    loaded = loaded or get_active_model()
+    X = loaded.pipeline.transform_records(records)
+    contributions = loaded.model.predict(
+        xgb.DMatrix(X, feature_names=loaded.pipeline.features), pred_contribs=True
+    )  # (n_filas, n_clases, n_features + 1)
+
+    fields, grouping = get_contribution_groups(loaded)
+    grouped = contributions @ grouping  # (n_filas, n_clases, n_campos + 1)
+
+    margins = grouped.sum(axis=2)
+    probabilities = np.exp(margins - margins.max(axis=1, keepdims=True))
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+
+    explanations = []
+    for record, row, probs in zip(records, grouped, probabilities):
+        predicted_idx = int(np.argmax(probs))
+        predicted = row[predicted_idx, :-1]
+        top = np.argsort(-np.abs(predicted))[:TOP_FACTORS]
+        explanations.append({
+            'prediction': CLASS_NAMES[predicted_idx],
+            'probabilities': {name: float(probs[i]) for i, name in enumerate(CLASS_NAMES)},
+            'base_values': {name: float(row[i, -1]) for i, name in enumerate(CLASS_NAMES)},
+            'contributions': {
+                name: {field: float(row[i, j]) for j, field in enumerate(fields)}
+                for i, name in enumerate(CLASS_NAMES)
+            },
+            # Campos que más empujan hacia (positivo) o en contra (negativo) de la clase predicha
+            'top_factors': [
+                {'field': fields[j], 'value': record.get(fields[j]), 'contribution': float(predicted[j])}
+                for j in top
+            ]
+        })
+    return explanations
+
+def explain_students_cached(records: list) -> list:
+    """
+    explain_students consultando antes la caché de explicaciones (los perfiles repetidos no se recalculan)
+    """
+    loaded = get_active_model()
+    keys = [explanation_cache.make_key(record) for record in records]
+    results = [explanation_cache.get(key) for key in keys]
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        fresh_results = explain_students([records[i] for i in missing], loaded)
+        for i, result in zip(missing, fresh_results):
+            explanation_cache.put(keys[i], result, version=loaded.version)
+            results[i] = result
+
+    return results
+
+# ---------------------------
+# Recarga en caliente
+
+# Estudiantes representativos para calentar y validar un modelo recién cargado antes de activarlo
+WARM_UP_RECORDS = [
+    {
+        'curricular_units_1st_sem_grade': 15.0, 'curricular_units_2nd_sem_grade': 14.0,
+        'curricular_units_1st_sem_approved': 5, 'curricular_units_2nd_sem_approved': 4,
+        'curricular_units_1st_sem_evaluations': 6, 'curricular_units_2nd_sem_evaluations': 5,
+        'unemployment_rate': 10.0, 'gdp': 1.5, 'age_at_enrollment': 20,
+        'scholarship_holder': 'Yes', 'tuition_fees_up_to_date': 'Yes', 'marital_status': 'Single',
+        'previous_qualification': 'Secondary education',
+        'mothers_qualification': 'Higher education—bachelor’s degree',
+        'fathers_qualification': 'Secondary education—12th year of schooling or equivalent'
+    },
+    {
+        'curricular_units_1st_sem_grade': 0.0, 'curricular_units_2nd_sem_grade': 0.0,
+        'curricular_units_1st_sem_approved': 0, 'curricular_units_2nd_sem_approved': 0,
+        'curricular_units_1st_sem_evaluations': 0, 'curricular_units_2nd_sem_evaluations': 0,
+        'unemployment_rate': 16.2, 'gdp': -3.1, 'age_at_enrollment': 45,
+        'scholarship_holder': 'No', 'tuition_fees_up_to_date': 'No', 'marital_status': 'Divorced',
+        'previous_qualification': 'Basic education 3rd cycle (9th/10th/11th year) or equivalent',
+        'mothers_qualification': 'Basic education 1st cycle (4th/5th year) or equivalent',
+        'fathers_qualification': 'Basic education 1st cycle (4th/5th year) or equivalent'
+    }
+]
+
+def warm_up(loaded, batch_sizes=(1, 32)):
+    """
+    Ejecuta predicciones de prueba con un par recién cargado (primeras llamadas, reserva de buffers)
+    y comprueba que devuelve probabilidades válidas. Lanza ValueError si no es así.
+    """
+    for batch_size in batch_sizes:
+        records = [WARM_UP_RECORDS[i % len(WARM_UP_RECORDS)] for i in range(batch_size)]
+        check_probabilities(predict_probabilities(loaded.pipeline.transform_records(records), loaded), batch_size)
+
+def check_probabilities(probabilities, n_rows):
+    if probabilities.shape != (n_rows, len(CLASS_NAMES)):
+        raise ValueError(f"Forma de salida inesperada: {probabilities.shape}")
+    if not np.isfinite(probabilities).all() or np.abs(probabilities.sum(axis=1) - 1).max() > 1e-3:
+        raise ValueError("El modelo no devuelve probabilidades válidas")
+
+def self_test(loaded=None) -> dict:
+    """
+    Predicción de prueba de un estudiante con el modelo activo, sin pasar por la caché ni registrar
+    métricas de etapa (la usa la comprobación periódica de /readyz). Lanza ValueError si falla.
+    """
+    loaded = loaded or get_active_model()
+    X = loaded.pipeline.transform_records(WARM_UP_RECORDS[:1])
+    probabilities = predict_probabilities(X, loaded)
+    check_probabilities(probabilities, 1)
+    return {'model_version': loaded.version, **format_prediction(probabilities[0], X.shape[1])}
+
+def _activate(loaded):
+    global active_model
+    # Una sola asignación de referencia: las predicciones nuevas ven el par nuevo completo
+    active_model = loaded
+
+def reload_model(pipeline_file=pipeline_path, model_file=model_path) -> dict:
+    """
+    Carga el par pipeline/modelo de disco, lo calienta y, si es válido, lo activa de forma atómica.
+    Las predicciones en curso terminan con el par anterior, que se guarda para rollback_model().
+    Si la carga o el calentamiento fallan se lanza la excepción y el modelo activo no cambia.
+    """
+    get_active_model()
+    with _reload_lock:
+        candidate = load_artifacts(pipeline_file, model_file)
+        if candidate.version == active_model.version:
+            logger.info("ℹ️ La versión %s ya está activa", candidate.version)
+            return {"reloaded": False, "active": active_model.describe()}
+
+        warm_up(candidate)
+
+        previous = active_model
+        previous_models.append(previous)
+        _activate(candidate)
+        logger.info("🔄 Modelo recargado: %s → %s", previous.version, candidate.version)
+        return {"reloaded": True, "active": candidate.describe(), "previous": previous.describe()}
+
+def rollback_model() -> dict:
+    """
+    Vuelve a activar la versión anterior del modelo. Lanza LookupError si no hay ninguna.
+    """
+    with _reload_lock:
+        if not previous_models:
+            raise LookupError("No hay ninguna versión anterior del modelo")
+
+        previous = previous_models.pop()
+        discarded = active_model
+        _activate(previous)
+        logger.info("⏪ Rollback del modelo: %s → %s", discarded.version, previous.version)
+        return {"active": previous.describe(), "discarded": discarded.describe()}
+
+def model_versions() -> dict:
+    return {
+        "active": get_active_model().describe(),
+        "previous": [loaded.describe() for loaded in reversed(previous_models)]
+    }
 
 def predict_student_outcome(data: dict) -> str:
     """
@@ -43,93 +806,48 @@ def predict_student_outcome_with_probabilities(data: dict) -> dict:
     """
     Nueva función que devuelve predicción + probabilidades reales del modelo XGBoost
     """
-    print("\n" + "="*50)
-    print("🎯 PREDICCIÓN CON PROBABILIDADES REALES")
-    print("="*50)
-    
-    print(f"📥 Datos de entrada: {data}")
-    print(f"✔️ Tipo de entrada: {type(data)}")
+    logger.debug("🎯 Predicción con probabilidades reales. Datos de entrada: %s", data)
+
+    loaded = get_active_model()
+    with MODEL_STAGE_DURATION.time(stage="cache_lookup", model=loaded.name):
+        cache_key = prediction_cache.make_key(data)
+        cached_result = prediction_cache.get(cache_key)
+    if cached_result is not None:
+        logger.debug("♻️ Resultado en caché: %s", cached_result['prediction'])
+        return cached_result
 
     try:
-        # 1. Convertir a DataFrame
-        df_input = pd.DataFrame([data])
-        print(f"\n🧾 DataFrame inicial:")
-        print(f"   Shape: {df_input.shape}")
-        print(f"   Columns: {list(df_input.columns)}")
-        print(f"   Datos: {df_input.iloc[0].to_dict()}")
-
-        # 2. Aplicar preprocesamiento
-        print(f"\n🔧 Aplicando preprocesamiento...")
-        X_preprocessed = preprocessing_pipeline.transform(df_input)
-        print(f"✅ Preprocesamiento completado:")
-        print(f"   Shape: {X_preprocessed.shape}")
-        print(f"   Columnas: {len(X_preprocessed.columns)}")
-        print(f"   Suma total: {X_preprocessed.sum().sum()}")
+        # 1-2. Preprocesamiento directo a matriz float32 (sin construir DataFrames)
+        with MODEL_STAGE_DURATION.time(stage="preprocess", model=loaded.name):
+            X_preprocessed = loaded.pipeline.transform_records([data], out=get_input_buffer(1, loaded))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("✅ Preprocesamiento completado: shape %s, suma total %s", X_preprocessed.shape, X_preprocessed.sum())
 
         # 3. Verificar que no todos los valores sean 0
-        if X_preprocessed.sum().sum() == 0:
-            print("⚠️ ADVERTENCIA: Todos los valores son 0 después del preprocesamiento!")
-            print("Esto indica un problema en el pipeline de preprocesamiento")
-
-        # 4. Crear DMatrix y obtener probabilidades
-        dmatrix = xgb.DMatrix(X_preprocessed)
-        prediction_probabilities = model.predict(dmatrix)
-        
-        print(f"\n🔮 Probabilidades del modelo XGBoost:")
-        print(f"   Shape: {prediction_probabilities.shape}")
-        print(f"   Tipo: {type(prediction_probabilities)}")
-        print(f"   Valores raw: {prediction_probabilities}")
-        
-        # 5. Extraer probabilidades y clase predicha
-        probs_array = prediction_probabilities[0]  # Primera (y única) predicción
-        predicted_class_idx = np.argmax(probs_array)
-        
-        # Mapeo de clases (debe coincidir con el entrenamiento)
-        class_map = {
-            0: "Dropout",
-            1: "Graduate", 
-            2: "Enrolled"
-        }
-        
-        predicted_class = class_map[predicted_class_idx]
-        confidence = float(probs_array[predicted_class_idx])  # Confianza = probabilidad máxima
-        
-        # 6. Crear diccionario de probabilidades con nombres legibles
-        probabilities = {
-            "Dropout": float(probs_array[0]),
-            "Graduate": float(probs_array[1]),
-            "Enrolled": float(probs_array[2])
-        }
-        
-        print(f"\n🎯 Resultado detallado:")
-        print(f"   Clase predicha: {predicted_class} (índice {predicted_class_idx})")
-        print(f"   Confianza: {confidence:.4f} ({confidence*100:.1f}%)")
-        print(f"   Probabilidades:")
-        for class_name, prob in probabilities.items():
-            indicator = " ← PREDICHA" if class_name == predicted_class else ""
-            print(f"     {class_name}: {prob:.4f} ({prob*100:.1f}%){indicator}")
-        
+        if not X_preprocessed.any():
+            logger.warning("⚠️ Todos los valores son 0 después del preprocesamiento: posible problema en el pipeline")
+
+        # 4. Obtener probabilidades (inplace_predict, sin DMatrix)
+        with MODEL_STAGE_DURATION.time(stage="predict", model=loaded.name):
+            start = time.perf_counter()
+            prediction_probabilities = predict_probabilities(X_preprocessed, loaded)
+            loaded.record_latency(time.perf_counter() - start, 1)
+        ROWS_SCORED.inc(model=loaded.name)
+        logger.debug("🔮 Probabilidades del modelo XGBoost (raw): %s", prediction_probabilities)
+
+        # 5-6. Extraer clase predicha, confianza y probabilidades con nombres legibles
+        result = format_prediction(prediction_probabilities[0], X_preprocessed.shape[1])  # Primera (y única) predicción
+        logger.debug("🎯 Clase predicha: %s (confianza %.4f), probabilidades: %s",
+                     result['prediction'], result['confidence'], result['probabilities'])
+
         # 7. Verificar que las probabilidades suman 1
-        prob_sum = sum(probabilities.values())
-        print(f"   Suma de probabilidades: {prob_sum:.6f}")
-        
+        prob_sum = sum(result['probabilities'].values())
         if abs(prob_sum - 1.0) > 0.001:
-            print(f"⚠️ ADVERTENCIA: Las probabilidades no suman 1.0 (suman {prob_sum:.6f})")
-        
-        # 8. Resultado final
-        result = {
-            'prediction': predicted_class,
-            'probabilities': probabilities,
-            'confidence': confidence,
-            'model_type': 'XGBoost',
-            'preprocessed_features_count': X_preprocessed.shape[1]
-        }
-        
-        print(f"\n✅ Predicción completada exitosamente")
+            logger.warning("⚠️ Las probabilidades no suman 1.0 (suman %.6f)", prob_sum)
+
+        prediction_cache.put(cache_key, result, version=loaded.version)
         return result
 
-    except Exception as e:
-        print(f"\n💥 ERROR en predictor: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("💥 ERROR en predictor")
         raise
\ No newline at end of file
@@ -1,27 +1,69 @@
-import pandas as pd
+import logging
+import numpy as np
 import os
 
+logger = logging.getLogger(__name__)
+
+# Prefijos de las variables categóricas originales (orden de prioridad al parsear)
+ONE_HOT_PREFIXES = [
+    "mother's_qualification",
+    "father's_qualification",
+    'marital_status',
+    'scholarship_holder',
+    'tuition_fees_up_to_date',
+    'previous_qualification'
+]
+
+# Nombres del API → nombres del dataset para las variables numéricas
+NUMERICAL_MAPPING = {
+    'curricular_units_1st_sem_grade': 'curricular_units_1st_sem_(grade)',
+    'curricular_units_2nd_sem_grade': 'curricular_units_2nd_sem_(grade)',
+    'curricular_units_1st_sem_approved': 'curricular_units_1st_sem_(approved)',
+    'curricular_units_2nd_sem_approved': 'curricular_units_2nd_sem_(approved)',
+    'curricular_units_1st_sem_evaluations': 'curricular_units_1st_sem_(evaluations)',
+    'curricular_units_2nd_sem_evaluations': 'curricular_units_2nd_sem_(evaluations)'
+}
+
+
+def split_one_hot_feature(one_hot_feature):
+    """
+    Separa una feature one-hot en (base, valor esperado).
+    Ejemplo: "scholarship_holder_Yes" → ("scholarship_holder", "Yes")
+    Devuelve None si el nombre no tiene formato one-hot.
+    """
+    if '_' not in one_hot_feature:
+        return None
+
+    for prefix in ONE_HOT_PREFIXES:
+        if one_hot_feature.startswith(prefix + '_'):
+            return prefix, one_hot_feature.replace(prefix + '_', '')
+
+    # Fallback: usar los primeros 2 elementos como base
+    parts = one_hot_feature.split('_')
+    return "_".join(parts[:2]), "_".join(parts[2:])
+
+
 class PreprocessingPipeline:
     def __init__(self, features, categorical_features=None, numerical_features=None):
         self.features = features
-        
+
         # ✅ CORREGIR: Auto-detectar features categóricas vs numéricas correctamente
         self.true_numerical_features = []
         self.true_categorical_features = []
-        
+
         # Features que son verdaderamente numéricas (sin guiones bajos de one-hot)
         true_numerical_names = [
             'curricular_units_1st_sem_(grade)',
-            'curricular_units_2nd_sem_(grade)', 
+            'curricular_units_2nd_sem_(grade)',
             'curricular_units_1st_sem_(approved)',
             'curricular_units_2nd_sem_(approved)',
             'curricular_units_1st_sem_(evaluations)',
             'curricular_units_2nd_sem_(evaluations)',
             'unemployment_rate',
-            'gdp', 
+            'gdp',
             'age_at_enrollment'
         ]
-        
+
         # Clasificar correctamente
         for feature in features:
             if feature in true_numerical_names:
@@ -29,148 +71,195 @@ class PreprocessingPipeline:
             else:
                 # Todo lo demás son columnas one-hot encoded (categóricas)
                 self.true_categorical_features.append(feature)
-        
+
         # Mapear nombres de campo del API a nombres del dataset
         self.field_mapping = {
             'mothers_qualification': "mother's_qualification",
             'fathers_qualification': "father's_qualification"
         }
-        
+
+        self._compile()
+
         print(f"🏗️ Pipeline inicializado con:")
         print(f"   Features totales: {len(self.features)}")
         print(f"   Numéricas REALES: {len(self.true_numerical_features)}")
         print(f"   Categóricas REALES (one-hot): {len(self.true_categorical_features)}")
-    
+
+    def __getstate__(self):
+        # Los índices compilados no se serializan: se reconstruyen al cargar
+        return {k: v for k, v in self.__dict__.items() if not k.startswith('_')}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def _compile(self):
+        """
+        Precalcula una sola vez los índices de columna para no parsear nombres en cada predicción
+        """
+        # Columnas del input que alimentan cada columna de salida, por orden de prioridad
+        # (el nombre del API tiene preferencia sobre el del dataset, como en el mapeo original)
+        dataset_to_api = {v: k for k, v in NUMERICAL_MAPPING.items()}
+        dataset_to_api.update({v: k for k, v in self.field_mapping.items()})
+
+        categorical = set(self.true_categorical_features)
+
+        # (base, valor) → índice de columna
+        self._one_hot_index = {}
+        # Columnas que se copian tal cual del input: [(índice, (fuentes...))]
+        self._passthrough = []
+
+        for idx, feature in enumerate(self.features):
+            parsed = split_one_hot_feature(feature) if feature in categorical else None
+            if parsed is None:
+                sources = (feature,)
+                if feature in dataset_to_api:
+                    sources = (dataset_to_api[feature], feature)
+                self._passthrough.append((idx, sources))
+            else:
+                self._one_hot_index[parsed] = idx
+
+        # base → fuentes en el input y base → {valor: índice}
+        self._one_hot_sources = {}
+        self._one_hot_lookup = {}
+        for (base, value), idx in self._one_hot_index.items():
+            if base not in self._one_hot_sources:
+                sources = (base,)
+                if base in dataset_to_api:
+                    sources = (dataset_to_api[base], base)
+                self._one_hot_sources[base] = sources
+                self._one_hot_lookup[base] = {}
+            self._one_hot_lookup[base][value] = idx
+
+    def feature_groups(self):
+        """
+        Campo del API → índices de las columnas de salida que genera (la columna numérica o todo su
+        bloque one-hot), en el orden de las features. Sirve para agrupar contribuciones por campo.
+        """
+        groups = {}
+        for idx, sources in self._passthrough:
+            groups.setdefault(sources[0], []).append(idx)
+        for (base, _), idx in sorted(self._one_hot_index.items(), key=lambda item: item[1]):
+            groups.setdefault(self._one_hot_sources[base][0], []).append(idx)
+        return groups
+
+    @staticmethod
+    def _first_present(sources, columns):
+        for source in sources:
+            if source in columns:
+                return source
+        return None
+
+    def _one_hot_entries(self, X, columns):
+        """
+        Genera (filas, columnas) de los unos del bloque one-hot, una variable categórica cada vez
+        (valor → índice de columna con un solo map por variable)
+        """
+        for base, sources in self._one_hot_sources.items():
+            source = self._first_present(sources, columns)
+            if source is None:
+                continue
+            column_idx = X[source].astype(str).map(self._one_hot_lookup[base]).to_numpy(dtype=float)
+            rows = np.flatnonzero(~np.isnan(column_idx))
+            yield rows, column_idx[rows].astype(np.intp)
+
     def transform(self, X):
         """
-        Transforma los datos de entrada al formato esperado por el modelo
+        Transforma los datos de entrada al formato esperado por el modelo.
+        Acepta N filas: cada una se codifica con sus propios valores.
+        """
+        import pandas as pd  # Solo se necesita para la ruta DataFrame (se importa al usarla)
+
+        logger.debug("📥 Input DataFrame: shape %s", X.shape)
+
+        columns = set(X.columns)
+        # Orden Fortran: se escribe columna a columna y pandas lo adopta sin copiar
+        result = np.zeros((len(X), len(self.features)), order='F')
+
+        # 1. Variables numéricas (con el mapeo de nombres API → dataset)
+        for idx, sources in self._passthrough:
+            source = self._first_present(sources, columns)
+            if source is not None:
+                result[:, idx] = X[source].to_numpy()
+
+        # 2. One-hot encoding vectorizado: cada fila se compara con su propio valor
+        for rows, cols in self._one_hot_entries(X, columns):
+            result[rows, cols] = 1
+
+        # 3. Resultado con las columnas en el orden esperado por el modelo
+        result = pd.DataFrame(result, columns=self.features, index=X.index, copy=False)
+
+        if logger.isEnabledFor(logging.DEBUG) and len(result) > 0:
+            logger.debug("📤 Resultado final: shape %s, features no-cero (fila 0): %d",
+                         result.shape, np.count_nonzero(result.to_numpy()[0]))
+
+        return result
+
+    def transform_sparse(self, X):
+        """
+        Igual que transform pero devuelve una scipy.sparse.csr_matrix float32 con solo los valores no-cero.
+        Ojo: XGBoost trata las entradas ausentes como missing, no como 0; para predecir con esta
+        matriz hay que usar el booster de predictor.get_sparse_model().
         """
-        print(f"\n📥 Input DataFrame:")
-        print(f"   Shape: {X.shape}")
-        print(f"   Columns: {list(X.columns)}")
-        
-        X_processed = X.copy()
-        
-        # 1. Mapear nombres de campos si es necesario
-        for api_field, dataset_field in self.field_mapping.items():
-            if api_field in X_processed.columns:
-                X_processed[dataset_field] = X_processed[api_field]
-                X_processed.drop(api_field, axis=1, inplace=True)
-                print(f"🔄 Mapeado {api_field} → {dataset_field}")
-        
-        print(f"\n🔧 Procesando variables categóricas (one-hot encoding)...")
-        
-        # 2. Crear columnas one-hot a partir de valores categóricos originales
-        for one_hot_feature in self.true_categorical_features:
-            # Parsear el nombre de la feature one-hot
-            # Ejemplo: "scholarship_holder_Yes" → base="scholarship_holder", expected_value="Yes"
-            
-            if '_' not in one_hot_feature:
+        from scipy import sparse
+
+        columns = set(X.columns)
+        rows, cols, data = [], [], []
+
+        # 1. Variables numéricas (solo los valores distintos de cero)
+        for idx, sources in self._passthrough:
+            source = self._first_present(sources, columns)
+            if source is None:
                 continue
-                
-            # Encontrar la separación correcta entre base y value
-            parts = one_hot_feature.split('_')
-            
-            # Para features con múltiples palabras, tenemos que ser inteligentes
-            if len(parts) >= 2:
-                # Caso especial para mother's/father's qualification
-                if one_hot_feature.startswith("mother's_qualification_"):
-                    base_name = "mother's_qualification"
-                    expected_value = one_hot_feature.replace("mother's_qualification_", "")
-                elif one_hot_feature.startswith("father's_qualification_"):
-                    base_name = "father's_qualification"
-                    expected_value = one_hot_feature.replace("father's_qualification_", "")
-                elif one_hot_feature.startswith("marital_status_"):
-                    base_name = "marital_status"
-                    expected_value = one_hot_feature.replace("marital_status_", "")
-                elif one_hot_feature.startswith("scholarship_holder_"):
-                    base_name = "scholarship_holder"
-                    expected_value = one_hot_feature.replace("scholarship_holder_", "")
-                elif one_hot_feature.startswith("tuition_fees_up_to_date_"):
-                    base_name = "tuition_fees_up_to_date"
-                    expected_value = one_hot_feature.replace("tuition_fees_up_to_date_", "")
-                elif one_hot_feature.startswith("previous_qualification_"):
-                    base_name = "previous_qualification"
-                    expected_value = one_hot_feature.replace("previous_qualification_", "")
-                else:
-                    # Fallback: usar los primeros 2 elementos como base
-                    base_name = "_".join(parts[:2])
-                    expected_value = "_".join(parts[2:])
-                
-                # Buscar la columna original en el dataframe de entrada
-                if base_name in X_processed.columns:
-                    actual_value = str(X_processed[base_name].iloc[0])
-                    
-                    # Crear columna one-hot: 1 si coincide, 0 si no
-                    X_processed[one_hot_feature] = 1 if actual_value == expected_value else 0
-                    
-                    if X_processed[one_hot_feature].iloc[0] == 1:
-                        print(f"✅ {one_hot_feature} = 1 | '{actual_value}' == '{expected_value}' ✓")
-                    else:
-                        print(f"   {one_hot_feature} = 0 | '{actual_value}' != '{expected_value}'")
-                else:
-                    # Si no encontramos la columna base, poner 0
-                    X_processed[one_hot_feature] = 0
-                    print(f"❌ No encontrada columna base '{base_name}' para {one_hot_feature}")
-        
-        # 3. Eliminar columnas categóricas originales (que ya convertimos a one-hot)
-        original_categorical_columns = [
-            'scholarship_holder', 'tuition_fees_up_to_date', 'marital_status',
-            'previous_qualification', "mother's_qualification", "father's_qualification"
-        ]
-        
-        for col in original_categorical_columns:
-            if col in X_processed.columns:
-                X_processed.drop(col, axis=1, inplace=True)
-                print(f"🗑️ Eliminada columna categórica original: {col}")
-        
-        print(f"\n🔧 Procesando variables numéricas...")
-        
-        # 4. Mapear variables numéricas con nombres diferentes
-        numerical_mapping = {
-            'curricular_units_1st_sem_grade': 'curricular_units_1st_sem_(grade)',
-            'curricular_units_2nd_sem_grade': 'curricular_units_2nd_sem_(grade)',
-            'curricular_units_1st_sem_approved': 'curricular_units_1st_sem_(approved)',
-            'curricular_units_2nd_sem_approved': 'curricular_units_2nd_sem_(approved)',
-            'curricular_units_1st_sem_evaluations': 'curricular_units_1st_sem_(evaluations)',
-            'curricular_units_2nd_sem_evaluations': 'curricular_units_2nd_sem_(evaluations)'
-        }
-        
-        for api_name, dataset_name in numerical_mapping.items():
-            if api_name in X_processed.columns and dataset_name in self.features:
-                X_processed[dataset_name] = X_processed[api_name]
-                X_processed.drop(api_name, axis=1, inplace=True)
-                print(f"✅ Mapeado numérico: {api_name} → {dataset_name} = {X_processed[dataset_name].iloc[0]}")
-        
-        # 5. Añadir columnas faltantes con valor 0
-        missing_features = set(self.features) - set(X_processed.columns)
-        for feature in missing_features:
-            X_processed[feature] = 0
-            print(f"➕ Añadida feature faltante: {feature} = 0")
-        
-        # 6. Asegurar orden correcto de columnas
-        result = X_processed[self.features]
-        
-        print(f"\n📤 Resultado final:")
-        print(f"   Shape: {result.shape}")
-        print(f"   Features: {len(result.columns)}")
-        
-        # Mostrar resumen de valores no-cero
-        non_zero_features = {}
-        for col in result.columns:
-            val = result[col].iloc[0]
-            if val != 0:
-                non_zero_features[col] = val
-        
-        print(f"   Features no-cero ({len(non_zero_features)}):")
-        for feat, val in list(non_zero_features.items())[:15]:  # Mostrar más ejemplos
-            print(f"     {feat}: {val}")
-        if len(non_zero_features) > 15:
-            print(f"     ... y {len(non_zero_features) - 15} más")
-        
-        print(f"   Suma total: {result.sum().sum()}")
-        
+            values = X[source].to_numpy(dtype=np.float32)
+            non_zero = np.flatnonzero(values)
+            rows.append(non_zero)
+            cols.append(np.full(len(non_zero), idx, dtype=np.intp))
+            data.append(values[non_zero])
+
+        # 2. Bloque one-hot
+        for one_hot_rows, one_hot_cols in self._one_hot_entries(X, columns):
+            rows.append(one_hot_rows)
+            cols.append(one_hot_cols)
+            data.append(np.ones(len(one_hot_rows), dtype=np.float32))
+
+        shape = (len(X), len(self.features))
+        if not data:
+            return sparse.csr_matrix(shape, dtype=np.float32)
+        return sparse.coo_matrix(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=shape
+        ).tocsr()
+
+    def transform_records(self, records, out=None):
+        """
+        Ruta rápida sin pandas: lista de diccionarios → matriz float32 en el orden de self.features.
+        Pensada para pocas filas (una predicción por petición); para lotes grandes usar transform.
+        Si se pasa out (array float32 de forma (len(records), n_features)) se escribe en él sin reservar memoria.
+        """
+        if out is None:
+            result = np.zeros((len(records), len(self.features)), dtype=np.float32)
+        else:
+            result = out
+            result[...] = 0
+
+        for row, record in enumerate(records):
+            # 1. Variables numéricas
+            for idx, sources in self._passthrough:
+                for source in sources:
+                    if source in record:
+                        result[row, idx] = record[source]
+                        break
+
+            # 2. One-hot encoding
+            for base, sources in self._one_hot_sources.items():
+                for source in sources:
+                    if source in record:
+                        idx = self._one_hot_lookup[base].get(str(record[source]))
+                        if idx is not None:
+                            result[row, idx] = 1
+                        break
+
         return result
-    
+
     def fit_transform(self, X, y=None):
-        return self.transform(X)
\ No newline at end of file
+        return self.transform(X)
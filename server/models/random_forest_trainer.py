@@ -0,0 +1,115 @@
+import pandas as pd
+import os
+import time
+import pickle
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, precision_recall_fscore_support, classification_report
+from server.models.iteration_cutoffs import save_metadata
+import sys
+import server.models.preprocessing as preprocessing_module
+sys.modules['preprocessing'] = preprocessing_module
+
+# Random Forest servido junto al XGBoost (?model=random_forest). Usa el mismo dataset, la misma
+# división y el mismo pipeline (y por tanto las mismas features) que model_trainer.py: ejecutar
+# después de él.
+#
+# Ejecutar con:
+#     python -m server.models.random_forest_trainer
+
+#-------------------------------------------------------------------------------------------------------
+# Configuración de rutas
+print("🔧 Configurando rutas...")
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+server_path = os.path.dirname(current_dir)
+project_root = os.path.dirname(server_path)
+
+process_data_path = os.path.join(project_root, "data", "processed", "dataset_procesado.csv")
+data_server_path = os.path.join(server_path, "artifacts")
+pipeline_path = os.path.join(data_server_path, "xgboost_multiclass_pipeline.pkl")
+model_path = os.path.join(data_server_path, "random_forest_multiclass_model.joblib")
+metadata_path = os.path.join(data_server_path, "random_forest_multiclass_metadata.json")
+
+# ------------------------------------------------------------------------------------------------------
+# Cargar datos con las features del pipeline del XGBoost
+print("\n📊 Cargando datos...")
+
+with open(pipeline_path, 'rb') as f:
+    pipeline = pickle.load(f)
+features = list(pipeline.features)
+
+df = pd.read_csv(process_data_path)
+X = df[features].astype(np.float32)
+y = df['target']
+print(f"✅ Dataset cargado: {X.shape} ({len(features)} features del pipeline)")
+
+# Misma división 70/15/15 que model_trainer.py
+X_train_val, X_test, y_train_val, y_test = train_test_split(
+    X, y, test_size=0.15, random_state=42, stratify=y
+)
+X_train, X_val, y_train, y_val = train_test_split(
+    X_train_val, y_train_val, test_size=0.1765, random_state=42, stratify=y_train_val
+)
+
+# ------------------------------------------------------------------------------------------------------
+# Entrenamiento
+print("\n🚀 Entrenando Random Forest...")
+
+model = RandomForestClassifier(
+    n_estimators=300,
+    min_samples_leaf=2,
+    class_weight='balanced',
+    n_jobs=-1,
+    random_state=42
+)
+model.fit(X_train.to_numpy(), y_train.to_numpy())
+print("✅ Modelo entrenado")
+
+
+def evaluate(name, X_eval, y_true):
+    y_pred = model.predict(X_eval.to_numpy())
+    acc = accuracy_score(y_true, y_pred)
+    prec, rec, f1, _ = precision_recall_fscore_support(y_true, y_pred, average='macro')
+    print(f"{name} - Accuracy: {acc:.4f}, Precision: {prec:.4f}, Recall: {rec:.4f}, F1: {f1:.4f}")
+    return float(acc), float(f1)
+
+
+val_accuracy, val_f1 = evaluate("Validación", X_val, y_val)
+test_accuracy, test_f1 = evaluate("Test", X_test, y_test)
+
+print("\nReporte de clasificación (Test):")
+print(classification_report(y_test, model.predict(X_test.to_numpy()), target_names=['Dropout', 'Graduate', 'Enrolled']))
+
+# Latencia de predict_proba (mediana) para compararla con la del XGBoost
+latency_ms = {}
+for batch_size in (1, 256):
+    X_batch = np.resize(X_test.to_numpy(), (batch_size, len(features)))
+    model.predict_proba(X_batch)
+    timings = []
+    for _ in range(20):
+        start = time.perf_counter()
+        model.predict_proba(X_batch)
+        timings.append(time.perf_counter() - start)
+    latency_ms[str(batch_size)] = float(np.median(timings) * 1000)
+print(f"⏱️ Latencia predict_proba: {latency_ms['1']:.2f} ms (1 fila), {latency_ms['256']:.2f} ms (256 filas)")
+
+# ------------------------------------------------------------------------------------------------------
+# Guardar modelo y metadatos
+print("\n💾 Guardando modelo...")
+
+joblib.dump(model, model_path)
+print(f"✅ Modelo guardado en: {model_path}")
+
+save_metadata(metadata_path, {
+    "params": model.get_params(),
+    "metrics": {
+        "validation_accuracy": val_accuracy, "validation_f1_macro": val_f1,
+        "test_accuracy": test_accuracy, "test_f1_macro": test_f1
+    },
+    "latency_ms": latency_ms
+})
+print(f"✅ Metadatos guardados en: {metadata_path}")
+print(f"ℹ️ Para servirlo con ?model=random_forest añade al .env: EXTRA_MODELS=random_forest:sklearn:{os.path.basename(model_path)}")
@@ -0,0 +1,142 @@
+"""
+Puntuación en sombra de un modelo candidato.
+
+Las entradas de /predict (con la predicción que se devolvió) se copian a una cola acotada. Un hilo
+aparte las saca en lotes, las puntúa con el modelo candidato y acumula cuántas veces coincide la
+clase predicha y cuánto cambian las probabilidades. La petición solo hace un put_nowait: si la cola
+está llena el registro se descarta (y se cuenta) en lugar de esperar.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    """
+    score_batch(records) → resultados del candidato con el formato de predict_students_with_probabilities
+    """
+
+    def __init__(self, score_batch, model_name=None, max_queue_size=1000, batch_size=64, enabled=True):
+        self.score_batch = score_batch
+        self.model_name = model_name
+        self.batch_size = max(1, int(batch_size))
+        self.enabled = enabled
+
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue_size)))
+        self._worker = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.errors = 0
+        self.agreements = 0
+        self.batches = 0
+        self.scoring_seconds = 0.0
+        self.abs_delta_sum = Counter()          # Clase → suma de |p_candidato - p_principal|
+        self.max_abs_delta = 0.0
+        self.transitions = Counter()            # (principal, candidato) → número de registros
+        self.last_error = None
+
+    def submit(self, record, primary_result):
+        """
+        Copia una predicción a la cola de sombra sin bloquear. Devuelve False si se descartó.
+        """
+        if not self.enabled:
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((record, primary_result))
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        with self._stats_lock:
+            self.submitted += 1
+        return True
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stopping.clear()
+                self._worker = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        # Hasta stop(): lo que quede en la cola al parar se puntúa antes de salir
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch):
+        start = time.perf_counter()
+        try:
+            results = self.score_batch([record for record, _ in batch])
+        except Exception as e:
+            logger.warning("⚠️ Error puntuando en sombra con %s: %s", self.model_name, e)
+            with self._stats_lock:
+                self.errors += len(batch)
+                self.last_error = str(e)
+            return
+        elapsed = time.perf_counter() - start
+
+        with self._stats_lock:
+            self.batches += 1
+            self.scoring_seconds += elapsed
+            for (_, primary), candidate in zip(batch, results):
+                self.scored += 1
+                self.agreements += primary['prediction'] == candidate['prediction']
+                self.transitions[(primary['prediction'], candidate['prediction'])] += 1
+                for name, probability in primary['probabilities'].items():
+                    delta = abs(candidate['probabilities'].get(name, 0.0) - probability)
+                    self.abs_delta_sum[name] += delta
+                    self.max_abs_delta = max(self.max_abs_delta, delta)
+
+    def stop(self, timeout=5.0):
+        """
+        Puntúa lo que quede en la cola y para el hilo
+        """
+        self._stopping.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "model": self.model_name,
+                "queued": self._queue.qsize(),
+                "max_queue_size": self._queue.maxsize,
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "scored": self.scored,
+                "errors": self.errors,
+                "agreement_rate": self.agreements / self.scored if self.scored else None,
+                "mean_abs_probability_delta": {
+                    name: total / self.scored for name, total in self.abs_delta_sum.items()
+                } if self.scored else None,
+                "max_abs_probability_delta": self.max_abs_delta if self.scored else None,
+                # "principal→candidato": registros (las parejas distintas son los desacuerdos)
+                "transitions": {f"{primary}→{candidate}": count
+                                for (primary, candidate), count in sorted(self.transitions.items())},
+                "mean_batch_size": self.scored / self.batches if self.batches else 0.0,
+                "mean_batch_seconds": self.scoring_seconds / self.batches if self.batches else None,
+                "last_error": self.last_error
+            }
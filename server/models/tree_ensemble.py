@@ -0,0 +1,246 @@
+"""
+Evaluador de árboles en NumPy puro para el booster XGBoost multiclase (multi:softprob).
+
+El exportador aplana todos los árboles del booster en arrays compactos (feature, umbral, hijo
+izquierdo/derecho, dirección por defecto para missing, valor de hoja y clase de cada árbol) y
+los guarda en un .npz junto con la versión del par pipeline/modelo del que salen. Con
+INFERENCE_ENGINE=numpy el servidor carga ese .npz en lugar del pickle: no se importa xgboost.
+
+Exportar desde los artefactos del modelo con:
+    python -m server.models.tree_ensemble server/artifacts/xgboost_multiclass_pipeline.pkl server/artifacts/xgboost_multiclass_model.pkl server/artifacts/xgboost_multiclass_trees.npz
+"""
+import hashlib
+import json
+
+import numpy as np
+
+
+class TreeEnsemble:
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 tree_roots, tree_group, iteration_indptr, base_margin, max_depth,
+                 feature_names=None, model_version=None):
+        # Arrays por nodo (todos los árboles concatenados). En las hojas left == right == el propio nodo.
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+
+        # Arrays por árbol / iteración
+        self.tree_roots = tree_roots
+        self.tree_group = tree_group
+        self.iteration_indptr = iteration_indptr
+
+        self.base_margin = base_margin
+        self.num_class = len(base_margin)
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.model_version = model_version
+
+    @property
+    def num_trees(self):
+        return len(self.tree_roots)
+
+    @property
+    def num_iterations(self):
+        return len(self.iteration_indptr) - 1
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in (
+            'feature', 'threshold', 'left', 'right', 'default_left', 'value',
+            'tree_roots', 'tree_group', 'iteration_indptr', 'base_margin'
+        ))
+
+    # ---------------------------
+    # Exportación
+
+    @classmethod
+    def from_booster(cls, booster, model_version=None):
+        """
+        Construye el evaluador a partir de un xgboost.Booster (vía su volcado JSON)
+        """
+        model_json = json.loads(booster.save_raw('json'))
+        learner = model_json['learner']
+        gbtree = learner['gradient_booster']['model']
+
+        features, thresholds, lefts, rights, defaults, values = [], [], [], [], [], []
+        tree_roots = []
+        max_depth = 0
+        offset = 0
+
+        for tree in gbtree['trees']:
+            if any(split_type != 0 for split_type in tree['split_type']):
+                raise ValueError("Las divisiones categóricas no están soportadas por el evaluador NumPy")
+
+            left = np.asarray(tree['left_children'], dtype=np.int64)
+            right = np.asarray(tree['right_children'], dtype=np.int64)
+            n_nodes = len(left)
+            is_leaf = left == -1
+            node_ids = np.arange(n_nodes)
+
+            features.append(np.where(is_leaf, 0, tree['split_indices']))
+            thresholds.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+            lefts.append(np.where(is_leaf, node_ids, left) + offset)
+            rights.append(np.where(is_leaf, node_ids, right) + offset)
+            defaults.append(np.asarray(tree['default_left'], dtype=bool))
+            # En las hojas split_conditions guarda el valor de la hoja
+            values.append(np.where(is_leaf, np.asarray(tree['split_conditions'], dtype=np.float32), 0))
+
+            max_depth = max(max_depth, _tree_depth(left, right))
+            tree_roots.append(offset)
+            offset += n_nodes
+
+        base_margin = _parse_base_score(learner['learner_model_param']['base_score'],
+                                        int(learner['learner_model_param']['num_class']))
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float32),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            default_left=np.concatenate(defaults),
+            value=np.concatenate(values).astype(np.float32),
+            tree_roots=np.asarray(tree_roots, dtype=np.int32),
+            tree_group=np.asarray(gbtree['tree_info'], dtype=np.int32),
+            iteration_indptr=np.asarray(gbtree['iteration_indptr'], dtype=np.int32),
+            base_margin=base_margin,
+            max_depth=max_depth,
+            feature_names=booster.feature_names,
+            model_version=model_version
+        )
+
+    def save(self, path):
+        arrays = {name: getattr(self, name) for name in (
+            'feature', 'threshold', 'left', 'right', 'default_left', 'value',
+            'tree_roots', 'tree_group', 'iteration_indptr', 'base_margin'
+        )}
+        arrays['max_depth'] = np.asarray(self.max_depth)
+        arrays['feature_names'] = np.asarray(self.feature_names or [], dtype=str)
+        arrays['model_version'] = np.asarray(self.model_version or '', dtype=str)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        return cls(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            left=arrays['left'],
+            right=arrays['right'],
+            default_left=arrays['default_left'],
+            value=arrays['value'],
+            tree_roots=arrays['tree_roots'],
+            tree_group=arrays['tree_group'],
+            iteration_indptr=arrays['iteration_indptr'],
+            base_margin=arrays['base_margin'],
+            max_depth=int(arrays['max_depth']),
+            feature_names=arrays['feature_names'].tolist() or None,
+            model_version=str(arrays['model_version']) or None
+        )
+
+    # ---------------------------
+    # Predicción
+
+    def _tree_slice(self, iteration_range):
+        if iteration_range is None or iteration_range == (0, 0):
+            return slice(0, self.num_trees)
+        begin, end = iteration_range
+        return slice(int(self.iteration_indptr[begin]), int(self.iteration_indptr[end]))
+
+    def predict_margin(self, X, iteration_range=None, chunk_size=2048):
+        """
+        Margen (suma de hojas + base_score) por clase, forma (n_filas, num_class).
+        Recorre todos los árboles a la vez, un nivel de profundidad por paso, en bloques de filas.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        trees = self._tree_slice(iteration_range)
+        roots = self.tree_roots[trees]
+        groups = self.tree_group[trees]
+
+        # Matriz (árbol → clase) para sumar los valores de hoja de cada clase con un producto matricial
+        group_matrix = np.zeros((len(roots), self.num_class), dtype=np.float32)
+        group_matrix[np.arange(len(roots)), groups] = 1
+
+        margins = np.empty((X.shape[0], self.num_class), dtype=np.float32)
+        for start in range(0, X.shape[0], chunk_size):
+            X_chunk = X[start:start + chunk_size]
+            rows = np.arange(X_chunk.shape[0])[:, None]
+            nodes = np.broadcast_to(roots, (X_chunk.shape[0], len(roots)))
+
+            for _ in range(self.max_depth):
+                x = X_chunk[rows, self.feature[nodes]]
+                go_left = np.where(np.isnan(x), self.default_left[nodes], x < self.threshold[nodes])
+                nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+            margins[start:start + chunk_size] = self.value[nodes] @ group_matrix
+
+        return margins + self.base_margin.astype(np.float32)
+
+    def predict_proba(self, X, iteration_range=None):
+        """
+        Probabilidades softmax, equivalentes a Booster.predict con multi:softprob
+        """
+        margins = self.predict_margin(X, iteration_range=iteration_range)
+        margins -= margins.max(axis=1, keepdims=True)
+        np.exp(margins, out=margins)
+        margins /= margins.sum(axis=1, keepdims=True)
+        return margins
+
+
+def artifact_version(pipeline_bytes, model_bytes):
+    """
+    Versión de un par pipeline/modelo: hash del contenido de los dos ficheros (la misma que usa el predictor)
+    """
+    return hashlib.sha256(pipeline_bytes + model_bytes).hexdigest()[:12]
+
+
+def export_artifacts(pipeline_file, model_file, output_file):
+    """
+    Exporta los árboles del modelo de model_file a output_file, con la versión del par para que el
+    servidor compruebe al cargarlo que corresponde a los pickles desplegados
+    """
+    import pickle
+
+    with open(pipeline_file, 'rb') as f:
+        pipeline_bytes = f.read()
+    with open(model_file, 'rb') as f:
+        model_bytes = f.read()
+    ensemble = TreeEnsemble.from_booster(pickle.loads(model_bytes),
+                                         model_version=artifact_version(pipeline_bytes, model_bytes))
+    ensemble.save(output_file)
+    return ensemble
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max()) if len(depth) else 0
+
+
+def _parse_base_score(base_score, num_class):
+    # XGBoost >= 2 guarda un vector "[5E-1,5E-1,5E-1]"; versiones anteriores un único valor
+    values = [float(v) for v in str(base_score).strip('[]').split(',') if v]
+    if len(values) == 1:
+        values = values * num_class
+    return np.asarray(values, dtype=np.float32)
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    import server.models.preprocessing as preprocessing_module
+    sys.modules['preprocessing'] = preprocessing_module
+
+    pipeline_path, model_path, output_path = sys.argv[1], sys.argv[2], sys.argv[3]
+    ensemble = export_artifacts(pipeline_path, model_path, output_path)
+    print(f"✅ {ensemble.num_trees} árboles ({ensemble.num_iterations} iteraciones, profundidad máx. {ensemble.max_depth}) "
+          f"de la versión {ensemble.model_version} exportados a {output_path}")
@@ -0,0 +1,163 @@
+import os
+from dotenv import load_dotenv
+
+# Configuración del servidor leída de variables de entorno (.env en la raíz del proyecto)
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "si", "on")
+
+
+# ---------------------------
+# Predicción por lotes (/predict/batch)
+PREDICT_BATCH_MAX_SIZE = env_int("PREDICT_BATCH_MAX_SIZE", 10000)
+
+# ---------------------------
+# Micro-batching de peticiones /predict concurrentes
+MICRO_BATCH_ENABLED = env_bool("MICRO_BATCH_ENABLED", True)
+MICRO_BATCH_MAX_SIZE = env_int("MICRO_BATCH_MAX_SIZE", 32)
+MICRO_BATCH_MAX_WAIT_MS = env_float("MICRO_BATCH_MAX_WAIT_MS", 2.0)
+
+# ---------------------------
+# Pool de hilos para la inferencia (0 = ejecutar en el event loop, sin pool)
+INFERENCE_POOL_SIZE = env_int("INFERENCE_POOL_SIZE", min(4, os.cpu_count() or 1))
+# "thread" (un proceso, varios hilos) o "process" (N procesos creados desde un forkserver que comparten el modelo)
+INFERENCE_POOL_MODE = os.environ.get("INFERENCE_POOL_MODE", "thread").strip().lower()
+# Hilos de XGBoost por llamada a predict (0 = núcleos disponibles / INFERENCE_POOL_SIZE)
+INFERENCE_NTHREAD = env_int("INFERENCE_NTHREAD", 0)
+# Núcleos a los que se fija el servidor, p. ej. "0-3" (vacío = sin cambiar la afinidad). Solo Linux.
+INFERENCE_CPU_AFFINITY = os.environ.get("INFERENCE_CPU_AFFINITY", "").strip()
+
+# ---------------------------
+# Caché LRU/TTL de predicciones (perfiles de estudiante repetidos)
+PREDICTION_CACHE_ENABLED = env_bool("PREDICTION_CACHE_ENABLED", True)
+PREDICTION_CACHE_MAX_SIZE = env_int("PREDICTION_CACHE_MAX_SIZE", 10000)
+PREDICTION_CACHE_TTL_SECONDS = env_float("PREDICTION_CACHE_TTL_SECONDS", 3600)
+
+# ---------------------------
+# Explicaciones por campo (POST /explain, contribuciones pred_contribs de XGBoost)
+EXPLAIN_BATCH_MAX_SIZE = env_int("EXPLAIN_BATCH_MAX_SIZE", 1000)
+EXPLANATION_CACHE_MAX_SIZE = env_int("EXPLANATION_CACHE_MAX_SIZE", 2000)
+
+# ---------------------------
+# Motor de inferencia: "xgboost" (Booster.inplace_predict) o "numpy" (TreeEnsemble). Con "numpy" se cargan los
+# árboles exportados (xgboost_multiclass_trees.npz) si son de la misma versión que los pickles: sin xgboost al servir
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "xgboost").strip().lower()
+
+# ---------------------------
+# Escritura diferida de /predict en Supabase: la fila se encola y un hilo la inserta por lotes
+# (cuando hay WRITE_BEHIND_BATCH_SIZE filas o la más antigua lleva WRITE_BEHIND_FLUSH_INTERVAL_MS)
+WRITE_BEHIND_ENABLED = env_bool("WRITE_BEHIND_ENABLED", True)
+# Con la cola llena la fila va al spool local (SPOOL_*) sin esperar a la base de datos
+WRITE_BEHIND_QUEUE_MAX_SIZE = env_int("WRITE_BEHIND_QUEUE_MAX_SIZE", 10000)
+WRITE_BEHIND_BATCH_SIZE = env_int("WRITE_BEHIND_BATCH_SIZE", 100)
+WRITE_BEHIND_FLUSH_INTERVAL_MS = env_float("WRITE_BEHIND_FLUSH_INTERVAL_MS", 200)
+# Reintentos de un lote fallido, con espera exponencial desde WRITE_BEHIND_RETRY_BACKOFF_SECONDS
+WRITE_BEHIND_MAX_RETRIES = env_int("WRITE_BEHIND_MAX_RETRIES", 5)
+WRITE_BEHIND_RETRY_BACKOFF_SECONDS = env_float("WRITE_BEHIND_RETRY_BACKOFF_SECONDS", 0.5)
+# Tiempo máximo para escribir lo pendiente al parar el servidor
+WRITE_BEHIND_DRAIN_TIMEOUT_SECONDS = env_float("WRITE_BEHIND_DRAIN_TIMEOUT_SECONDS", 10)
+
+# ---------------------------
+# Spool local: filas que la base de datos no aceptó (reintentos agotados o cola llena) se guardan en
+# disco y un hilo las reenvía por lotes cuando vuelve a responder (requiere la columna record_id)
+SPOOL_ENABLED = env_bool("SPOOL_ENABLED", True)
+SPOOL_DIR = os.environ.get("SPOOL_DIR", "").strip() or os.path.join(os.path.dirname(__file__), "spool")
+SPOOL_SEGMENT_MAX_BYTES = env_int("SPOOL_SEGMENT_MAX_BYTES", 8 * 1024 * 1024)
+# fsync agrupado: cada SPOOL_FSYNC_BATCH_SIZE filas o cada SPOOL_FSYNC_INTERVAL_MS
+SPOOL_FSYNC_INTERVAL_MS = env_float("SPOOL_FSYNC_INTERVAL_MS", 100)
+SPOOL_FSYNC_BATCH_SIZE = env_int("SPOOL_FSYNC_BATCH_SIZE", 100)
+SPOOL_REPLAY_INTERVAL_SECONDS = env_float("SPOOL_REPLAY_INTERVAL_SECONDS", 5)
+SPOOL_REPLAY_BATCH_SIZE = env_int("SPOOL_REPLAY_BATCH_SIZE", 500)
+
+# ---------------------------
+# /predict/batch con al menos BULK_COPY_MIN_ROWS filas se guarda con COPY por una conexión directa a
+# PostgreSQL (variables POSTGRES_* del .env) en lugar de la API REST. 0 = siempre por la API REST.
+BULK_COPY_MIN_ROWS = env_int("BULK_COPY_MIN_ROWS", 1000)
+# Filas por transacción de COPY
+BULK_COPY_CHUNK_SIZE = env_int("BULK_COPY_CHUNK_SIZE", 5000)
+
+# ---------------------------
+# Cliente HTTP compartido con Supabase: conexiones keep-alive reutilizadas entre peticiones (sin un
+# handshake TLS por inserción). HTTP_MAX_CONNECTIONS acota las conexiones abiertas a la vez.
+HTTP_MAX_CONNECTIONS = env_int("HTTP_MAX_CONNECTIONS", 20)
+HTTP_MAX_KEEPALIVE_CONNECTIONS = env_int("HTTP_MAX_KEEPALIVE_CONNECTIONS", 10)
+# Segundos que una conexión sin uso sigue abierta
+HTTP_KEEPALIVE_EXPIRY_SECONDS = env_float("HTTP_KEEPALIVE_EXPIRY_SECONDS", 30)
+HTTP_CONNECT_TIMEOUT_SECONDS = env_float("HTTP_CONNECT_TIMEOUT_SECONDS", 5)
+# Lectura, escritura y espera de una conexión libre del pool
+HTTP_TIMEOUT_SECONDS = env_float("HTTP_TIMEOUT_SECONDS", 30)
+# HTTP/2 multiplexa las peticiones sobre una sola conexión (necesita el paquete h2)
+HTTP2_ENABLED = env_bool("HTTP2_ENABLED", True)
+# Certificados CA para Supabase (vacío = los de certifi; SSL_CERT_FILE del entorno no se usa)
+SUPABASE_CA_BUNDLE = os.environ.get("SUPABASE_CA_BUNDLE", "").strip()
+
+# ---------------------------
+# Pool de conexiones directas a PostgreSQL (COPY de /predict/batch): POSTGRES_POOL_MIN conexiones se abren
+# al primer uso y quedan abiertas entre peticiones; en picos se abren más, hasta POSTGRES_POOL_MAX (las que
+# sobran se cierran al devolverlas). Con todas ocupadas se espera POSTGRES_POOL_TIMEOUT_SECONDS.
+POSTGRES_POOL_MIN = env_int("POSTGRES_POOL_MIN", 1)
+POSTGRES_POOL_MAX = env_int("POSTGRES_POOL_MAX", 5)
+POSTGRES_POOL_TIMEOUT_SECONDS = env_float("POSTGRES_POOL_TIMEOUT_SECONDS", 10)
+POSTGRES_CONNECT_TIMEOUT_SECONDS = env_int("POSTGRES_CONNECT_TIMEOUT_SECONDS", 5)
+
+# ---------------------------
+# Registro de modelos (?model=<nombre>). Sin indicar modelo se usa el XGBoost activo ("xgboost").
+# Modelos adicionales: "nombre:tipo:fichero_modelo[:fichero_pipeline]" separados por comas, con tipo
+# xgboost o sklearn y rutas relativas a server/artifacts. Se cargan la primera vez que se piden.
+# Vacío = solo el XGBoost. Para servir el Random Forest (tras python -m server.models.random_forest_trainer):
+# EXTRA_MODELS=random_forest:sklearn:random_forest_multiclass_model.joblib
+EXTRA_MODELS = os.environ.get("EXTRA_MODELS", "")
+
+# ---------------------------
+# Puntuación en sombra: las entradas de /predict se puntúan también, en segundo plano, con este modelo
+# del registro (p. ej. "candidate" con EXTRA_MODELS=candidate:xgboost:candidate/xgboost_multiclass_model.pkl:
+# candidate/xgboost_multiclass_pipeline.pkl) para comparar sus predicciones. Vacío = desactivado.
+SHADOW_MODEL = os.environ.get("SHADOW_MODEL", "").strip()
+# Con la cola llena las copias se descartan (la respuesta nunca espera al modelo en sombra)
+SHADOW_QUEUE_MAX_SIZE = env_int("SHADOW_QUEUE_MAX_SIZE", 1000)
+SHADOW_BATCH_SIZE = env_int("SHADOW_BATCH_SIZE", 64)
+
+# ---------------------------
+# Modo rápido (/predict?mode=fast): solo las primeras iteraciones del modelo (iteration_range)
+# 0 = elegir el corte con los metadatos del entrenamiento (o la mitad de las iteraciones si no hay)
+FAST_MODE_ITERATIONS = env_int("FAST_MODE_ITERATIONS", 0)
+# Pérdida máxima de F1 (validación) aceptada al elegir el corte automáticamente
+FAST_MODE_MAX_F1_DROP = env_float("FAST_MODE_MAX_F1_DROP", 0.01)
+
+# ---------------------------
+# Recarga en caliente del modelo (POST /model/reload)
+MODEL_ROLLBACK_HISTORY = env_int("MODEL_ROLLBACK_HISTORY", 1)
+# Si se define, /model/reload y /model/rollback exigen la cabecera X-Admin-Token con este valor
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# ---------------------------
+# Logging (server/logging_setup.py)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").strip().upper()
+# "json" (una línea JSON por registro) o "text"
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").strip().lower()
+# Fracción de peticiones cuyos registros INFO/DEBUG se escriben (WARNING y ERROR siempre)
+LOG_SAMPLE_RATE = env_float("LOG_SAMPLE_RATE", 1.0)
+LOG_QUEUE_MAX_SIZE = env_int("LOG_QUEUE_MAX_SIZE", 10000)
+
+# ---------------------------
+# Métricas Prometheus (GET /metrics)
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+
+# ---------------------------
+# Sondas de salud (/healthz, /readyz): cada cuánto se repite en segundo plano la predicción de prueba
+SELF_TEST_INTERVAL_SECONDS = env_float("SELF_TEST_INTERVAL_SECONDS", 60)
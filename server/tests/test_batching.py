@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import asyncio
+import pytest
+from server.models.batching import MicroBatcher
+
+
+# Test: las peticiones concurrentes se agrupan y cada una recibe su propio resultado
+def test_micro_batcher_groups_concurrent_requests():
+    calls = []
+
+    def predict_batch(records):
+        calls.append(list(records))
+        return [record * 10 for record in records]
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=4, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    results = asyncio.run(run())
+
+    # 1. Resultados en el orden de cada llamada
+    assert results == [i * 10 for i in range(10)]
+
+    # 2. Lotes de como máximo 4 elementos
+    assert [len(batch) for batch in calls] == [4, 4, 2]
+    assert batcher.stats()['batch_size_histogram'] == {'2': 1, '4': 2}
+    assert batcher.stats()['requests_total'] == 10
+
+
+# Test: un error del modelo se propaga a todas las llamadas del lote
+def test_micro_batcher_propagates_errors():
+    def predict_batch(records):
+        raise ValueError("modelo roto")
+
+    batcher = MicroBatcher(predict_batch, max_batch_size=8, max_wait_ms=1)
+
+    async def run():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+# Test: desactivado, cada petición se puntúa sola
+def test_micro_batcher_disabled_scores_each_request():
+    batcher = MicroBatcher(lambda records: [len(records)] * len(records), enabled=False)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+
+    assert asyncio.run(run()) == [1, 1, 1]
+    assert batcher.stats()['batch_size_histogram'] == {'1': 3}
+
+# Ejecuta este test con:
+# pytest server/tests/test_batching.py
@@ -0,0 +1,218 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import contextlib
+import csv
+import io
+import re
+import subprocess
+import pytest
+from fastapi.testclient import TestClient
+from server.database.bulk_writer import CsvRowStream, copy_rows, quote_identifier, STUDENT_COLUMNS
+from server.tests.test_main import STUDENT
+
+
+class FakePostgres:
+    """
+    Sustituto local de PostgreSQL para COPY: lee el CSV que envía copy_expert en bloques de
+    `size` caracteres, simula la tabla temporal y ON CONFLICT (record_id) y respeta commit/rollback
+    """
+    def __init__(self, fail_on_copy=None):
+        self.tables = {"students": []}
+        self.fail_on_copy = fail_on_copy
+        self.copies = 0
+        self.reads = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = False
+        self._pending = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        if self._pending:
+            for table, rows in self._pending.items():
+                self.tables.setdefault(table, []).extend(rows)
+        self._pending = None
+        self.commits += 1
+
+    def rollback(self):
+        self._pending = None
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+    def table_rows(self, table, transaction):
+        return transaction.setdefault(table, [])
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = -1
+
+    def __enter__(self):
+        if self.db._pending is None:
+            self.db._pending = {}
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if sql.startswith("CREATE TEMP TABLE"):
+            self.db._pending["students_copy_staging"] = []
+        elif sql.startswith("INSERT INTO"):
+            staged = self.db._pending.pop("students_copy_staging")
+            existing = {row['record_id'] for row in self.db.tables["students"]}
+            existing |= {row['record_id'] for row in self.db._pending.get("students", [])}
+            new_rows = []
+            for row in staged:
+                if row['record_id'] not in existing:
+                    existing.add(row['record_id'])
+                    new_rows.append(row)
+            self.db._pending.setdefault("students", []).extend(new_rows)
+            self.rowcount = len(new_rows)
+
+    def copy_expert(self, sql, file, size=64):
+        self.db.copies += 1
+        if self.db.fail_on_copy == self.db.copies:
+            raise RuntimeError("conexión perdida durante COPY")
+        table, columns = re.match(r'COPY "(\w+)" \((.*)\) FROM STDIN WITH \(FORMAT csv\)', sql).groups()
+        columns = [column.strip('" ') for column in columns.split(",")]
+
+        text = ""
+        while True:
+            chunk = file.read(size)
+            self.db.reads += 1
+            if not chunk:
+                break
+            text += chunk
+        rows = [dict(zip(columns, [value if value != "" else None for value in values]))
+                for values in csv.reader(io.StringIO(text))]
+        self.db._pending.setdefault(table, []).extend(rows)
+
+
+def student_rows(n, offset=0):
+    return [dict(STUDENT, mothers_qualification="Higher education—degree", fathers_qualification='Unknown, "otro"',
+                 target='Graduate', probability_graduate=0.8, probability_dropout=0.1, probability_enrolled=0.1,
+                 predicted_outcome='Graduate', confidence=0.8, record_id=f"id-{offset + i}", gdp=float(i))
+            for i in range(n)]
+
+
+# Test del CSV generado bajo demanda: comillas, comas y NULL
+def test_csv_row_stream_reads_in_pieces():
+    rows = [{'a': 'texto, con "comillas"', 'b': 1.5, 'c': None}, {'a': 'ñ', 'b': 2, 'c': ''}]
+
+    whole = CsvRowStream(rows, ('a', 'b', 'c')).read()
+    stream = CsvRowStream(rows, ('a', 'b', 'c'))
+    pieces = []
+    while True:
+        piece = stream.read(5)
+        if not piece:
+            break
+        pieces.append(piece)
+
+    # None → campo vacío sin comillas (NULL); texto vacío → ""
+    assert "".join(pieces) == whole == '"texto, con ""comillas""",1.5,\n"ñ",2,""\n'
+    assert stream.rows_written == 2
+
+
+# Test: COPY por bloques, una transacción por bloque
+def test_copy_rows_in_chunks():
+    db = FakePostgres()
+
+    result = copy_rows(db, iter(student_rows(12)), chunk_size=5)
+
+    assert result['rows'] == 12 and result['inserted'] == 12 and result['chunks'] == 3
+    assert db.copies == 3 and db.commits == 3
+    assert db.reads > 3     # el CSV se leyó en varios trozos
+    stored = db.tables["students"]
+    assert [row['record_id'] for row in stored] == [f"id-{i}" for i in range(12)]
+    assert stored[3]['fathers_qualification'] == 'Unknown, "otro"' and float(stored[3]['gdp']) == 3.0
+    assert set(stored[0]) == set(STUDENT_COLUMNS)
+
+
+# Test: repetir una carga no duplica filas (ON CONFLICT sobre record_id)
+def test_copy_rows_skips_duplicates():
+    db = FakePostgres()
+    copy_rows(db, student_rows(4), chunk_size=10)
+
+    result = copy_rows(db, student_rows(6), chunk_size=10)
+
+    assert result['rows'] == 6 and result['inserted'] == 2
+    assert len(db.tables["students"]) == 6
+
+
+# Test: si un bloque falla se deshace solo ese bloque y se propaga el error
+def test_copy_rows_rolls_back_failed_chunk():
+    db = FakePostgres(fail_on_copy=2)
+
+    with pytest.raises(RuntimeError):
+        copy_rows(db, student_rows(10), chunk_size=4)
+
+    assert len(db.tables["students"]) == 4
+    assert db.commits == 1 and db.rollbacks == 1
+    with pytest.raises(ValueError):
+        quote_identifier('students; DROP TABLE students')
+
+
+# Test de integración: /predict/batch grande se guarda con COPY
+def test_predict_batch_uses_copy_for_large_batches(monkeypatch):
+    import server.main as main_module
+    db = FakePostgres()
+    monkeypatch.setattr(main_module.settings, "BULK_COPY_MIN_ROWS", 2)
+    monkeypatch.setattr(main_module, "is_postgres_configured", lambda: True)
+    monkeypatch.setattr(main_module, "postgres_connection", lambda: contextlib.nullcontext(db))
+    client = TestClient(main_module.app)
+
+    body = client.post("/predict/batch", json=[STUDENT, STUDENT]).json()
+
+    assert body['successful'] == 2 and "COPY" in body['message']
+    stored = db.tables["students"]
+    assert len(stored) == 2 and stored[0]['record_id'] != stored[1]['record_id']
+    assert stored[0]['target'] == body['results'][0]['prediction']
+    assert db.commits == 1
+
+
+# Test del backfill: CSV con una fila inválida, por bloques
+def test_backfill_from_csv(tmp_path):
+    from server.database.backfill_predictions import backfill
+
+    csv_path = tmp_path / "estudiantes.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(STUDENT))
+        writer.writeheader()
+        writer.writerow(STUDENT)
+        writer.writerow(dict(STUDENT, gdp="no es un número"))
+        writer.writerow(dict(STUDENT, age_at_enrollment=30))
+    db = FakePostgres()
+
+    result = backfill(str(csv_path), db, chunk_size=2)
+
+    assert result['rows'] == 2 and result['inserted'] == 2 and result['invalid'] == 1
+    assert [row['age_at_enrollment'] for row in db.tables["students"]] == ['20', '30']
+
+
+# Test del backfill sin la app: puntuar un bloque no importa server.main (ni el cliente de Supabase)
+def test_backfill_does_not_import_app():
+    code = (
+        "import sys\n"
+        "from server.database.backfill_predictions import score_rows\n"
+        f"rows = score_rows([(2, {STUDENT!r})], [])\n"
+        "print(len(rows), rows[0]['target'] == rows[0]['predicted_outcome'], 'server.main' in sys.modules, 'supabase' in sys.modules)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(os.path.dirname(__file__), '../../'),
+                            env=dict(os.environ), capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-4:] == ["1", "True", "False", "False"]
+
+# Ejecuta este test con:
+# pytest server/tests/test_bulk_writer.py
@@ -0,0 +1,224 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from server.database.http_pool import create_http_client
+from server.database.postgres_client import PostgresPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeThreadedPool:
+    """
+    Sustituto de psycopg2.pool.ThreadedConnectionPool: guarda hasta minconn conexiones libres
+    """
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.minconn = minconn
+        self.kwargs = kwargs
+        self.closed = False
+        self.opened = 0
+        self._pool = []
+
+    def getconn(self):
+        if self._pool:
+            return self._pool.pop()
+        self.opened += 1
+        return FakeConnection()
+
+    def putconn(self, conn, close=False):
+        if close or len(self._pool) >= self.minconn:
+            conn.close()
+        else:
+            self._pool.append(conn)
+
+    def closeall(self):
+        for conn in self._pool:
+            conn.close()
+        self._pool = []
+        self.closed = True
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ports = set()
+
+    def do_GET(self):
+        KeepAliveHandler.ports.add(self.client_address[1])
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# Test del cliente HTTP compartido: las peticiones reutilizan la misma conexión keep-alive
+def test_http_client_reuses_keepalive_connection():
+    # 1. Servidor HTTP/1.1 local que anota el puerto de origen de cada conexión
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client, transport = create_http_client(max_connections=4, http2=False)
+    try:
+        # 2. Varias peticiones seguidas
+        url = f"http://127.0.0.1:{server.server_address[1]}/rest/v1/students"
+        for _ in range(5):
+            assert client.get(url).status_code == 200
+
+        # 3. Una sola conexión TCP, que queda abierta esperando la siguiente petición
+        stats = transport.stats()
+        assert len(KeepAliveHandler.ports) == 1
+        assert stats["requests"] == 5 and stats["in_flight"] == 0
+        assert stats["connections"] == 1 and stats["idle_connections"] == 1
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+# Test de los contadores del transporte: peticiones, errores y límites
+def test_http_client_counts_requests_and_errors():
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("sin conexión", request=request)
+        return httpx.Response(201, json={"ok": True})
+
+    client, transport = create_http_client(max_connections=3, max_keepalive_connections=10, http2=False,
+                                           transport=httpx.MockTransport(handler))
+    assert client.post("https://example.supabase.co/rest/v1/students", json={}).status_code == 201
+    with pytest.raises(httpx.ConnectError):
+        client.get("https://example.supabase.co/down")
+
+    stats = transport.stats()
+    assert stats["requests"] == 2 and stats["errors"] == 1 and stats["in_flight"] == 0
+    assert stats["max_connections"] == 3
+    client.close()
+
+
+# Test del cliente de Supabase: PostgREST usa el cliente HTTP compartido, sin tocar SSL_CERT_FILE
+def test_supabase_client_uses_shared_http_client(monkeypatch):
+    from server.database import supabase_client
+
+    # 1. Un SSL_CERT_FILE inexistente ya no rompe el cliente ni se borra del entorno
+    monkeypatch.setenv("SSL_CERT_FILE", "/no/existe.pem")
+    supabase_client.close_http_client()
+    try:
+        client = supabase_client.get_supabase_client()
+        assert client.postgrest.session is supabase_client.get_http_client()
+        assert os.environ["SSL_CERT_FILE"] == "/no/existe.pem"
+        assert supabase_client.http_pool_stats()["requests"] == 0
+    finally:
+        # 2. Al cerrar, el siguiente uso crea un cliente nuevo
+        supabase_client.close_http_client()
+    assert supabase_client.http_pool_stats() is None
+
+
+# Test de requirements.txt: las versiones fijadas de supabase son las instaladas y su ClientOptions acepta
+# el cliente HTTP compartido (con supabase 2.15.1 httpx_client no existe y crear el cliente fallaba)
+def test_pinned_supabase_builds_client_with_shared_http_client():
+    import importlib.metadata
+    from supabase import ClientOptions, create_client
+
+    # 1. Versiones de la familia supabase fijadas en requirements.txt
+    requirements = os.path.join(os.path.dirname(__file__), '..', '..', 'requirements.txt')
+    with open(requirements, encoding="utf-8") as f:
+        pins = dict(line.strip().split("==") for line in f if "==" in line)
+    packages = ("supabase", "supabase-auth", "supabase-functions", "postgrest", "realtime", "storage3")
+    for package in packages:
+        assert importlib.metadata.version(package) == pins[package], package
+
+    # 2. El cliente real se crea con esas versiones y usa el cliente HTTP indicado
+    http_client, _ = create_http_client(http2=False)
+    options = ClientOptions(headers={"Authorization": "Bearer test-key"}, httpx_client=http_client)
+    client = create_client("https://example.supabase.co", "test-key", options=options)
+    assert client.postgrest.session is http_client
+    http_client.close()
+
+
+# Test del pool PostgreSQL: reutiliza conexiones, hace rollback en errores y espera con el pool lleno
+def test_postgres_pool_checkout_rollback_and_timeout():
+    pool = PostgresPool(1, 2, timeout=0.05, pool_factory=FakeThreadedPool, host="db")
+
+    # 1. Dos préstamos seguidos usan la misma conexión
+    with pool.connection() as first:
+        assert pool.stats()["in_use"] == 1
+    with pool.connection() as second:
+        pass
+    assert first is second and pool._pool.opened == 1
+
+    # 2. Una excepción dentro del bloque hace rollback y la conexión vuelve al pool
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError("COPY fallido")
+    assert conn.rollbacks == 1 and pool.stats()["idle"] == 1
+
+    # 3. Una conexión cerrada (caída del servidor) se descarta
+    with pool.connection() as conn:
+        conn.close()
+    assert pool.stats()["discarded"] == 1 and pool.stats()["idle"] == 0
+
+    # 4. Con las 2 conexiones prestadas, la tercera espera timeout y falla
+    with pool.connection(), pool.connection():
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+    stats = pool.stats()
+    assert stats["waits"] == 1 and stats["timeouts"] == 1 and stats["in_use"] == 0
+
+    # 5. Una conexión que se libera a tiempo atiende al que espera
+    pool.timeout = 2
+
+    def wait_for_connection():
+        with pool.connection():
+            pass
+
+    with pool.connection(), pool.connection():
+        waiter = threading.Thread(target=wait_for_connection)
+        waiter.start()
+        while pool.stats()["waits"] < 2:
+            time.sleep(0.01)
+    waiter.join(2)
+    assert not waiter.is_alive()
+    assert pool.stats()["timeouts"] == 1 and pool.stats()["checkouts"] == 9
+    pool.close()
+
+
+# Test de /metrics y /model/status: estado de los pools de conexiones
+def test_pool_metrics_are_exported(monkeypatch):
+    import server.main as main_module
+    import server.database.postgres_client as postgres_client
+
+    pool = PostgresPool(1, 3, pool_factory=FakeThreadedPool)
+    monkeypatch.setattr(postgres_client, "_pool", pool)
+    client = TestClient(main_module.app)
+
+    with pool.connection():
+        body = client.get("/metrics").text
+    assert 'student_postgres_pool_connections{state="in_use"} 1' in body
+    assert "student_postgres_pool_max_connections 3" in body
+    assert client.get("/model/status").json()["connections"]["postgres"]["max_connections"] == 3
+
+# Ejecuta este test con:
+# pytest server/tests/test_connections.py
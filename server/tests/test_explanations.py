@@ -0,0 +1,79 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import numpy as np
+from fastapi.testclient import TestClient
+from server.models import predictor
+from server.tests.test_main import STUDENT, fake_table  # noqa: F401 (fixture)
+
+
+# Test: cada columna del modelo pertenece a un único campo de StudentInput
+def test_feature_groups_cover_every_column_once():
+    from server.models.schemas import StudentInput
+
+    groups = predictor.preprocessing_pipeline.feature_groups()
+    columns = sorted(idx for indices in groups.values() for idx in indices)
+
+    assert columns == list(range(len(predictor.preprocessing_pipeline.features)))
+    assert set(groups) == set(StudentInput.model_fields)
+
+
+# Test: contribuciones + valor base = margen de cada clase (mismas probabilidades que la predicción)
+def test_explanations_add_up_to_model_prediction():
+    explanations = predictor.explain_students(predictor.WARM_UP_RECORDS)
+    predictions = predictor.predict_students_with_probabilities(predictor.WARM_UP_RECORDS)
+
+    for explanation, prediction in zip(explanations, predictions):
+        margins = np.array([
+            sum(explanation['contributions'][name].values()) + explanation['base_values'][name]
+            for name in predictor.CLASS_NAMES
+        ])
+        probabilities = np.exp(margins - margins.max()) / np.exp(margins - margins.max()).sum()
+
+        assert explanation['prediction'] == prediction['prediction']
+        assert np.allclose(probabilities, list(prediction['probabilities'].values()), atol=1e-5)
+        assert len(explanation['top_factors']) == predictor.TOP_FACTORS
+
+
+# Test: una explicación repetida sale de la caché sin recalcular
+def test_explanations_are_cached(monkeypatch):
+    predictor.explanation_cache.clear()
+    calls = []
+    original = predictor.explain_students
+    monkeypatch.setattr(predictor, "explain_students",
+                        lambda records, *args: calls.append(len(records)) or original(records, *args))
+
+    first = predictor.explain_students_cached(predictor.WARM_UP_RECORDS[:1])
+    second = predictor.explain_students_cached(predictor.WARM_UP_RECORDS)
+
+    assert calls == [1, 1]
+    assert second[0] == first[0]
+
+
+# Test del endpoint /explain: lote con una fila inválida, y /predict no calcula explicaciones
+def test_explain_endpoint(fake_table):
+    import server.main as main_module
+    client = TestClient(main_module.app)
+    invalid_student = {k: v for k, v in STUDENT.items() if k != 'gdp'}
+
+    # 1. Lote con una fila válida y otra inválida
+    body = client.post("/explain", json=[STUDENT, invalid_student]).json()
+    assert body['successful'] == 1 and body['failed'] == 1
+    assert set(body['results'][0]['contributions']['Dropout']) >= {'mothers_qualification', 'gdp'}
+    assert body['results'][1]['errors'][0]['loc'] == ['gdp']
+
+    # 2. /predict no toca la caché de explicaciones
+    lookups_before = predictor.explanation_cache.stats()['hits'] + predictor.explanation_cache.stats()['misses']
+    assert client.post("/predict", json=STUDENT).status_code == 200
+    assert predictor.explanation_cache.stats()['hits'] + predictor.explanation_cache.stats()['misses'] == lookups_before
+
+    # 3. Solo /predict guarda en la base de datos
+    assert main_module.student_writer.flush(timeout=5)
+    assert len(fake_table.inserted) == 1
+
+# Ejecuta este test con:
+# pytest server/tests/test_explanations.py
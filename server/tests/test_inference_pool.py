@@ -0,0 +1,223 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import asyncio
+import threading
+import time
+import pytest
+from server.models.batching import MicroBatcher
+from server.models.inference_pool import InferencePool, available_cpus, parse_cpu_list, set_cpu_affinity, threads_per_call
+
+
+# Test: el trabajo se ejecuta en un hilo del pool, no en el del event loop
+def test_inference_pool_runs_outside_event_loop_thread():
+    pool = InferencePool(max_workers=2)
+
+    async def run():
+        return threading.current_thread().name, await pool.run(lambda: threading.current_thread().name)
+
+    loop_thread, worker_thread = asyncio.run(run())
+    pool.shutdown()
+
+    assert worker_thread != loop_thread
+    assert worker_thread.startswith("inference")
+    assert pool.stats() == {"mode": "thread", "max_workers": 2}
+
+
+# Test: con max_workers=0 se ejecuta en línea
+def test_inference_pool_inline_mode():
+    pool = InferencePool(max_workers=0)
+
+    async def run():
+        return threading.current_thread().name, await pool.run(lambda: threading.current_thread().name)
+
+    loop_thread, worker_thread = asyncio.run(run())
+
+    assert worker_thread == loop_thread
+    assert pool.stats()["mode"] == "inline"
+
+
+# Test: el event loop sigue respondiendo mientras el micro-batcher predice en el pool
+def test_event_loop_stays_responsive_during_inference():
+    pool = InferencePool(max_workers=1)
+
+    def slow_predict(records):
+        time.sleep(0.2)
+        return records
+
+    batcher = MicroBatcher(slow_predict, max_batch_size=1, max_wait_ms=0, executor=pool)
+
+    async def run():
+        prediction = asyncio.ensure_future(batcher.submit("alumno"))
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        heartbeat_delay = time.perf_counter() - start
+        return heartbeat_delay, await prediction
+
+    heartbeat_delay, result = asyncio.run(run())
+    pool.shutdown()
+
+    assert result == "alumno"
+    assert heartbeat_delay < 0.1
+
+# Test: en modo process el trabajo se ejecuta en otros procesos (arrancados en el primer run, fuera del event loop)
+def test_inference_pool_process_mode():
+    pool = InferencePool(max_workers=2, mode="process")
+
+    async def run():
+        return await asyncio.gather(*[pool.run(os.getpid) for _ in range(4)])
+
+    worker_pids = set(asyncio.run(run()))
+    stats = pool.stats()
+    pool.shutdown()
+
+    assert os.getpid() not in worker_pids
+    assert worker_pids <= set(stats["worker_pids"])
+    assert stats["mode"] == "process" and len(stats["worker_pids"]) == 2
+
+
+# Test: los workers (creados desde el forkserver con el modelo precargado) predicen como el proceso padre
+def test_process_workers_predict_with_preloaded_model():
+    from server.models import predictor
+    from server.benchmarks.common import make_synthetic_records
+
+    records = make_synthetic_records(predictor.preprocessing_pipeline, 5)
+    pool = InferencePool(max_workers=1, mode="process", initializer=predictor.configure_process_worker, initargs=(1,),
+                         preload=("server.models.forkserver_preload",))
+
+    results = asyncio.run(pool.run(predictor.predict_students_with_probabilities, records))
+    pool.shutdown()
+
+    assert results == predictor.predict_students_with_probabilities(records)
+
+
+# Test: tras activar otra versión en el proceso padre, restart() crea workers que la usan
+def test_process_workers_receive_active_model_on_restart(monkeypatch):
+    import pickle
+    from server.models import predictor
+
+    # 1. Pool con el modelo activo del padre
+    loaded = predictor.load_model()
+    pool = InferencePool(max_workers=1, mode="process", initializer=predictor.configure_process_worker,
+                         initargs_provider=lambda: (1, predictor.process_worker_state()))
+    try:
+        assert asyncio.run(pool.run(predictor.self_test))["model_version"] == loaded.version
+
+        # 2. Otra versión (mismo modelo, pipeline serializado con otro protocolo) activa solo en el padre
+        _, model_bytes = loaded.artifacts
+        candidate = predictor.build_loaded_model(pickle.dumps(loaded.pipeline, protocol=2), model_bytes, loaded.metadata)
+        assert candidate.version != loaded.version
+        monkeypatch.setattr(predictor, "active_model", candidate)
+
+        # 3. Los workers nuevos la reciben al arrancar; los anteriores se retiran
+        old_pids = pool.worker_pids()
+        pool.restart()
+        assert asyncio.run(pool.run(predictor.self_test))["model_version"] == candidate.version
+        assert not set(old_pids) & set(pool.worker_pids())
+    finally:
+        pool.shutdown()
+
+
+# Test: restart() reinicia el forkserver con el modelo activo, así que los workers nuevos lo comparten (sin copia propia)
+def test_restart_preloads_active_model_in_forkserver(monkeypatch, tmp_path):
+    import pickle
+    from server.models import predictor
+
+    # 1. Pool con preload: el forkserver carga el par que deja preload_setup
+    monkeypatch.setenv(predictor.WORKER_STATE_ENV, str(tmp_path / "worker_state.pkl"))
+    loaded = predictor.load_model()
+    pool = InferencePool(max_workers=1, mode="process", initializer=predictor.configure_process_worker,
+                         initargs_provider=lambda: (1, predictor.process_worker_state()),
+                         preload=("server.models.forkserver_preload",),
+                         preload_setup=predictor.export_process_worker_state,
+                         stats_collector=predictor.collect_worker_stats, stats_merger=predictor.merge_worker_stats)
+    try:
+        pool.start()
+
+        # 2. Otra versión activa en el padre (como tras /model/reload) y restart()
+        _, model_bytes = loaded.artifacts
+        candidate = predictor.build_loaded_model(pickle.dumps(loaded.pipeline, protocol=2), model_bytes, loaded.metadata)
+        monkeypatch.setattr(predictor, "active_model", candidate)
+        pool.restart()
+        predictor.forget_worker_stats()
+
+        # 3. El worker usa la versión nueva y la comparte con el forkserver
+        assert asyncio.run(pool.run(predictor.self_test))["model_version"] == candidate.version
+        assert pool.stats()["forkserver_restarts"] == 1
+    finally:
+        pool.shutdown()
+
+    worker_models = predictor.worker_model_stats()
+    predictor.forget_worker_stats()
+    assert worker_models == {"workers_reporting": 1, "versions": [candidate.version], "private_copies": 0}
+
+
+# Test: en modo process la caché, las latencias y las métricas del modelo de los workers llegan al proceso principal
+def test_process_worker_stats_are_merged_into_main_process():
+    from server import metrics
+    from server.models import predictor
+
+    loaded = predictor.load_model()
+    predictor.prediction_cache.clear()
+    pool = InferencePool(max_workers=1, mode="process", initializer=predictor.configure_process_worker,
+                         initargs_provider=lambda: (1, predictor.process_worker_state()),
+                         stats_collector=predictor.collect_worker_stats, stats_merger=predictor.merge_worker_stats)
+
+    def rows_scored():
+        return {labels["model"]: value for _, labels, value in metrics.ROWS_SCORED.samples()}.get("xgboost", 0)
+
+    cache_before = predictor.prediction_cache.stats()
+    rows_before, calls_before = rows_scored(), len(loaded.latencies)
+    records = predictor.WARM_UP_RECORDS[:2]
+    try:
+        # 1. Primera llamada: fallos de caché y filas puntuadas en el worker
+        asyncio.run(pool.run(predictor.predict_students_cached, records))
+        # 2. Segunda: aciertos de la caché del worker, sin puntuar
+        asyncio.run(pool.run(predictor.predict_students_cached, records))
+    finally:
+        pool.shutdown()
+
+    cache = predictor.prediction_cache.stats()
+    assert cache["misses"] == cache_before["misses"] + 2 and cache["hits"] == cache_before["hits"] + 2
+    assert cache["size"] >= 2 and cache["workers"] == 1 and cache["model_version"] == loaded.version
+    assert rows_scored() == rows_before + 2
+    assert len(loaded.latencies) == min(calls_before + 1, loaded.latencies.maxlen)
+
+    # 3. Al recrear los workers su caché ya no cuenta en el tamaño
+    predictor.forget_worker_stats()
+    assert predictor.prediction_cache.stats()["workers"] == 0
+
+
+# Test: un modo desconocido es un error de configuración
+def test_inference_pool_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        InferencePool(max_workers=2, mode="gpu")
+
+
+# Test: hilos por llamada = núcleos repartidos entre los workers, salvo que se fije nthread
+def test_threads_per_call_avoids_oversubscription():
+    assert threads_per_call(1) == available_cpus()
+    assert threads_per_call(available_cpus() * 4) == 1
+    assert threads_per_call(4, nthread=3) == 3
+
+
+# Test: listas de CPUs al estilo taskset y afinidad del proceso
+def test_cpu_list_and_affinity():
+    assert parse_cpu_list("0-3,6") == {0, 1, 2, 3, 6}
+    with pytest.raises(ValueError):
+        parse_cpu_list("3-1")
+    with pytest.raises(ValueError):
+        parse_cpu_list("")
+
+    if not hasattr(os, "sched_setaffinity"):
+        pytest.skip("Afinidad de CPU no disponible en esta plataforma")
+    current = sorted(os.sched_getaffinity(0))
+    try:
+        assert set_cpu_affinity(str(current[0])) == [current[0]]
+        assert available_cpus() == 1
+    finally:
+        os.sched_setaffinity(0, current)
+
+# Ejecuta este test con:
+# pytest server/tests/test_inference_pool.py
@@ -0,0 +1,82 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import numpy as np
+from fastapi.testclient import TestClient
+from server.models import predictor
+from server.models.iteration_cutoffs import default_cutoffs, evaluate_cutoffs, choose_fast_iterations, save_metadata
+from server.tests.test_main import STUDENT, fake_table  # noqa: F401 (fixture)
+
+
+# Test: los cortes incluyen fracciones del total y siempre el modelo completo
+def test_default_cutoffs():
+    assert default_cutoffs(171) == [10, 25, 42, 50, 85, 100, 128, 171]
+    assert default_cutoffs(4) == [1, 2, 3, 4]
+
+
+# Test: se elige el menor corte dentro de la pérdida de F1 permitida
+def test_choose_fast_iterations():
+    cutoffs = [
+        {"iterations": 25, "validation_f1_macro": 0.60},
+        {"iterations": 50, "validation_f1_macro": 0.695},
+        {"iterations": 100, "validation_f1_macro": 0.70}
+    ]
+    assert choose_fast_iterations(cutoffs, max_f1_drop=0.01) == 50
+    assert choose_fast_iterations(cutoffs, max_f1_drop=0.2) == 25
+    assert choose_fast_iterations(None, max_f1_drop=0.01) is None
+
+
+# Test: métricas por corte con el modelo real (etiquetas = predicción del modelo completo)
+def test_evaluate_cutoffs_with_trained_model():
+    from server.benchmarks.common import make_synthetic_records
+
+    loaded = predictor.load_model()
+    X = loaded.pipeline.transform_records(make_synthetic_records(loaded.pipeline, 200))
+    y = np.argmax(predictor.predict_probabilities(X, loaded), axis=1)
+    n_rounds = loaded.model.num_boosted_rounds()
+
+    results = evaluate_cutoffs(loaded.model, {"validation": (X, y)}, cutoffs=[10, n_rounds], latency_batch_sizes=(1,))
+
+    assert [entry["iterations"] for entry in results] == [10, n_rounds]
+    assert results[-1]["validation_accuracy"] == 1.0
+    assert results[0]["validation_f1_macro"] <= 1.0 and results[0]["latency_ms"]["1"] > 0
+
+
+# Test: el modo rápido usa menos iteraciones y el corte sale de los metadatos del entrenamiento
+def test_fast_mode_uses_iteration_range(tmp_path):
+    save_metadata(tmp_path / "metadata.json", {"iteration_cutoffs": [
+        {"iterations": 10, "validation_f1_macro": 0.5},
+        {"iterations": 40, "validation_f1_macro": 0.695},
+        {"iterations": 171, "validation_f1_macro": 0.70}
+    ]})
+    loaded = predictor.load_artifacts(metadata_file=str(tmp_path / "metadata.json"))
+    assert loaded.fast_iterations == 40
+
+    X = loaded.pipeline.transform_records(predictor.WARM_UP_RECORDS)
+    fast = predictor.predict_students_with_probabilities(predictor.WARM_UP_RECORDS, loaded, fast=True)
+    expected = loaded.model.inplace_predict(X, iteration_range=(0, 40))
+    assert np.allclose([list(result['probabilities'].values()) for result in fast], expected, atol=1e-6)
+
+    # Sin metadatos: la mitad de las iteraciones
+    assert predictor.load_artifacts(metadata_file=str(tmp_path / "no_existe.json")).fast_iterations == \
+        loaded.model.num_boosted_rounds() // 2
+
+
+# Test del endpoint: ?mode=fast se indica en la respuesta y no comparte caché con el modo completo
+def test_predict_endpoint_fast_mode(fake_table):
+    import server.main as main_module
+    client = TestClient(main_module.app)
+
+    full = client.post("/predict", json=STUDENT).json()
+    fast = client.post("/predict?mode=fast", json=STUDENT).json()
+
+    assert full['mode'] == "full" and fast['mode'] == "fast"
+    assert fast['probabilities'] != full['probabilities']
+    assert client.post("/predict?mode=turbo", json=STUDENT).status_code == 422
+
+# Ejecuta este test con:
+# pytest server/tests/test_iteration_cutoffs.py
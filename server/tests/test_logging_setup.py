@@ -0,0 +1,143 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import contextvars
+import io
+import json
+import logging
+import queue
+import pytest
+from server import logging_setup
+
+
+@pytest.fixture
+def log_output():
+    # Sustituye la salida del logging por un buffer durante el test
+    logging_setup.shutdown_logging()
+    buffer = io.StringIO()
+    logging_setup.setup_logging(level="INFO", log_format="json", stream=buffer)
+    yield buffer
+    logging_setup.shutdown_logging()
+    logging_setup.setup_logging()
+
+
+def read_lines(buffer):
+    # shutdown_logging vacía la cola antes de leer
+    logging_setup.shutdown_logging()
+    return [json.loads(line) for line in buffer.getvalue().splitlines()]
+
+
+# Test: una línea JSON por predicción, con el request_id de la petición
+def test_log_prediction_writes_one_json_line(log_output):
+    def request():
+        logging_setup.begin_request("abc123")
+        logging_setup.log_prediction(endpoint="/predict", prediction="Graduate", confidence=0.9)
+
+    contextvars.copy_context().run(request)
+
+    lines = read_lines(log_output)
+    assert len(lines) == 1
+    assert lines[0]['event'] == "prediction" and lines[0]['request_id'] == "abc123"
+    assert lines[0]['prediction'] == "Graduate" and lines[0]['level'] == "INFO"
+
+
+# Test: con muestreo 0 las peticiones no escriben INFO, pero los WARNING se escriben siempre
+def test_sampling_drops_info_but_keeps_warnings(log_output, monkeypatch):
+    monkeypatch.setattr(logging_setup.settings, "LOG_SAMPLE_RATE", 0.0)
+    logger = logging.getLogger("server.tests")
+
+    def request():
+        logging_setup.begin_request()
+        logging_setup.log_prediction(prediction="Dropout")
+        logger.warning("aviso")
+
+    contextvars.copy_context().run(request)
+
+    lines = read_lines(log_output)
+    assert [line['message'] for line in lines] == ["aviso"]
+
+
+# Test: la traza por feature es DEBUG y está desactivada con el nivel por defecto
+def test_feature_tracing_is_debug_only(log_output):
+    assert not logging.getLogger("server.models.preprocessing").isEnabledFor(logging.DEBUG)
+    assert not logging.getLogger("server.models.predictor").isEnabledFor(logging.DEBUG)
+    assert logging.getLogger("server.predictions").isEnabledFor(logging.INFO)
+
+
+# Test: con la cola llena los registros se descartan sin bloquear y se cuentan
+def test_queue_handler_drops_when_full():
+    handler = logging_setup.DroppingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord("server", logging.INFO, __file__, 1, "hola %s", ("mundo",), None)
+
+    handler.handle(record)
+    handler.handle(record)
+
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().getMessage() == "hola mundo"
+
+
+# Test: el mensaje se formatea en el hilo del listener, no en el de la petición
+def test_message_is_formatted_by_listener(log_output):
+    import threading
+
+    class Argument:
+        def __str__(self):
+            return threading.current_thread().name
+
+    logging.getLogger("server.tests").warning("formateado en %s", Argument())
+
+    lines = read_lines(log_output)
+    assert lines[0]['message'] != f"formateado en {threading.current_thread().name}"
+    assert lines[0]['message'].startswith("formateado en ")
+
+
+# Test: el trabajo del pool de inferencia (hilos) registra con el request_id de la petición
+def test_inference_pool_threads_keep_request_context(log_output, monkeypatch):
+    import asyncio
+    from server.models.inference_pool import InferencePool
+
+    monkeypatch.setattr(logging_setup.settings, "LOG_SAMPLE_RATE", 0.0)
+    pool = InferencePool(max_workers=1)
+
+    def predict():
+        logging.getLogger("server.tests").info("info no muestreado")
+        logging.getLogger("server.tests").warning("desde el pool")
+
+    async def request():
+        logging_setup.begin_request("req42")
+        await pool.run(predict)
+
+    asyncio.run(request())
+    pool.shutdown()
+
+    lines = read_lines(log_output)
+    assert [(line['message'], line.get('request_id')) for line in lines] == [("desde el pool", "req42")]
+
+
+# Test: un proceso hijo creado por fork tiene su propio listener y sus registros se escriben
+def test_forked_process_keeps_logging(tmp_path):
+    import multiprocessing
+
+    logging_setup.shutdown_logging()
+    output_file = open(tmp_path / "log.jsonl", "w")
+    logging_setup.setup_logging(level="INFO", log_format="json", stream=output_file)
+
+    def child():
+        logging.getLogger("server.tests").warning("desde el hijo")
+        logging_setup.shutdown_logging()
+
+    process = multiprocessing.get_context("fork").Process(target=child)
+    process.start()
+    process.join(timeout=10)
+
+    logging_setup.shutdown_logging()
+    output_file.close()
+    logging_setup.setup_logging()
+
+    assert process.exitcode == 0
+    lines = [json.loads(line) for line in (tmp_path / "log.jsonl").read_text().splitlines()]
+    assert [line['message'] for line in lines] == ["desde el hijo"]
+
+# Ejecuta este test con:
+# pytest server/tests/test_logging_setup.py
@@ -0,0 +1,129 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+# El cliente de Supabase exige credenciales al importarse (no se hace ninguna llamada real)
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import pytest
+from fastapi.testclient import TestClient
+import server.main as main_module
+from server.models import predictor
+
+STUDENT = {
+    'curricular_units_1st_sem_grade': 15.0,
+    'curricular_units_2nd_sem_grade': 14.0,
+    'curricular_units_1st_sem_approved': 5,
+    'curricular_units_2nd_sem_approved': 4,
+    'curricular_units_1st_sem_evaluations': 6,
+    'curricular_units_2nd_sem_evaluations': 5,
+    'unemployment_rate': 10.0,
+    'gdp': 1.5,
+    'age_at_enrollment': 20,
+    'scholarship_holder': 'Yes',
+    'tuition_fees_up_to_date': 'Yes',
+    'marital_status': 'Single',
+    'previous_qualification': 'Secondary education',
+    "mother's_qualification": 'Higher education—degree',
+    "father's_qualification": 'Unknown'
+}
+
+
+class FakeQuery:
+    """Sustituye a supabase.table(...) y guarda lo que se inserta"""
+    def __init__(self):
+        self.inserted = []
+
+    def insert(self, rows):
+        self.inserted.append(rows)
+        return self
+
+    def upsert(self, rows, **kwargs):
+        return self.insert(rows)
+
+    def execute(self):
+        class Response:
+            data = [{'id': 1}]
+        return Response()
+
+
+@pytest.fixture
+def fake_table(monkeypatch):
+    query = FakeQuery()
+    monkeypatch.setattr(main_module.supabase, "table", lambda name: query)
+    yield query
+    # Las filas que /predict dejó en la escritura diferida se escriben antes de quitar el doble
+    main_module.student_writer.flush(timeout=5)
+
+
+# Test del endpoint de predicción por lotes
+def test_predict_batch_keeps_order_and_row_errors(fake_table):
+    client = TestClient(main_module.app)
+    poor_student = dict(STUDENT, curricular_units_1st_sem_grade=2.0, curricular_units_2nd_sem_grade=1.0,
+                        curricular_units_1st_sem_approved=0, curricular_units_2nd_sem_approved=0)
+    invalid_student = {k: v for k, v in STUDENT.items() if k != 'gdp'}
+
+    response = client.post("/predict/batch", json=[STUDENT, invalid_student, poor_student])
+
+    # 1. Respuesta con un resultado por fila, en el mismo orden
+    assert response.status_code == 200
+    body = response.json()
+    assert body['total'] == 3 and body['successful'] == 2 and body['failed'] == 1
+    assert [item['index'] for item in body['results']] == [0, 1, 2]
+
+    # 2. La fila inválida lleva sus propios errores y no tiene predicción
+    assert body['results'][1]['prediction'] is None
+    assert body['results'][1]['errors'][0]['loc'] == ['gdp']
+
+    # 3. Las filas válidas coinciden con la predicción individual
+    for i, student in [(0, STUDENT), (2, poor_student)]:
+        single = predictor.predict_student_outcome_with_probabilities(
+            main_module.StudentInput.model_validate(student).model_dump()
+        )
+        assert body['results'][i]['prediction'] == single['prediction']
+        assert abs(body['results'][i]['confidence'] - single['confidence']) < 1e-6
+
+    # 4. Una sola inserción en bloque con las filas válidas
+    assert len(fake_table.inserted) == 1
+    assert len(fake_table.inserted[0]) == 2
+
+
+def test_predict_batch_rejects_oversized_batches(fake_table, monkeypatch):
+    monkeypatch.setattr(main_module.settings, "PREDICT_BATCH_MAX_SIZE", 1)
+    client = TestClient(main_module.app)
+
+    response = client.post("/predict/batch", json=[STUDENT, STUDENT])
+
+    assert response.status_code == 413
+
+
+# Test de /predict a través del micro-batcher
+def test_predict_goes_through_micro_batcher(fake_table):
+    client = TestClient(main_module.app)
+    requests_before = main_module.prediction_batcher.stats()['requests_total']
+
+    response = client.post("/predict", json=STUDENT)
+
+    assert response.status_code == 200
+    assert response.json()['prediction'] in ['Dropout', 'Graduate', 'Enrolled']
+    assert main_module.prediction_batcher.stats()['requests_total'] == requests_before + 1
+
+# Test de los endpoints de administración del modelo
+def test_model_admin_endpoints(monkeypatch):
+    client = TestClient(main_module.app)
+
+    # 1. Con token configurado, sin cabecera se rechaza
+    monkeypatch.setattr(main_module.settings, "ADMIN_TOKEN", "secreto")
+    assert client.post("/model/reload").status_code == 403
+
+    # 2. Los artefactos en disco no han cambiado: no hay recarga
+    response = client.post("/model/reload", headers={"X-Admin-Token": "secreto"})
+    assert response.status_code == 200
+    assert response.json()['reloaded'] is False
+
+    # 3. Sin versión anterior no hay rollback
+    assert client.post("/model/rollback", headers={"X-Admin-Token": "secreto"}).status_code == 409
+
+# Ejecuta este test con:
+# pytest server/tests/test_main.py
@@ -0,0 +1,95 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+from collections import Counter
+from fastapi.testclient import TestClient
+from server import metrics
+import server.main as main_module
+from server.tests.test_main import STUDENT, fake_table  # noqa: F401 (fixture)
+
+
+# Test del formato de texto: HELP, TYPE y muestras con etiquetas
+def test_registry_renders_prometheus_text():
+    # 1. Registro propio con un contador etiquetado
+    registry = metrics.MetricsRegistry()
+    requests_total = registry.counter("demo_requests_total", "Peticiones de prueba", ["path"])
+    requests_total.inc(path="/predict")
+    requests_total.inc(2, path="/predict")
+
+    # 2. Exportación
+    text = registry.render()
+    assert "# HELP demo_requests_total Peticiones de prueba\n" in text
+    assert "# TYPE demo_requests_total counter\n" in text
+    assert 'demo_requests_total{path="/predict"} 3\n' in text
+
+
+# Test de los histogramas: buckets acumulados, +Inf, suma y conteo
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.MetricsRegistry()
+    duration = registry.histogram("demo_seconds", "Duración", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        duration.observe(value, stage="predict")
+
+    text = registry.render()
+    assert 'demo_seconds_bucket{stage="predict",le="0.1"} 1\n' in text
+    assert 'demo_seconds_bucket{stage="predict",le="1"} 3\n' in text
+    assert 'demo_seconds_bucket{stage="predict",le="+Inf"} 4\n' in text
+    assert 'demo_seconds_sum{stage="predict"} 4.05\n' in text
+    assert 'demo_seconds_count{stage="predict"} 4\n' in text
+
+    # Histograma a partir de un Counter de tamaños de lote
+    _, _, _, samples = metrics.histogram_from_counts("demo_batch_size", "Tamaños", Counter({1: 2, 8: 1}), (1, 4))
+    assert [value for _, _, value in samples] == [2, 2, 3, 10, 3]
+
+
+# Test de registro desactivado: no se acumula nada
+def test_disabled_registry_records_nothing():
+    registry = metrics.MetricsRegistry(enabled=False)
+    duration = registry.histogram("demo_seconds", "Duración")
+    with duration.time():
+        pass
+    assert "demo_seconds_count" not in registry.render()
+
+
+# Test del endpoint /metrics: tras /predict aparecen las etapas del endpoint y del modelo
+def test_metrics_endpoint_exposes_stage_latencies(fake_table):
+    client = TestClient(main_module.app)
+
+    # 1. Una predicción
+    assert client.post("/predict", json=STUDENT).status_code == 200
+
+    # 2. Métricas en formato Prometheus
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith("text/plain; version=0.0.4")
+    text = response.text
+    for stage in ("validation", "model", "db_insert"):
+        assert f'student_api_stage_duration_seconds_count{{endpoint="/predict",stage="{stage}"}}' in text
+    assert 'student_api_request_duration_seconds_count{method="POST",path="/predict",status="200"}' in text
+    assert 'student_model_info{version="' in text
+    assert "student_prediction_cache_misses_total" in text
+    assert 'student_micro_batch_size_bucket{le="+Inf"}' in text
+
+
+# Test de la ruta individual: cada llamada al modelo queda en las latencias del modelo activo
+def test_single_prediction_records_model_latency():
+    from server.models import predictor
+
+    loaded = predictor.get_active_model()
+    predictor.prediction_cache.clear()
+    loaded.latencies.clear()
+
+    # 1. Fallo de caché: el modelo puntúa una fila
+    predictor.predict_student_outcome_with_probabilities(dict(STUDENT))
+    assert len(loaded.latencies) == 1 and loaded.latencies[-1][1] == 1
+
+    # 2. Acierto de caché: sin llamada al modelo
+    predictor.predict_student_outcome_with_probabilities(dict(STUDENT))
+    assert len(loaded.latencies) == 1
+
+# Ejecuta este test con:
+# pytest server/tests/test_metrics.py
@@ -0,0 +1,145 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import joblib
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from server.models import predictor
+from server.models.model_registry import ModelRegistry, ModelSpec, parse_model_specs
+from server.tests.test_main import STUDENT, fake_table  # noqa: F401 (fixture)
+
+
+@pytest.fixture
+def random_forest_registry(tmp_path, monkeypatch):
+    """
+    Registro con un Random Forest pequeño entrenado sobre estudiantes sintéticos (etiquetas = predicción
+    del XGBoost, codificadas como en el dataset) y guardado con joblib, como random_forest_trainer.py
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from server.benchmarks.common import make_synthetic_records
+
+    loaded = predictor.load_model()
+    records = make_synthetic_records(loaded.pipeline, 300)
+    X = loaded.pipeline.transform_records(records)
+    y = np.argmax(predictor.predict_probabilities(X, loaded), axis=1)
+    y[:3] = [0, 1, 2]   # las tres clases presentes aunque el XGBoost no prediga alguna
+
+    model_file = tmp_path / "random_forest_multiclass_model.joblib"
+    joblib.dump(RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y), model_file)
+
+    registry = ModelRegistry(
+        loader=predictor.load_registered_model,
+        default_name=predictor.DEFAULT_MODEL_NAME,
+        default_loader=predictor.get_active_model,
+        default_loaded=lambda: predictor.active_model,
+        specs=[ModelSpec("random_forest", "sklearn", str(model_file), predictor.pipeline_path)]
+    )
+    monkeypatch.setattr(predictor, "model_registry", registry)
+    return registry
+
+
+# Test: formato de EXTRA_MODELS
+def test_parse_model_specs():
+    specs = parse_model_specs("random_forest:sklearn:rf_model.joblib, otro:xgboost:otro.pkl:otro_pipeline.pkl",
+                              "/artifacts", "/artifacts/pipeline.pkl")
+
+    assert [(spec.name, spec.kind) for spec in specs] == [("random_forest", "sklearn"), ("otro", "xgboost")]
+    assert specs[0].pipeline_file == "/artifacts/pipeline.pkl"
+    assert specs[0].metadata_file == "/artifacts/rf_metadata.json"
+    assert specs[1].pipeline_file == "/artifacts/otro_pipeline.pkl"
+    with pytest.raises(ValueError):
+        parse_model_specs("rf:lightgbm:rf.txt", "/artifacts", "/artifacts/pipeline.pkl")
+
+
+# Test: el Random Forest se carga al pedirlo, comparte el pipeline y predice en el orden de CLASS_NAMES
+def test_registry_loads_lazily_and_shares_pipeline(random_forest_registry):
+    assert not random_forest_registry.stats()["random_forest"]["loaded"]
+
+    forest = predictor.get_model("random_forest")
+    assert forest.pipeline is predictor.get_active_model().pipeline
+    assert forest.kind == "sklearn" and forest.model_type == "RandomForestClassifier"
+
+    results = predictor.predict_students_with_model(predictor.WARM_UP_RECORDS, "random_forest")
+    xgboost_results = predictor.predict_students_with_probabilities(predictor.WARM_UP_RECORDS)
+    assert [r['prediction'] for r in results] == [r['prediction'] for r in xgboost_results]
+    assert results[0]['model_type'] == "RandomForestClassifier"
+
+    stats = random_forest_registry.stats()["random_forest"]
+    assert stats["loaded"] and stats["memory_bytes"] > 0
+    assert stats["shares_pipeline_with"] == [predictor.DEFAULT_MODEL_NAME]
+    assert stats["latency"]["calls"] == 1
+
+    with pytest.raises(KeyError):
+        predictor.get_model("no_existe")
+
+
+# Test de la caché con otro modelo: la segunda petición al Random Forest no vuelve a puntuar
+def test_named_model_predictions_are_cached(random_forest_registry):
+    predictor.prediction_cache.clear()
+    hits = predictor.prediction_cache.hits
+
+    # 1. Primera petición: fallo de caché, el modelo puntúa
+    first = predictor.predict_students_cached(predictor.WARM_UP_RECORDS[:1], model_name="random_forest")
+    forest = predictor.get_model("random_forest")
+    assert len(forest.latencies) == 1
+
+    # 2. Segunda petición: acierto de caché, sin llamar al modelo
+    second = predictor.predict_students_cached(predictor.WARM_UP_RECORDS[:1], model_name="random_forest")
+    assert second == first and second[0]['model_type'] == "RandomForestClassifier"
+    assert predictor.prediction_cache.hits == hits + 1
+    assert len(forest.latencies) == 1
+
+    # 3. La entrada del XGBoost para el mismo estudiante es otra
+    xgboost_result = predictor.predict_students_cached(predictor.WARM_UP_RECORDS[:1])
+    assert xgboost_result[0]['model_type'] == "XGBoost"
+
+
+# Test: las latencias de un modelo cargado solo en los workers del pool de procesos aparecen en stats()
+def test_registry_reports_latencies_from_workers(random_forest_registry):
+    random_forest_registry.record_worker_latencies("random_forest", "abc", [(0.002, 4), (0.004, 4)])
+
+    stats = random_forest_registry.stats()["random_forest"]
+    assert not stats["loaded"] and stats["loaded_in_workers"]
+    assert stats["latency"]["calls"] == 2 and abs(stats["latency"]["ms_per_row"] - 0.75) < 1e-9
+
+# Test: un modelo de scikit-learn con otras features no se carga
+def test_registry_rejects_model_with_other_features(tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+
+    model_file = tmp_path / "rf_model.joblib"
+    joblib.dump(RandomForestClassifier(n_estimators=2).fit(np.zeros((4, 3)), [0, 1, 2, 0]), model_file)
+
+    with pytest.raises(ValueError):
+        predictor.load_artifacts(predictor.pipeline_path, str(model_file), kind="sklearn")
+    with pytest.raises(ValueError):
+        predictor.sklearn_class_order([0, 1])
+
+
+# Test de los endpoints: ?model= elige el modelo y GET /models lista los registrados
+def test_predict_with_named_model(random_forest_registry, fake_table, monkeypatch):
+    import server.main as main_module
+    monkeypatch.setattr(main_module, "model_registry", random_forest_registry)
+    client = TestClient(main_module.app)
+
+    # 1. Predicción individual y por lotes con el Random Forest
+    response = client.post("/predict?model=random_forest", json=STUDENT)
+    assert response.status_code == 200 and response.json()['model_type'] == "RandomForestClassifier"
+    batch = client.post("/predict/batch?model=random_forest", json=[STUDENT, STUDENT]).json()
+    assert batch['successful'] == 2 and batch['model_type'] == "RandomForestClassifier"
+
+    # 2. Modelo desconocido y modo rápido sin XGBoost
+    assert client.post("/predict?model=no_existe", json=STUDENT).status_code == 404
+    assert client.post("/predict?model=random_forest&mode=fast", json=STUDENT).status_code == 400
+
+    # 3. Listado con memoria y latencia
+    models = client.get("/models").json()
+    assert models['default'] == "xgboost"
+    assert models['models']['random_forest']['latency']['calls'] >= 1
+
+# Ejecuta este test con:
+# pytest server/tests/test_model_registry.py
@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import pytest
+from server.models.prediction_cache import PredictionCache
+
+STUDENT = {
+    'curricular_units_1st_sem_grade': 15.0,
+    'curricular_units_2nd_sem_grade': 14.0,
+    'curricular_units_1st_sem_approved': 5,
+    'curricular_units_2nd_sem_approved': 4,
+    'curricular_units_1st_sem_evaluations': 6,
+    'curricular_units_2nd_sem_evaluations': 5,
+    'unemployment_rate': 10.0,
+    'gdp': 1.5,
+    'age_at_enrollment': 20,
+    'scholarship_holder': 'Yes',
+    'tuition_fees_up_to_date': 'Yes',
+    'marital_status': 'Single',
+    'previous_qualification': 'Secondary education',
+    'mothers_qualification': 'Higher education—degree',
+    'fathers_qualification': 'Unknown'
+}
+
+RESULT = {'prediction': 'Graduate', 'probabilities': {'Dropout': 0.1, 'Graduate': 0.8, 'Enrolled': 0.1}, 'confidence': 0.8}
+
+
+# Test de la clave canónica
+def test_cache_key_normalizes_aliases_and_numbers():
+    aliased = {k: v for k, v in STUDENT.items() if k not in ('mothers_qualification', 'fathers_qualification')}
+    aliased["mother's_qualification"] = STUDENT['mothers_qualification']
+    aliased["father's_qualification"] = STUDENT['fathers_qualification']
+    aliased['age_at_enrollment'] = 20.0
+
+    assert PredictionCache.make_key(aliased) == PredictionCache.make_key(STUDENT)
+    assert len(PredictionCache.make_key(STUDENT)) == 15
+    assert PredictionCache.make_key(dict(STUDENT, gdp=1.6)) != PredictionCache.make_key(STUDENT)
+
+
+# Test de LRU, TTL y contadores
+def test_cache_lru_eviction_and_counters():
+    cache = PredictionCache(max_size=2, ttl_seconds=None)
+    cache.put('a', RESULT)
+    cache.put('b', RESULT)
+    assert cache.get('a') == RESULT      # 'a' pasa a ser la más reciente
+    cache.put('c', RESULT)               # expulsa 'b'
+
+    assert cache.get('b') is None
+    assert cache.get('c') == RESULT
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 1, 1, 2)
+
+
+def test_cache_ttl_expiration(monkeypatch):
+    import server.models.prediction_cache as cache_module
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    cache.put('a', RESULT)
+    now[0] += 61
+
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+# Test: la caché se vacía cuando cambia la versión del modelo
+def test_cache_invalidated_when_model_version_changes():
+    version = ['v1']
+    cache = PredictionCache(max_size=10, version_provider=lambda: version[0])
+    cache.put('a', RESULT)
+    assert cache.get('a') == RESULT
+
+    version[0] = 'v2'
+
+    assert cache.get('a') is None
+    assert cache.stats()['invalidations'] == 1
+    assert cache.stats()['model_version'] == 'v2'
+
+
+# Test: los resultados devueltos son copias
+def test_cache_returns_copies():
+    cache = PredictionCache(max_size=10)
+    cache.put('a', RESULT)
+    cache.get('a')['probabilities']['Graduate'] = 0.0
+
+    assert cache.get('a')['probabilities']['Graduate'] == 0.8
+
+
+# Test de integración con el predictor: la segunda vez no se llama al modelo
+def test_predict_students_cached_skips_model_on_hit(monkeypatch):
+    from server.models import predictor
+    predictor.prediction_cache.clear()
+
+    calls = []
+    original = predictor.predict_students_with_probabilities
+    monkeypatch.setattr(predictor, "predict_students_with_probabilities",
+                        lambda records, *args, **kwargs: calls.append(len(records)) or original(records, *args, **kwargs))
+
+    first = predictor.predict_students_cached([STUDENT])
+    second = predictor.predict_students_cached([STUDENT, dict(STUDENT, gdp=-2.0)])
+
+    assert calls == [1, 1]
+    assert second[0] == first[0]
+
+# Ejecuta este test con:
+# pytest server/tests/test_prediction_cache.py
@@ -44,5 +44,119 @@ def test_predict_student_outcome_with_probabilities():
     max_prob = max(result['probabilities'].values())
     assert abs(result['confidence'] - max_prob) < 1e-6
 
+
+# Test de la ruta dispersa: mismas probabilidades que la ruta densa
+def test_predict_probabilities_sparse_matches_dense():
+    import pandas as pd
+    import xgboost as xgb
+    from server.models import predictor
+
+    records = [
+        {'curricular_units_1st_sem_grade': 15.0, 'curricular_units_1st_sem_approved': 5, 'gdp': 1.5,
+         'age_at_enrollment': 20, 'scholarship_holder': 'Yes', 'marital_status': 'Single'},
+        {'curricular_units_1st_sem_grade': 0.0, 'curricular_units_1st_sem_approved': 0, 'gdp': -1.0,
+         'age_at_enrollment': 35, 'scholarship_holder': 'No', 'marital_status': 'Divorced'}
+    ]
+    df = pd.DataFrame(records)
+    pipeline = predictor.preprocessing_pipeline
+
+    dense = predictor.model.predict(xgb.DMatrix(pipeline.transform(df), feature_names=pipeline.features))
+    sparse = predictor.predict_probabilities_sparse(pipeline.transform_sparse(df))
+
+    assert abs(dense - sparse).max() < 1e-6
+
+
+# Test de inplace_predict: mismas probabilidades que con DMatrix
+def test_predict_probabilities_inplace_matches_dmatrix():
+    import numpy as np
+    import xgboost as xgb
+    from server.models import predictor
+
+    X = np.random.default_rng(0).random((64, len(predictor.preprocessing_pipeline.features))).astype(np.float32)
+
+    expected = predictor.model.predict(xgb.DMatrix(X, feature_names=predictor.preprocessing_pipeline.features))
+
+    assert abs(predictor.predict_probabilities(X) - expected).max() < 1e-6
+
+
+# Test de los buffers de entrada: se reutilizan dentro de un hilo y son distintos entre hilos
+def test_input_buffers_are_reused_per_thread():
+    import threading
+    import numpy as np
+    from server.models import predictor
+
+    first = predictor.get_input_buffer(4)
+    second = predictor.get_input_buffer(2)
+    assert np.shares_memory(first, second)
+    assert second.dtype == np.float32 and second.flags['C_CONTIGUOUS']
+
+    other_thread = []
+    thread = threading.Thread(target=lambda: other_thread.append(predictor.get_input_buffer(2)))
+    thread.start()
+    thread.join()
+    assert not np.shares_memory(other_thread[0], second)
+
+# Test de recarga en caliente: activa la versión nueva, conserva la anterior y permite volver atrás
+def test_reload_and_rollback_model(tmp_path):
+    import pickle
+    import shutil
+    from server.models import predictor
+
+    # 1. Artefactos "reentrenados": mismo modelo con otro atributo, así cambia el hash
+    new_model = predictor.model.copy()
+    new_model.set_attr(retrained='yes')
+    model_file = tmp_path / "model.pkl"
+    model_file.write_bytes(pickle.dumps(new_model))
+    pipeline_file = tmp_path / "pipeline.pkl"
+    shutil.copy(predictor.pipeline_path, pipeline_file)
+
+    original_version = predictor.model_version
+    expected = predictor.predict_students_with_probabilities(predictor.WARM_UP_RECORDS)
+
+    # 2. Recarga: versión nueva activa y la anterior guardada
+    result = predictor.reload_model(str(pipeline_file), str(model_file))
+    try:
+        assert result['reloaded'] is True
+        assert predictor.model_version != original_version
+        assert predictor.model_versions()['previous'][0]['version'] == original_version
+        assert predictor.predict_students_with_probabilities(predictor.WARM_UP_RECORDS) == expected
+
+        # 3. Recargar los mismos artefactos no cambia nada
+        assert predictor.reload_model(str(pipeline_file), str(model_file))['reloaded'] is False
+    finally:
+        # 4. Rollback a la versión original
+        predictor.rollback_model()
+
+    assert predictor.model_version == original_version
+    with pytest.raises(LookupError):
+        predictor.rollback_model()
+
+
+# Test de recarga fallida: el modelo activo no cambia
+def test_reload_with_broken_artifact_keeps_active_model(tmp_path):
+    from server.models import predictor
+
+    broken_file = tmp_path / "model.pkl"
+    broken_file.write_bytes(b"no es un pickle")
+    original_version = predictor.model_version
+
+    with pytest.raises(Exception):
+        predictor.reload_model(predictor.pipeline_path, str(broken_file))
+
+    assert predictor.model_version == original_version
+    assert not predictor.previous_models
+
+
+# Test: el modelo cargado usa los hilos de XGBoost configurados (sin sobresuscripción por defecto)
+def test_loaded_model_uses_configured_nthread(monkeypatch):
+    from server.models import predictor
+
+    loaded = predictor.load_artifacts()
+    assert loaded.nthread == predictor.inference_nthread()
+    assert loaded.describe()['nthread'] == loaded.nthread
+
+    monkeypatch.setattr(predictor.settings, "INFERENCE_NTHREAD", 3)
+    assert predictor.load_artifacts().nthread == 3
+
 # Ejecuta este test con:
-# pytest server/tests/test_predictor.py
\ No newline at end of file
+# pytest server/tests/test_predictor.py
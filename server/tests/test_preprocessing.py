@@ -91,6 +91,96 @@ def test_preprocessing_pipeline_transform():
     # 10. Verificar que el DataFrame resultante tiene una sola fila
     assert result.shape[0] == 1
 
-# Ejecutar este test con:
-# pytest server/tests/test_preprocessing.py
 
+# Test del índice compilado (base, valor) → columna
+def test_preprocessing_pipeline_compiled_index_survives_pickle():
+    import pickle
+
+    features = [
+        'gdp',
+        'scholarship_holder_Yes',
+        "mother's_qualification_Higher education—degree",
+        "mother's_qualification_Unknown"
+    ]
+    pipeline = PreprocessingPipeline(features=features)
+
+    # 1. El índice se construye al crear el pipeline
+    assert pipeline._one_hot_index[("mother's_qualification", 'Unknown')] == 3
+
+    # 2. No se serializa, pero se reconstruye al deserializar
+    assert '_one_hot_index' not in pipeline.__getstate__()
+    restored = pickle.loads(pickle.dumps(pipeline))
+    assert restored._one_hot_index == pipeline._one_hot_index
+
+    # 3. El nombre del API (sin apóstrofe) también se codifica
+    df = pd.DataFrame([{'gdp': 1.5, 'scholarship_holder': 'No', 'mothers_qualification': 'Unknown'}])
+    result = restored.transform(df)
+    assert result.iloc[0].tolist() == [1.5, 0, 0, 1]
+
+
+# Test de transformación de varias filas a la vez
+def test_preprocessing_pipeline_transform_multiple_rows():
+    features = ['age_at_enrollment', 'marital_status_Single', 'marital_status_Married', 'scholarship_holder_Yes']
+    pipeline = PreprocessingPipeline(features=features)
+
+    df = pd.DataFrame({
+        'age_at_enrollment': [19, 35, 22],
+        'marital_status': ['Single', 'Married', 'Widower'],
+        'scholarship_holder': ['No', 'Yes', 'Yes']
+    })
+    result = pipeline.transform(df)
+
+    # Cada fila se codifica con sus propios valores (no con los de la primera)
+    assert result.to_numpy().tolist() == [
+        [19, 1, 0, 0],
+        [35, 0, 1, 1],
+        [22, 0, 0, 1]
+    ]
+    assert list(result.index) == list(df.index)
+
+
+# Test de la ruta rápida sin pandas (lista de diccionarios → ndarray float32)
+def test_preprocessing_pipeline_transform_records_matches_transform():
+    features = [
+        'curricular_units_1st_sem_(grade)',
+        'gdp',
+        "father's_qualification_Doctorate",
+        'scholarship_holder_Yes',
+        'marital_status_Single'
+    ]
+    pipeline = PreprocessingPipeline(features=features)
+    records = [
+        {'curricular_units_1st_sem_grade': 15.5, 'gdp': 1.5, 'fathers_qualification': 'Doctorate', 'scholarship_holder': 'Yes'},
+        {'curricular_units_1st_sem_grade': 9.0, 'gdp': -0.5, 'fathers_qualification': 'Unknown', 'scholarship_holder': 'No'}
+    ]
+
+    result = pipeline.transform_records(records)
+
+    assert result.dtype == 'float32'
+    assert result.tolist() == [
+        [15.5, 1.5, 1, 1, 0],
+        [9.0, -0.5, 0, 0, 0]
+    ]
+    assert (result == pipeline.transform(pd.DataFrame(records)).to_numpy()).all()
+
+
+# Test de la salida dispersa (CSR)
+def test_preprocessing_pipeline_transform_sparse_matches_dense():
+    features = ['age_at_enrollment', 'gdp', 'marital_status_Single', 'marital_status_Married', 'scholarship_holder_Yes']
+    pipeline = PreprocessingPipeline(features=features)
+    df = pd.DataFrame({
+        'age_at_enrollment': [19, 35],
+        'gdp': [0.0, -1.5],
+        'marital_status': ['Single', 'Married'],
+        'scholarship_holder': ['No', 'Yes']
+    })
+
+    result = pipeline.transform_sparse(df)
+
+    # Solo se guardan los valores distintos de cero
+    assert result.format == 'csr'
+    assert result.nnz == 6
+    assert (result.toarray() == pipeline.transform(df).to_numpy()).all()
+
+# Ejecutar este test con:
+# pytest server/tests/test_preprocessing.py
\ No newline at end of file
@@ -0,0 +1,132 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import threading
+from fastapi.testclient import TestClient
+from server.models.shadow import ShadowScorer
+from server.tests.test_main import STUDENT, fake_table  # noqa: F401 (fixture)
+
+PRIMARY = {'prediction': 'Graduate', 'probabilities': {'Dropout': 0.1, 'Graduate': 0.8, 'Enrolled': 0.1}, 'confidence': 0.8}
+CANDIDATE = {'prediction': 'Dropout', 'probabilities': {'Dropout': 0.5, 'Graduate': 0.4, 'Enrolled': 0.1}, 'confidence': 0.5}
+
+
+# Test: acuerdo y diferencias de probabilidad entre el modelo servido y el candidato
+def test_shadow_scorer_records_agreement_and_deltas():
+    batches = []
+    scorer = ShadowScorer(lambda records: batches.append(len(records)) or
+                          [CANDIDATE if record['id'] == 0 else PRIMARY for record in records],
+                          model_name="candidate", batch_size=8)
+
+    for i in range(4):
+        assert scorer.submit({'id': i}, PRIMARY)
+    scorer.stop()
+
+    stats = scorer.stats()
+    assert stats['scored'] == 4 and stats['queued'] == 0 and sum(batches) == 4
+    assert stats['agreement_rate'] == 0.75
+    assert stats['transitions'] == {"Graduate→Dropout": 1, "Graduate→Graduate": 3}
+    assert abs(stats['mean_abs_probability_delta']['Graduate'] - 0.1) < 1e-9
+    assert abs(stats['max_abs_probability_delta'] - 0.4) < 1e-9
+
+
+# Test: con la cola llena las copias se descartan sin bloquear
+def test_shadow_scorer_drops_when_queue_is_full():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_candidate(records):
+        started.set()
+        release.wait(5)
+        return [PRIMARY] * len(records)
+
+    scorer = ShadowScorer(slow_candidate, max_queue_size=2, batch_size=1)
+
+    # 1. El worker se queda puntuando el primer registro
+    scorer.submit({'id': 0}, PRIMARY)
+    assert started.wait(5)
+
+    # 2. Caben dos en la cola; el resto se descarta
+    accepted = [scorer.submit({'id': i}, PRIMARY) for i in range(1, 6)]
+    assert accepted == [True, True, False, False, False]
+    assert scorer.stats()['dropped'] == 3
+
+    # 3. Al parar se puntúa lo encolado
+    release.set()
+    scorer.stop()
+    assert scorer.stats()['scored'] == 3
+
+
+# Test: los errores del candidato se cuentan y desactivado no encola nada
+def test_shadow_scorer_errors_and_disabled():
+    def failing_candidate(records):
+        raise RuntimeError("modelo candidato no disponible")
+
+    scorer = ShadowScorer(failing_candidate, batch_size=4)
+    scorer.submit({'id': 0}, PRIMARY)
+    scorer.stop()
+    assert scorer.stats()['errors'] == 1 and scorer.stats()['last_error'] == "modelo candidato no disponible"
+
+    disabled = ShadowScorer(failing_candidate, enabled=False)
+    assert disabled.submit({'id': 0}, PRIMARY) is False
+    assert disabled.stats()['submitted'] == 0
+
+
+# Test de integración: /predict copia la entrada al modelo en sombra y lo expone en /metrics
+def test_predict_copies_input_to_shadow_model(fake_table, monkeypatch):
+    import server.main as main_module
+    from server.models import predictor
+
+    # Candidato = el mismo XGBoost: todas las predicciones coinciden
+    scorer = ShadowScorer(predictor.predict_students_with_probabilities, model_name="candidate")
+    monkeypatch.setattr(main_module, "shadow_scorer", scorer)
+    client = TestClient(main_module.app)
+
+    # 1. Las peticiones con ?model= o ?mode=fast no se copian
+    for _ in range(3):
+        assert client.post("/predict", json=STUDENT).status_code == 200
+    assert client.post("/predict?mode=fast", json=STUDENT).status_code == 200
+    scorer.stop()
+
+    stats = scorer.stats()
+    assert stats['submitted'] == 3 and stats['scored'] == 3
+    assert stats['agreement_rate'] == 1.0
+
+    # 2. Métricas de la sombra
+    body = client.get("/metrics").text
+    assert 'student_shadow_scored_total{model="candidate"} 3' in body
+    assert 'student_shadow_agreement_ratio{model="candidate"} 1' in body
+
+
+# Test: lo que puntúa el candidato se cuenta con su propia etiqueta model, no como el modelo servido
+def test_shadow_scoring_keeps_its_own_model_metrics(monkeypatch):
+    from server import metrics
+    from server.models import predictor
+    from server.models.model_registry import ModelRegistry, ModelSpec
+
+    registry = ModelRegistry(
+        loader=predictor.load_registered_model,
+        default_name=predictor.DEFAULT_MODEL_NAME,
+        default_loader=predictor.get_active_model,
+        default_loaded=lambda: predictor.active_model,
+        specs=[ModelSpec("candidate", "xgboost", predictor.model_path, predictor.pipeline_path)]
+    )
+    monkeypatch.setattr(predictor, "model_registry", registry)
+
+    def rows_scored():
+        return {labels["model"]: value for _, labels, value in metrics.ROWS_SCORED.samples()}
+
+    before = rows_scored()
+    predictor.predict_students_with_model(predictor.WARM_UP_RECORDS, model_name="candidate")
+    after = rows_scored()
+
+    assert after["candidate"] == before.get("candidate", 0) + len(predictor.WARM_UP_RECORDS)
+    assert after.get("xgboost", 0) == before.get("xgboost", 0)
+    stages = {(labels["stage"], labels["model"]) for name, labels, _ in metrics.MODEL_STAGE_DURATION.samples()
+              if name.endswith("_count")}
+    assert ("predict", "candidate") in stages
+
+# Ejecuta este test con:
+# pytest server/tests/test_shadow.py
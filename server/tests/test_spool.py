@@ -0,0 +1,159 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+from fastapi.testclient import TestClient
+from server.database.spool import RecordSpool, read_segment
+from server.tests.test_main import STUDENT, FakeQuery
+
+
+def rows(*ids):
+    return [{'record_id': f"id-{i}", 'target': 'Graduate'} for i in ids]
+
+
+class FlakyDatabase:
+    """Base de datos que falla mientras down es True y guarda las filas sin duplicar record_id"""
+    def __init__(self, down=False):
+        self.down = down
+        self.rows = {}
+        self.calls = 0
+
+    def write(self, batch):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("Supabase no responde")
+        for row in batch:
+            self.rows.setdefault(row['record_id'], row)
+
+
+# Test del formato: registros con su longitud y final cortado tolerado
+def test_spool_segments_survive_truncated_tail(tmp_path):
+    spool = RecordSpool(str(tmp_path), FlakyDatabase(down=True).write)
+    assert spool.append(rows(1, 2, 3))
+    spool.stop()
+
+    # 1. Una caída a mitad de escribir deja medio registro al final
+    segment = os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0])
+    with open(segment, "ab") as f:
+        f.write(b"\x00\x00\x01\x00{\"record_id\": \"id-")
+
+    # 2. Se leen los registros completos y se marca el final cortado
+    records, truncated = read_segment(segment)
+    assert [record['record_id'] for record in records] == ["id-1", "id-2", "id-3"]
+    assert truncated
+
+
+# Test: con la base de datos caída se acumula en disco y al volver se reenvía una sola vez
+def test_spool_replays_when_database_recovers(tmp_path):
+    database = FlakyDatabase(down=True)
+    spool = RecordSpool(str(tmp_path), database.write, batch_size=2, segment_max_bytes=150)
+
+    # 1. Varios segmentos (rotan por tamaño) y un record_id repetido
+    spool.append(rows(1, 2))
+    spool.append(rows(3, 4))
+    spool.append(rows(2, 5))
+    assert not spool.replay_once()
+    assert spool.stats()['pending_segments'] >= 2 and spool.stats()['replay_failures'] == 1
+
+    # 2. La base de datos vuelve: se guarda todo, sin duplicados, y el spool queda vacío
+    database.down = False
+    assert spool.replay_once()
+    assert sorted(database.rows) == ["id-1", "id-2", "id-3", "id-4", "id-5"]
+    stats = spool.stats()
+    assert stats['pending_segments'] == 0 and stats['replayed'] == 5 and stats['duplicates_skipped'] == 1
+    spool.stop()
+
+
+# Test: lo que queda en disco al parar se reenvía en el siguiente arranque
+def test_spool_recovers_segments_after_restart(tmp_path):
+    database = FlakyDatabase(down=True)
+    first = RecordSpool(str(tmp_path), database.write)
+    first.append(rows(1, 2))
+    first.stop()
+
+    # 1. Nuevo proceso: numera los segmentos a continuación de los que encuentra
+    database.down = False
+    second = RecordSpool(str(tmp_path), database.write)
+    second.append(rows(3))
+    assert sorted(os.listdir(str(tmp_path))) == ["spool-000000000001.log", "spool-000000000002.log"]
+
+    # 2. Se reenvían los dos segmentos
+    assert second.replay_once()
+    assert sorted(database.rows) == ["id-1", "id-2", "id-3"]
+    second.stop()
+
+
+# Test de integración: si la escritura diferida agota los reintentos, las filas van al spool
+def test_failed_write_behind_batches_go_to_spool(tmp_path, monkeypatch):
+    import server.main as main_module
+    from server.database.write_behind import WriteBehindQueue
+
+    database = FlakyDatabase(down=True)
+    spool = RecordSpool(str(tmp_path), database.write, replay_interval_seconds=0.05)
+    writer = WriteBehindQueue(database.write, flush_interval_ms=0, max_retries=1, retry_backoff_seconds=0.01,
+                              on_failure=main_module.spool_student_records)
+    monkeypatch.setattr(main_module, "student_spool", spool)
+    monkeypatch.setattr(main_module, "student_writer", writer)
+    query = FakeQuery()
+    monkeypatch.setattr(main_module.supabase, "table", lambda name: query)
+    client = TestClient(main_module.app)
+
+    # 1. /predict responde aunque la base de datos no funcione
+    assert client.post("/predict", json=STUDENT).status_code == 200
+    assert writer.flush(timeout=5)
+    assert writer.stats()['failed'] == 1 and spool.stats()['appended'] == 1
+
+    # 2. Cuando vuelve, el hilo del spool la reenvía con su record_id
+    database.down = False
+    spool.start()
+    for _ in range(100):
+        if database.rows:
+            break
+        spool._stopping.wait(0.05)
+    spool.stop()
+    assert len(database.rows) == 1
+    assert list(database.rows.values())[0]['record_id'] == list(database.rows)[0]
+
+
+class EmptyResponseQuery(FakeQuery):
+    """PostgREST responde sin filas y sin error (nada guardado)"""
+    def execute(self):
+        class Response:
+            data = []
+        return Response()
+
+
+class FailingQuery(FakeQuery):
+    def execute(self):
+        raise ConnectionError("Supabase no responde")
+
+
+# Test de /predict/batch: las filas van al spool si la inserción falla o si responde sin datos
+def test_predict_batch_spools_unsaved_rows(tmp_path, monkeypatch):
+    import server.main as main_module
+
+    spool = RecordSpool(str(tmp_path), FlakyDatabase().write)
+    monkeypatch.setattr(main_module, "student_spool", spool)
+    monkeypatch.setattr(main_module.settings, "BULK_COPY_MIN_ROWS", 0)
+    client = TestClient(main_module.app)
+
+    for query in (FailingQuery(), EmptyResponseQuery()):
+        monkeypatch.setattr(main_module.supabase, "table", lambda name: query)
+        appended = spool.stats()['appended']
+
+        response = client.post("/predict/batch", json=[STUDENT, STUDENT])
+        assert response.status_code == 200
+        assert "pendientes de guardar" in response.json()['message']
+        assert spool.stats()['appended'] == appended + 2
+    spool.stop()
+
+    # Las filas guardadas llevan su record_id (el reenvío no las duplica)
+    spooled = [row for segment in sorted(os.listdir(str(tmp_path)))
+               for row in read_segment(os.path.join(str(tmp_path), segment))[0]]
+    assert len(spooled) == 4 and len({row['record_id'] for row in spooled}) == 4
+
+# Ejecuta este test con:
+# pytest server/tests/test_spool.py
@@ -0,0 +1,100 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import subprocess
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+
+# Presupuesto de importación de server.main (medido: ~0.6 s; antes de cargar en el lifespan: ~2.5 s)
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 1500))
+
+# Librerías pesadas que no deben importarse hasta que se cargue el modelo o se use la base de datos
+HEAVY_MODULES = ['xgboost', 'pandas', 'sklearn', 'scipy', 'supabase']
+
+
+def import_times(module):
+    """
+    Ejecuta `python -X importtime -c "import module"` y devuelve {módulo: tiempo acumulado en µs}
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time:  self [us] | cumulative | imported package"
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+# Test de regresión del arranque: importar el servidor es rápido y no carga librerías pesadas
+def test_import_server_main_stays_fast_and_light():
+    # 1. Importación en un proceso limpio
+    times = import_times('server.main')
+
+    # 2. Ninguna librería pesada se importa al importar el servidor
+    top_level = {name.split('.')[0] for name in times}
+    assert not top_level & set(HEAVY_MODULES)
+
+    # 3. El tiempo de importación acumulado está dentro del presupuesto
+    assert times['server.main'] / 1000 < IMPORT_TIME_BUDGET_MS
+
+
+# Test del lifespan: el modelo se carga en segundo plano y /readyz pasa a 200
+def test_lifespan_loads_model_and_signals_readiness():
+    import server.main as main_module
+
+    with TestClient(main_module.app) as client:
+        deadline = time.monotonic() + 30
+        response = client.get("/readyz")
+        while response.status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            response = client.get("/readyz")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body['ready'] is True and body['model_loaded'] is True
+        assert body['model_load_seconds'] is not None
+
+
+# Test de las sondas: /healthz y /readyz responden desde el estado en memoria, sin ejecutar el modelo
+def test_probes_use_cached_self_test(monkeypatch):
+    import server.main as main_module
+
+    with TestClient(main_module.app) as client:
+        # 1. /healthz responde siempre, aunque el modelo no esté listo
+        assert client.get("/healthz").json()['status'] == "alive"
+
+        deadline = time.monotonic() + 30
+        while client.get("/readyz").status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        # 2. La predicción de prueba se ejecutó en segundo plano y su resultado está en caché
+        self_test = client.get("/readyz").json()['self_test']
+        assert self_test['success'] is True and self_test['latency_ms'] > 0
+
+        # 3. Las sondas y /model/status no vuelven a ejecutar el modelo
+        calls = []
+        monkeypatch.setattr(main_module, "self_test", lambda: calls.append(1))
+        for _ in range(20):
+            assert client.get("/readyz").status_code == 200
+        assert client.get("/model/status").json()['status'] == "healthy"
+        assert calls == []
+
+        # 4. Si la última prueba falla, /readyz pasa a 503 (y /healthz sigue vivo)
+        monkeypatch.setattr(main_module.startup_state, "self_test", {"success": False, "error": "boom"})
+        assert client.get("/readyz").status_code == 503
+        assert client.get("/healthz").status_code == 200
+
+# Ejecuta este test con:
+# pytest server/tests/test_startup.py
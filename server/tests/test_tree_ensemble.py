@@ -0,0 +1,121 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+import shutil
+import subprocess
+import numpy as np
+import xgboost as xgb
+import pytest
+from server.models import predictor
+from server.models.tree_ensemble import TreeEnsemble, export_artifacts
+
+
+@pytest.fixture(scope="module")
+def ensemble():
+    return TreeEnsemble.from_booster(predictor.model)
+
+
+def make_features(n_rows, seed=0):
+    # Mezcla de columnas numéricas y one-hot (0/1), con algunos valores missing
+    rng = np.random.default_rng(seed)
+    n_features = len(predictor.preprocessing_pipeline.features)
+    X = (rng.random((n_rows, n_features)) < 0.3).astype(np.float32)
+    X[:, :9] = rng.normal(10, 5, (n_rows, 9))
+    X[rng.random((n_rows, n_features)) < 0.05] = np.nan
+    return X
+
+
+# Test de paridad: mismas probabilidades que model.predict
+def test_predict_proba_matches_model_predict(ensemble):
+    # 1. Datos de prueba
+    X = make_features(500)
+
+    # 2. Predicción con XGBoost y con el evaluador NumPy
+    expected = predictor.model.predict(xgb.DMatrix(X, feature_names=predictor.preprocessing_pipeline.features))
+    probabilities = ensemble.predict_proba(X)
+
+    # 3. Verifica forma y paridad numérica
+    assert probabilities.shape == expected.shape
+    assert abs(probabilities - expected).max() < 1e-5
+    assert np.array_equal(probabilities.argmax(axis=1), expected.argmax(axis=1))
+
+
+# Test de iteration_range: mismo recorte de árboles que XGBoost
+def test_predict_proba_iteration_range(ensemble):
+    X = make_features(50, seed=1)
+
+    expected = predictor.model.inplace_predict(X, iteration_range=(0, 20))
+
+    assert abs(ensemble.predict_proba(X, iteration_range=(0, 20)) - expected).max() < 1e-5
+
+
+# Test de exportación: guardar y cargar el .npz no cambia las predicciones
+def test_save_and_load_roundtrip(ensemble, tmp_path):
+    path = tmp_path / "trees.npz"
+    ensemble.save(path)
+    loaded = TreeEnsemble.load(path)
+
+    X = make_features(20, seed=2)
+    assert np.array_equal(loaded.predict_proba(X), ensemble.predict_proba(X))
+    assert loaded.feature_names == ensemble.feature_names
+    assert loaded.num_trees == ensemble.num_trees
+
+
+# Test del motor numpy en predictor.predict_probabilities
+def test_predictor_numpy_engine(monkeypatch):
+    X = make_features(8, seed=3)
+    expected = predictor.predict_probabilities(X)
+
+    monkeypatch.setattr(predictor.settings, "INFERENCE_ENGINE", "numpy")
+    assert abs(predictor.predict_probabilities(X) - expected).max() < 1e-5
+
+# Test del arranque con INFERENCE_ENGINE=numpy: se carga el .npz desplegado y no se importa xgboost
+def test_numpy_engine_loads_exported_trees_without_xgboost():
+    # 1. Proceso aparte con xgboost bloqueado (import xgboost lanza ImportError)
+    code = (
+        "import sys; sys.modules['xgboost'] = None\n"
+        "from server.models import predictor\n"
+        "loaded = predictor.load_model()\n"
+        "p = predictor.predict_students_with_probabilities(predictor.WARM_UP_RECORDS, loaded)\n"
+        "print(loaded.model_loaded, loaded.tree_ensemble.model_version == loaded.version, loaded.num_iterations, "
+        "p[0]['prediction'])\n"
+    )
+    env = dict(os.environ, INFERENCE_ENGINE="numpy", INFERENCE_POOL_SIZE="0")
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(os.path.dirname(__file__), '../../'),
+                            env=env, capture_output=True, text=True, timeout=60)
+
+    # 2. Sin booster deserializado, árboles de la misma versión que los pickles y la misma predicción
+    assert result.returncode == 0, result.stderr
+    booster_loaded, same_version, iterations, prediction = result.stdout.split()[-4:]
+    assert booster_loaded == "False" and same_version == "True"
+    assert int(iterations) == predictor.model.num_boosted_rounds()
+    assert prediction == predictor.predict_students_with_probabilities(predictor.WARM_UP_RECORDS[:1])[0]['prediction']
+
+
+# Test de la comprobación de versión: un .npz de otro modelo no se usa (se carga el booster)
+def test_numpy_engine_ignores_trees_of_another_version(monkeypatch, tmp_path):
+    monkeypatch.setattr(predictor.settings, "INFERENCE_ENGINE", "numpy")
+    for name in ("xgboost_multiclass_pipeline.pkl", "xgboost_multiclass_model.pkl"):
+        shutil.copy(os.path.join(predictor.artifacts_dir, name), tmp_path / name)
+    pipeline_file = str(tmp_path / "xgboost_multiclass_pipeline.pkl")
+    model_file = str(tmp_path / "xgboost_multiclass_model.pkl")
+
+    # 1. Árboles exportados de otra versión
+    stale = TreeEnsemble.load(os.path.join(predictor.artifacts_dir, "xgboost_multiclass_trees.npz"))
+    stale.model_version = "otra-version"
+    stale.save(tmp_path / "xgboost_multiclass_trees.npz")
+    loaded = predictor.load_artifacts(pipeline_file, model_file, str(tmp_path / "metadata.json"))
+    assert loaded.model_loaded and loaded.tree_ensemble is None
+
+    # 2. Exportados de nuevo con la versión correcta se usan sin deserializar el booster
+    export_artifacts(pipeline_file, model_file, tmp_path / "xgboost_multiclass_trees.npz")
+    loaded = predictor.load_artifacts(pipeline_file, model_file, str(tmp_path / "metadata.json"))
+    assert not loaded.model_loaded and loaded.tree_ensemble.model_version == loaded.version
+
+    # 3. Las explicaciones siguen disponibles: el booster se deserializa al pedirlas
+    assert predictor.explain_students(predictor.WARM_UP_RECORDS[:1], loaded)[0]['prediction']
+    assert loaded.model_loaded
+
+# Ejecuta este test con:
+# pytest server/tests/test_tree_ensemble.py
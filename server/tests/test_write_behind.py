@@ -0,0 +1,178 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import threading
+import time
+from fastapi.testclient import TestClient
+from server.database.write_behind import WriteBehindQueue
+from server.tests.test_main import STUDENT, fake_table  # noqa: F401 (fixture)
+
+
+# Test: se escribe al llenarse el lote y, si no se llena, al pasar flush_interval_ms
+def test_write_behind_flushes_by_size_and_by_time():
+    batches = []
+    writer = WriteBehindQueue(lambda rows: batches.append(list(rows)), batch_size=3, flush_interval_ms=10000)
+
+    # 1. Por tamaño: dos lotes completos sin esperar al intervalo
+    for i in range(6):
+        assert writer.submit({'id': i})
+    deadline = time.monotonic() + 5
+    while len(batches) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [[row['id'] for row in batch] for batch in batches] == [[0, 1, 2], [3, 4, 5]]
+
+    # 2. Por tiempo
+    timed = WriteBehindQueue(lambda rows: batches.append(list(rows)), batch_size=100, flush_interval_ms=50)
+    timed.submit({'id': 6})
+    timed.submit({'id': 7})
+    deadline = time.monotonic() + 5
+    while len(batches) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [row['id'] for row in batches[2]] == [6, 7]
+    assert timed.stats()['written'] == 2 and timed.stats()['queued'] == 0
+    writer.stop()
+    timed.stop()
+
+
+# Test: los lotes fallidos se reintentan y, agotados los reintentos, se cuentan como fallidos
+def test_write_behind_retries_with_backoff():
+    calls = []
+
+    def flaky(rows):
+        calls.append(len(rows))
+        if len(calls) <= 2:
+            raise ConnectionError("Supabase no responde")
+
+    writer = WriteBehindQueue(flaky, batch_size=10, flush_interval_ms=0, retry_backoff_seconds=0.01)
+    writer.submit({'id': 1})
+    assert writer.flush(timeout=5)
+    assert calls == [1, 1, 1]
+    assert writer.stats()['written'] == 1 and writer.stats()['retries'] == 2
+
+    failed = []
+
+    def always_down(rows):
+        raise ConnectionError("Supabase caído")
+
+    broken = WriteBehindQueue(always_down, flush_interval_ms=0, max_retries=2, retry_backoff_seconds=0.01,
+                              on_failure=lambda rows, error: failed.append(rows))
+    broken.submit({'id': 2})
+    assert broken.flush(timeout=5)
+    assert broken.stats()['failed'] == 1 and broken.stats()['retries'] == 2
+    assert failed == [[{'id': 2}]]
+    writer.stop()
+    broken.stop()
+
+
+# Test: con la cola llena submit devuelve False sin bloquear y al parar se escribe lo pendiente
+def test_write_behind_rejects_when_full_and_drains_on_stop():
+    started, release = threading.Event(), threading.Event()
+    written = []
+
+    def slow_write(rows):
+        started.set()
+        release.wait(5)
+        written.extend(rows)
+
+    writer = WriteBehindQueue(slow_write, max_queue_size=2, batch_size=1, flush_interval_ms=0)
+
+    # 1. El hilo se queda escribiendo la primera fila; caben dos más en la cola
+    writer.submit({'id': 0})
+    assert started.wait(5)
+    assert [writer.submit({'id': i}) for i in range(1, 5)] == [True, True, False, False]
+    assert writer.stats()['rejected'] == 2
+
+    # 2. Al parar se escriben las encoladas
+    release.set()
+    writer.stop(timeout=5)
+    assert [row['id'] for row in written] == [0, 1, 2]
+
+    # 3. Desactivada no encola nada
+    assert WriteBehindQueue(slow_write, enabled=False).submit({'id': 5}) is False
+
+
+# Test de la parada con la base de datos caída: sin esperar los reintentos, todo va a on_failure
+def test_write_behind_stop_hands_unsaved_rows_to_on_failure():
+    calls, failed = [], []
+
+    def always_down(rows):
+        calls.append(len(rows))
+        raise ConnectionError("Supabase caído")
+
+    writer = WriteBehindQueue(always_down, batch_size=2, flush_interval_ms=0, max_retries=5, retry_backoff_seconds=5,
+                              on_failure=lambda rows, error: failed.extend(rows))
+
+    # 1. El primer lote falla y espera su reintento; el resto sigue en la cola
+    for i in range(5):
+        writer.submit({'id': i})
+    deadline = time.monotonic() + 5
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # 2. Al parar no se reintenta ni se intenta escribir el resto: las 5 filas llegan a on_failure
+    start = time.monotonic()
+    writer.stop(timeout=5)
+    assert time.monotonic() - start < 2
+    assert calls == [2]
+    assert sorted(row['id'] for row in failed) == [0, 1, 2, 3, 4]
+    assert writer.stats()['failed'] == 5 and writer.stats()['unfinished'] == 0
+
+
+# Test de la parada con una escritura colgada: el lote en curso y la cola van a on_failure una sola vez
+def test_write_behind_stop_hands_over_hung_batch():
+    started, release = threading.Event(), threading.Event()
+    failed = []
+
+    def hung_write(rows):
+        started.set()
+        release.wait(5)
+        raise ConnectionError("timeout de lectura")
+
+    writer = WriteBehindQueue(hung_write, batch_size=1, flush_interval_ms=0,
+                              on_failure=lambda rows, error: failed.extend(rows))
+    writer.submit({'id': 0})
+    assert started.wait(5)
+    writer.submit({'id': 1})
+    worker = writer._worker
+
+    # 1. stop() no espera más de timeout: entrega la fila en curso y la encolada
+    writer.stop(timeout=0.1)
+    assert sorted(row['id'] for row in failed) == [0, 1]
+
+    # 2. Cuando la escritura colgada falla, el lote no se entrega otra vez
+    release.set()
+    worker.join(5)
+    assert not worker.is_alive()
+    assert sorted(row['id'] for row in failed) == [0, 1]
+
+
+# Test de integración: /predict responde antes de guardar y la fila llega a la tabla por lotes
+def test_predict_uses_write_behind(fake_table, monkeypatch):
+    import server.main as main_module
+    client = TestClient(main_module.app)
+
+    # 1. Con escritura diferida la respuesta no espera a la inserción
+    response = client.post("/predict", json=STUDENT)
+    assert response.status_code == 200
+    assert "en cola de guardado" in response.json()['message']
+    assert main_module.student_writer.flush(timeout=5)
+    assert len(fake_table.inserted) == 1 and fake_table.inserted[0][0]['target'] == response.json()['prediction']
+
+    # 2. Desactivada se inserta directamente, como antes
+    monkeypatch.setattr(main_module.student_writer, "enabled", False)
+    response = client.post("/predict", json=STUDENT)
+    assert "datos guardados" in response.json()['message']
+    assert len(fake_table.inserted) == 2
+
+    # 3. Métricas de la cola
+    monkeypatch.setattr(main_module.student_writer, "enabled", True)
+    body = client.get("/metrics").text
+    assert 'student_db_write_queue_size{table="students"} 0' in body
+    assert 'student_db_flush_duration_seconds_count{table="students",outcome="ok"}' in body
+
+# Ejecuta este test con:
+# pytest server/tests/test_write_behind.py